@@ -1,321 +1,3992 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, has_request_context, send_file
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.http import http_date
 from dotenv import load_dotenv
+import numpy as np
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import json
-from datetime import datetime, timedelta
+import logging
+import base64
+import csv
+import gzip
+import hashlib
+import heapq
+import hmac
+import importlib.util
+import itertools
+import math
+import mimetypes
+import multiprocessing
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+import queue
+import random
 import re
+import signal
+import sqlite3
+import sys
+import time
+import uuid
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always produced
+    brotli = None
+
+# weasyprint is optional (without it resumes render as HTML only) and slow to
+# import, so it is only imported by the first PDF export
+PDF_EXPORT_AVAILABLE = importlib.util.find_spec('weasyprint') is not None
 
 load_dotenv()
 
-app = Flask(
-    __name__,
-    static_folder='static',
-    static_url_path='/static',
-    template_folder='templates'
+# Under `python app.py` every process of the password hashing pool re-runs this
+# file as __mp_main__ before it takes a job. Those processes only hash, so they
+# skip the start-up work that opens the database and loads the catalog.
+HASHING_PROCESS = __name__ == '__mp_main__'
+
+app = Flask(
+    __name__,
+    static_folder='static',
+    static_url_path='/static',
+    template_folder='templates'
+)
+app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
+CORS(app)
+
+# ==================== OBSERVABILITY ====================
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+METRICS_DIR = os.getenv('METRICS_DIR')  # set to aggregate /metrics across gunicorn workers
+METRICS_FLUSH_INTERVAL = 5
+PROFILER_TOKEN = os.getenv('PROFILER_TOKEN')  # requests sending `X-Profile: <token>` are profiled
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', '0.005'))
+MAX_STORED_PROFILES = 20
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: time, level, event name, request id and structured fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'event': record.getMessage(),
+        }
+        if has_request_context() and 'request_id' in g:
+            entry['request_id'] = g.request_id
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+logger = logging.getLogger('smartcareer')
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(JsonLogFormatter())
+logger.addHandler(log_handler)
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Emit a structured log line, e.g. log_event('chat.upstream_error', status=502)"""
+    logger.log(level, event, extra={'fields': fields})
+
+
+class Metrics:
+    """Prometheus-style counters, gauges and histograms for this process.
+
+    Samples are keyed by metric name plus sorted label pairs. Collectors are
+    callables evaluated at snapshot time for values that live elsewhere (such
+    as the chat cache statistics). With METRICS_DIR set, every worker also
+    writes its snapshot there and /metrics sums the snapshots of live workers.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}  # key -> [per-bucket counts (last is +Inf), sum, count]
+        self.descriptions = {}
+        self.collectors = []
+        self.pid = None
+
+    def describe(self, name, kind, text):
+        self.descriptions[name] = (kind, text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge_add(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self):
+        """JSON-serializable copy of every sample, collectors included"""
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = {key: [list(buckets), total, count] for key, (buckets, total, count) in self.histograms.items()}
+        for collector in self.collectors:
+            for kind, name, labels, value in collector():
+                key = (name, tuple(sorted(labels.items())))
+                target = counters if kind == 'counter' else gauges
+                target[key] = target.get(key, 0) + value
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+            'gauges': [[name, list(labels), value] for (name, labels), value in gauges.items()],
+            'histograms': [[name, list(labels)] + histogram for (name, labels), histogram in histograms.items()],
+        }
+
+    def ensure_started(self):
+        """Start the snapshot writer once per process when METRICS_DIR is set"""
+        if not METRICS_DIR or self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            threading.Thread(target=self.run, name='metrics-writer', daemon=True).start()
+
+    def run(self):
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                log_event('metrics.write_failed', logging.WARNING, error=str(e))
+
+    def write_snapshot(self):
+        path = os.path.join(METRICS_DIR, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def worker_snapshots(self):
+        """This process's live snapshot plus the last snapshot of every other live worker"""
+        snapshots = [self.snapshot()]
+        if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+            return snapshots
+        for filename in os.listdir(METRICS_DIR):
+            name, extension = os.path.splitext(filename)
+            if extension != '.json' or not name.isdigit() or int(name) == os.getpid():
+                continue
+            path = os.path.join(METRICS_DIR, filename)
+            try:
+                os.kill(int(name), 0)
+            except OSError:
+                # The worker is gone; drop its file so it stops being counted
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self, snapshots):
+        """Prometheus text exposition format of the summed snapshots"""
+        merged = {'counter': {}, 'gauge': {}, 'histogram': {}}
+        for snapshot in snapshots:
+            for kind, samples in (('counter', snapshot['counters']), ('gauge', snapshot['gauges'])):
+                for name, labels, value in samples:
+                    key = (name, tuple(tuple(pair) for pair in labels))
+                    merged[kind][key] = merged[kind].get(key, 0) + value
+            for name, labels, buckets, total, count in snapshot['histograms']:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                current = merged['histogram'].setdefault(key, [[0] * len(buckets), 0.0, 0])
+                current[0] = [a + b for a, b in zip(current[0], buckets)]
+                current[1] += total
+                current[2] += count
+
+        # Derived hit ratio per cache, from the cache_requests_total counter
+        lookups = {}
+        for (name, labels), value in merged['counter'].items():
+            if name == 'cache_requests_total':
+                labels = dict(labels)
+                cache = lookups.setdefault(labels['cache'], [0, 0])
+                cache[0] += value
+                if labels['result'] != 'miss':
+                    cache[1] += value
+        for cache, (total, hits) in lookups.items():
+            merged['gauge'][('cache_hit_ratio', (('cache', cache),))] = hits / total if total else 0.0
+
+        lines = []
+        described = set()
+        for kind in ('counter', 'gauge', 'histogram'):
+            for (name, labels), value in sorted(merged[kind].items()):
+                if name not in described:
+                    described.add(name)
+                    _, text = self.descriptions.get(name, (kind, name.replace('_', ' ')))
+                    lines.append(f'# HELP {name} {text}')
+                    lines.append(f'# TYPE {name} {kind}')
+                if kind != 'histogram':
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+                    continue
+                buckets, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], buckets):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", str(bound)),))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {total}')
+                lines.append(f'{name}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+metrics = Metrics(LATENCY_BUCKETS)
+metrics.describe('http_requests_total', 'counter', 'HTTP requests by method, route and status')
+metrics.describe('http_request_duration_seconds', 'histogram', 'Time spent in the view, by method and route')
+metrics.describe('http_requests_in_flight', 'gauge', 'Requests currently being handled')
+metrics.describe('upstream_requests_total', 'counter', 'Calls to OpenRouter and Web3Forms by status')
+metrics.describe('upstream_request_duration_seconds', 'histogram', 'Upstream call duration (headers only for streams)')
+metrics.describe('upstream_rejected_total', 'counter', 'Upstream calls refused because every slot was busy')
+metrics.describe('cache_requests_total', 'counter', 'Cache lookups by cache and result')
+metrics.describe('cache_hit_ratio', 'gauge', 'Share of cache lookups that were served from the cache')
+metrics.describe('static_asset_requests_total', 'counter', 'Fingerprinted static file requests by encoding and status')
+metrics.describe('export_rows_total', 'counter', 'Rows streamed by the admin export endpoints')
+metrics.describe('activity_events_written_total', 'counter', 'User activity events written to storage')
+metrics.describe('activity_events_dropped_total', 'counter', 'User activity events dropped because the buffer was full')
+metrics.describe('chat_rejected_total', 'counter', 'Chat requests turned away by rate limits or admission control')
+metrics.describe('chat_admission_wait_seconds', 'histogram', 'Time chat requests waited for a global upstream slot')
+metrics.describe('chat_admission_waiting', 'gauge', 'Chat requests queued for a global upstream slot')
+metrics.describe('storage_lock_timeouts_total', 'counter', 'Rate-limit and admission writes that gave up waiting for the SQLite lock')
+
+
+class StackSampler:
+    """Sampling profiler for a single request, producing collapsed stacks.
+
+    On the main thread (sync and gevent workers) it samples on SIGPROF, i.e.
+    every `interval` seconds of CPU time; elsewhere (the threaded development
+    server) a helper thread samples the request thread's stack on wall time.
+    Under gevent the samples include whichever greenlet happened to be running.
+    """
+
+    lock = threading.Lock()  # SIGPROF is process-wide, so one profile at a time
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.previous_handler = None
+        self.thread_id = None
+        self.running = False
+
+    def record(self, frame):
+        stack = []
+        while frame is not None and len(stack) < 64:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        key = ';'.join(reversed(stack))
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def start(self):
+        """Begin sampling; returns False if another request is being profiled"""
+        if not StackSampler.lock.acquire(blocking=False):
+            return False
+        self.running = True
+        try:
+            self.previous_handler = signal.signal(signal.SIGPROF, lambda signum, frame: self.record(frame))
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        except (ValueError, AttributeError):
+            # Not on the main thread (or no SIGPROF on this platform): poll from a helper thread
+            self.previous_handler = None
+            self.thread_id = threading.get_ident()
+            threading.Thread(target=self.poll, name='request-profiler', daemon=True).start()
+        return True
+
+    def poll(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.record(frame)
+            time.sleep(self.interval)
+
+    def stop(self):
+        """Stop sampling and return the profile in collapsed-stack format"""
+        self.running = False
+        if self.previous_handler is not None:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self.previous_handler)
+        StackSampler.lock.release()
+        lines = sorted(self.stacks.items(), key=lambda item: -item[1])
+        return ''.join(f'{stack} {count}\n' for stack, count in lines)
+
+
+recent_profiles = OrderedDict()  # request id -> collapsed stacks
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+    metrics.gauge_add('http_requests_in_flight', 1)
+    metrics.ensure_started()
+
+    profile_token = request.headers.get('X-Profile')
+    if (PROFILER_TOKEN and profile_token and request.endpoint != 'get_profile'
+            and hmac.compare_digest(profile_token, PROFILER_TOKEN)):
+        profiler = StackSampler(PROFILER_INTERVAL)
+        if profiler.start():
+            g.profiler = profiler
+
+
+@app.after_request
+def tag_response(response):
+    g.response_status = response.status_code
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    if 'profiler' in g:
+        response.headers['X-Profile-Id'] = g.request_id
+    return response
+
+
+@app.teardown_request
+def record_request_metrics(error=None):
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    status = g.get('response_status', 500)
+    metrics.gauge_add('http_requests_in_flight', -1)
+    metrics.inc('http_requests_total', method=request.method, route=route, status=str(status))
+    metrics.observe('http_request_duration_seconds', duration, method=request.method, route=route)
+
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        recent_profiles[g.request_id] = profiler.stop()
+        while len(recent_profiles) > MAX_STORED_PROFILES:
+            recent_profiles.popitem(last=False)
+        log_event('request.profiled', route=route, samples=profiler.samples)
+
+    log_event('request.completed', logging.DEBUG, method=request.method, route=route,
+              status=status, duration_ms=round(duration * 1000, 2))
+
+
+# ==================== STORAGE ====================
+# Raw quiz results are dropped after this many days; the daily aggregates are kept longer
+QUIZ_RESULT_RETENTION_DAYS = int(os.getenv('QUIZ_RESULT_RETENTION_DAYS', '90'))
+QUIZ_AGGREGATE_RETENTION_DAYS = int(os.getenv('QUIZ_AGGREGATE_RETENTION_DAYS', '730'))
+QUIZ_AGGREGATE_DIMENSIONS = ('top', 'match', 'score', 'cohort')
+QUIZ_SCORE_BUCKET = 10
+
+
+def quiz_aggregate_increments(careers, scores, cohort):
+    """(dimension, key) counters one quiz result adds to its day's aggregates.
+
+    `top` counts first-choice careers, `match` every career in the result,
+    `score` the match percentages per career in 10-point buckets and
+    `cohort` first choices per signup month.
+    """
+    increments = [('match', career) for career in careers]
+    for career in careers:
+        bucket = min(int(scores.get(career, 0)) // QUIZ_SCORE_BUCKET, 100 // QUIZ_SCORE_BUCKET - 1)
+        increments.append(('score', f'{career}|{bucket * QUIZ_SCORE_BUCKET}'))
+    if careers:
+        increments.append(('top', careers[0]))
+        increments.append(('cohort', f'{cohort or "unknown"}|{careers[0]}'))
+    return increments
+
+
+# Bulk exports read this many rows per batch, each batch under a briefly held lock or connection
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '500'))
+QUIZ_EXPORT_FIELDS = ('timestamp', 'user_email', 'top_career', 'careers', 'scores')
+FEEDBACK_EXPORT_FIELDS = ('id', 'timestamp', 'name', 'email', 'feedback_type', 'subject', 'message', 'rating', 'status')
+FEEDBACK_EXPORT_FILTERS = ('email', 'feedback_type', 'status')
+
+
+def quiz_export_row(fields, timestamp, user_email, careers, scores):
+    """One exported quiz result restricted to `fields`"""
+    values = {
+        'timestamp': timestamp,
+        'user_email': user_email,
+        'top_career': careers[0] if careers else None,
+        'careers': careers,
+        'scores': scores,
+    }
+    return {field: values[field] for field in fields}
+
+
+def is_lock_timeout(error):
+    """True for SQLite's "database is locked" (busy timeout expired)"""
+    return 'locked' in str(error)
+
+
+def retention_cutoff(day, days):
+    """ISO day `days` before `day`; data from earlier days is expired"""
+    return (date.fromisoformat(day) - timedelta(days=days)).isoformat()
+
+
+class QuizResultSegment:
+    """One day of quiz results stored column-wise in flat typed arrays"""
+
+    __slots__ = ('users', 'timestamps', 'careers', 'scores')
+
+    WIDTH = 3  # careers kept per result; shorter results are padded
+    NO_CAREER = 0xFFFF
+    EPOCH = datetime(1970, 1, 1)  # timestamps are naive local time, kept as microseconds since this
+
+    def __init__(self):
+        self.users = array('I')  # interned emails
+        self.timestamps = array('q')  # microseconds since EPOCH
+        self.careers = array('H')  # WIDTH interned career ids per result
+        self.scores = array('B')  # WIDTH match percentages per result
+
+    def append(self, user_id, timestamp, career_ids, scores):
+        padding = self.WIDTH - len(career_ids[:self.WIDTH])
+        self.users.append(user_id)
+        self.timestamps.append(timestamp)
+        self.careers.extend(career_ids[:self.WIDTH] + [self.NO_CAREER] * padding)
+        self.scores.extend(scores[:self.WIDTH] + [0] * padding)
+
+    def __len__(self):
+        return len(self.users)
+
+    @classmethod
+    def encode_time(cls, timestamp):
+        """Naive ISO timestamp -> stored integer, exact to the microsecond"""
+        return (datetime.fromisoformat(timestamp) - cls.EPOCH) // timedelta(microseconds=1)
+
+    @classmethod
+    def decode_time(cls, value):
+        return (cls.EPOCH + timedelta(microseconds=value)).isoformat()
+
+
+class MemoryStorage:
+    """Process-local storage; state is per worker and lost on restart.
+
+    Useful for development and single-process runs. Set STORAGE_BACKEND=memory.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = {}
+        self.quiz_segments = OrderedDict()  # ISO day -> QuizResultSegment, oldest first
+        self.quiz_aggregates = {dimension: {} for dimension in QUIZ_AGGREGATE_DIMENSIONS}  # -> day -> key -> count
+        self.interned = {'user': {}, 'career': {}}  # value -> small integer id for the quiz columns
+        self.interned_values = {'user': [], 'career': []}  # small integer id -> value
+        self.progress = {}
+        self.activity = {}  # email -> event -> count
+        self.feedback = []
+        self.outbox = {}
+        self.buckets = OrderedDict()  # key -> (tokens, updated_at); least recently used first
+        self.leases = {}  # lease id -> (pool, expires_at)
+        self.lease_ids = itertools.count(1)
+        self.conversations = OrderedDict()  # id -> {'summary', 'turns', 'updated_at'}; least recently used first
+        self.turn_ids = itertools.count(1)
+
+    def create_user(self, email, name, password_hash, created_at):
+        """Insert a user; returns False if the email is already registered"""
+        with self.lock:
+            if email in self.users:
+                return False
+            self.users[email] = {
+                'name': name,
+                'password_hash': password_hash,
+                'created_at': created_at,
+                'profile_data': {}
+            }
+            return True
+
+    def get_user(self, email):
+        return self.users.get(email)
+
+    def update_password_hash(self, email, password_hash):
+        with self.lock:
+            if email in self.users:
+                self.users[email]['password_hash'] = password_hash
+
+    def intern(self, kind, value):
+        ids = self.interned[kind]
+        if value not in ids:
+            ids[value] = len(ids)
+            self.interned_values[kind].append(value)
+        return ids[value]
+
+    def record_quiz_result(self, email, careers, scores, timestamp):
+        """Store a quiz result, add it to its day's aggregates and bump the user's progress counters"""
+        day = timestamp[:10]
+        with self.lock:
+            segment = self.quiz_segments.get(day)
+            if segment is None:
+                segment = self.quiz_segments[day] = QuizResultSegment()
+                self.expire_quiz_data(day)
+            segment.append(
+                self.intern('user', email),
+                QuizResultSegment.encode_time(timestamp),
+                [self.intern('career', career) for career in careers],
+                [int(scores.get(career, 0)) for career in careers],
+            )
+            cohort = self.users.get(email, {}).get('created_at', '')[:7]
+            for dimension, key in quiz_aggregate_increments(careers, scores, cohort):
+                counts = self.quiz_aggregates[dimension].setdefault(day, {})
+                counts[key] = counts.get(key, 0) + 1
+            progress = self.progress.setdefault(email, {'quizzes_taken': 0, 'matches_found': 0})
+            progress['quizzes_taken'] += 1
+            progress['matches_found'] = len(careers)
+
+    def expire_quiz_data(self, day):
+        """Drop whole segments and aggregate days past retention (called when a new day starts)"""
+        cutoff = retention_cutoff(day, QUIZ_RESULT_RETENTION_DAYS)
+        for segment_day in [segment_day for segment_day in self.quiz_segments if segment_day < cutoff]:
+            del self.quiz_segments[segment_day]
+        cutoff = retention_cutoff(day, QUIZ_AGGREGATE_RETENTION_DAYS)
+        for days in self.quiz_aggregates.values():
+            for aggregate_day in [aggregate_day for aggregate_day in days if aggregate_day < cutoff]:
+                del days[aggregate_day]
+
+    def get_quiz_aggregates(self, dimension, since_day):
+        """[(day, key, count)] of one aggregate dimension from `since_day` on"""
+        with self.lock:
+            return [
+                (day, key, count)
+                for day, counts in sorted(self.quiz_aggregates[dimension].items()) if day >= since_day
+                for key, count in counts.items()
+            ]
+
+    def export_quiz_results(self, since=None, until=None, email=None, fields=QUIZ_EXPORT_FIELDS,
+                            batch_size=EXPORT_BATCH_SIZE):
+        """Yield quiz results with since <= timestamp < until, oldest first.
+
+        Only the day segments in range are visited, and each batch of rows is
+        decoded under the lock and yielded after releasing it.
+        """
+        start = QuizResultSegment.encode_time(since) if since else None
+        end = QuizResultSegment.encode_time(until) if until else None
+        width = QuizResultSegment.WIDTH
+        with self.lock:
+            segments = [
+                segment for day, segment in sorted(self.quiz_segments.items())
+                if (not since or day >= since[:10]) and (not until or day <= until[:10])
+            ]
+            user_id = self.interned['user'].get(email) if email is not None else None
+        if email is not None and user_id is None:
+            return
+
+        users, career_names = self.interned_values['user'], self.interned_values['career']
+        for segment in segments:
+            position = 0
+            while True:
+                rows = []
+                with self.lock:
+                    stop = min(position + batch_size, len(segment))
+                    for index in range(position, stop):
+                        timestamp = segment.timestamps[index]
+                        if ((start is not None and timestamp < start) or (end is not None and timestamp >= end)
+                                or (user_id is not None and segment.users[index] != user_id)):
+                            continue
+                        ids = segment.careers[index * width:(index + 1) * width]
+                        careers = [career_names[career_id] for career_id in ids
+                                   if career_id != QuizResultSegment.NO_CAREER]
+                        scores = dict(zip(careers, segment.scores[index * width:(index + 1) * width]))
+                        rows.append(quiz_export_row(fields, QuizResultSegment.decode_time(timestamp),
+                                                    users[segment.users[index]], careers, scores))
+                if stop == position:
+                    break
+                position = stop
+                yield from rows
+
+    def add_activity(self, counts):
+        """Add {(email, event): count} to the per-user activity counters"""
+        with self.lock:
+            for (email, event), count in counts.items():
+                events = self.activity.setdefault(email, {})
+                events[event] = events.get(event, 0) + count
+
+    def get_progress(self, email):
+        """Quiz progress plus activity counters of one user"""
+        with self.lock:
+            progress = dict(self.progress.get(email, {'quizzes_taken': 0, 'matches_found': 0}))
+            progress.update(self.activity.get(email, {}))
+        return progress
+
+    def add_feedback(self, entry, delivery_payload=None):
+        """Store a feedback entry, queue its delivery (if a payload is given) and return its id"""
+        with self.lock:
+            entry = dict(entry, id=len(self.feedback) + 1)
+            self.feedback.append(entry)
+            self.outbox[entry['id']] = {
+                'payload': delivery_payload,
+                'status': 'pending' if delivery_payload is not None else 'skipped',
+                'attempts': 0,
+                'next_attempt_at': time.time(),
+                'last_error': None,
+                'updated_at': time.time(),
+            }
+            return entry['id']
+
+    def export_feedback(self, since=None, until=None, filters=None, min_rating=None,
+                        fields=FEEDBACK_EXPORT_FIELDS, batch_size=EXPORT_BATCH_SIZE):
+        """Yield feedback entries with since <= timestamp < until matching `filters`, oldest first"""
+        filters = filters or {}
+
+        def rating_at_least(rating):
+            try:
+                return float(rating) >= min_rating
+            except (TypeError, ValueError):
+                return False
+
+        position = 0
+        while True:
+            with self.lock:
+                batch = self.feedback[position:position + batch_size]
+            if not batch:
+                return
+            position += len(batch)
+            for entry in batch:
+                if ((since and entry['timestamp'] < since) or (until and entry['timestamp'] >= until)
+                        or any(entry.get(column) != value for column, value in filters.items())
+                        or (min_rating is not None and not rating_at_least(entry.get('rating')))):
+                    continue
+                yield {field: entry.get(field) for field in fields}
+
+    def claim_feedback_deliveries(self, limit, lease_seconds):
+        """Lease up to `limit` due deliveries; returns [(feedback_id, payload, attempt)]"""
+        now = time.time()
+        claimed = []
+        with self.lock:
+            for feedback_id, job in self.outbox.items():
+                if len(claimed) >= limit:
+                    break
+                if job['status'] == 'pending' and job['next_attempt_at'] <= now:
+                    job['attempts'] += 1
+                    job['next_attempt_at'] = now + lease_seconds
+                    claimed.append((feedback_id, job['payload'], job['attempts']))
+        return claimed
+
+    def finish_feedback_delivery(self, feedback_id, status, error=None, retry_at=None):
+        """Record a delivery outcome; status 'pending' with retry_at schedules a retry"""
+        with self.lock:
+            job = self.outbox[feedback_id]
+            job['status'] = status
+            job['last_error'] = error
+            job['updated_at'] = time.time()
+            if retry_at is not None:
+                job['next_attempt_at'] = retry_at
+
+    def get_feedback_delivery(self, feedback_id):
+        with self.lock:
+            job = self.outbox.get(feedback_id)
+            if job is None:
+                return None
+            return {key: job[key] for key in ('status', 'attempts', 'last_error', 'updated_at')}
+
+    def take_token(self, key, burst, rate, max_keys=100000):
+        """Take one token from the bucket `key`; returns 0 or the seconds until one is available"""
+        now = time.time()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self.buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            while len(self.buckets) > max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+    def acquire_lease(self, pool, limit, ttl):
+        """Take one of `limit` slots in `pool` for up to `ttl` seconds; returns a lease id or None"""
+        now = time.time()
+        with self.lock:
+            for lease_id in [lease_id for lease_id, (_, expires_at) in self.leases.items() if expires_at <= now]:
+                del self.leases[lease_id]
+            if sum(1 for name, _ in self.leases.values() if name == pool) >= limit:
+                return None
+            lease_id = next(self.lease_ids)
+            self.leases[lease_id] = (pool, now + ttl)
+        return lease_id
+
+    def release_lease(self, lease_id):
+        with self.lock:
+            self.leases.pop(lease_id, None)
+        return True
+
+    def get_conversation(self, conversation_id):
+        """Summary and remaining turns of a conversation, or None if it does not exist"""
+        with self.lock:
+            conversation = self.conversations.get(conversation_id)
+            if conversation is None:
+                return None
+            return {'summary': conversation['summary'], 'turns': [dict(turn) for turn in conversation['turns']]}
+
+    def append_chat_turns(self, conversation_id, turns, max_conversations=10000):
+        """Append [(role, content, tokens)] to a conversation, creating it if needed"""
+        now = time.time()
+        with self.lock:
+            conversation = self.conversations.pop(conversation_id, None) or {'summary': '', 'turns': []}
+            conversation['updated_at'] = now
+            conversation['turns'].extend(
+                {'id': next(self.turn_ids), 'role': role, 'content': content, 'tokens': tokens}
+                for role, content, tokens in turns
+            )
+            self.conversations[conversation_id] = conversation
+            while len(self.conversations) > max_conversations:
+                self.conversations.popitem(last=False)
+
+    def fold_chat_turns(self, conversation_id, through_id, old_summary, summary):
+        """Replace turns up to `through_id` with `summary`; False if the summary changed meanwhile"""
+        with self.lock:
+            conversation = self.conversations.get(conversation_id)
+            if conversation is None or conversation['summary'] != old_summary:
+                return False
+            conversation['summary'] = summary
+            conversation['turns'] = [turn for turn in conversation['turns'] if turn['id'] > through_id]
+            return True
+
+    def delete_conversation(self, conversation_id):
+        with self.lock:
+            self.conversations.pop(conversation_id, None)
+
+    def prune_conversations(self, idle_before):
+        """Drop conversations untouched since `idle_before`; returns how many were removed"""
+        with self.lock:
+            stale = [key for key, conversation in self.conversations.items() if conversation['updated_at'] < idle_before]
+            for key in stale:
+                del self.conversations[key]
+        return len(stale)
+
+
+class SQLiteStorage:
+    """SQLite storage shared by every gunicorn worker through one database file.
+
+    The database runs in WAL mode so readers never block the single writer,
+    and each worker keeps a small pool of connections that requests (threads
+    or greenlets) borrow and return.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            email TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            profile_data TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE TABLE IF NOT EXISTS quiz_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            careers TEXT NOT NULL,
+            scores TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_quiz_results_user ON quiz_results (user_email, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_quiz_results_timestamp ON quiz_results (timestamp);
+        CREATE TABLE IF NOT EXISTS quiz_aggregates (
+            dimension TEXT NOT NULL,
+            day TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (dimension, day, key)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS progress (
+            email TEXT PRIMARY KEY,
+            quizzes_taken INTEGER NOT NULL DEFAULT 0,
+            matches_found INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS user_activity (
+            email TEXT NOT NULL,
+            event TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (email, event)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            feedback_type TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            message TEXT NOT NULL,
+            rating INTEGER NOT NULL DEFAULT 0,
+            timestamp TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'new'
+        );
+        CREATE INDEX IF NOT EXISTS idx_feedback_email ON feedback (email);
+        CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback (timestamp);
+        CREATE TABLE IF NOT EXISTS feedback_outbox (
+            feedback_id INTEGER PRIMARY KEY REFERENCES feedback (id),
+            payload TEXT,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_feedback_outbox_due ON feedback_outbox (status, next_attempt_at);
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_rate_limits_updated ON rate_limits (updated_at);
+        CREATE TABLE IF NOT EXISTS admission_leases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pool TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_admission_leases_pool ON admission_leases (pool, expires_at);
+        CREATE TABLE IF NOT EXISTS chat_conversations (
+            id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL DEFAULT '',
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_chat_conversations_updated ON chat_conversations (updated_at);
+        CREATE TABLE IF NOT EXISTS chat_turns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            tokens INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_chat_turns_conversation ON chat_turns (conversation_id, id);
+    """
+
+    # Buckets idle this long are full again and can be dropped; pruning runs on
+    # a small random fraction of take_token calls to keep the table bounded
+    RATE_LIMIT_IDLE_SECONDS = 3600
+    RATE_LIMIT_PRUNE_PROBABILITY = 0.001
+    # Expired quiz results and aggregates are deleted by a small fraction of submissions
+    QUIZ_PRUNE_PROBABILITY = 0.001
+    # A connection waits this long for a lock held by another worker. Rate-limit and
+    # admission writes, which run on every chat request, give up much sooner: a
+    # blocked SQLite call holds the whole gevent hub, not just its own greenlet
+    BUSY_TIMEOUT_MS = 30000
+    CONTROL_BUSY_TIMEOUT_MS = 250
+
+    def __init__(self, path, pool_size=8):
+        self.path = path
+        self.pool_size = pool_size
+        self.pid = os.getpid()
+        self.idle = queue.LifoQueue()
+        # Not pooled: with GUNICORN_PRELOAD this runs in the gunicorn master, whose
+        # open connections must not be inherited by the forked workers
+        conn = self.connect()
+        try:
+            conn.executescript(self.SCHEMA)
+        finally:
+            conn.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}')
+        return conn
+
+    @contextmanager
+    def connection(self, busy_timeout_ms=None):
+        """Borrow a pooled connection; the block runs as one transaction
+
+        `busy_timeout_ms` shortens how long this block waits for another
+        writer before raising "database is locked".
+        """
+        if self.pid != os.getpid():
+            # Connections must not cross a fork, so each worker starts its own pool
+            self.pid = os.getpid()
+            self.idle = queue.LifoQueue()
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = self.connect()
+        try:
+            if busy_timeout_ms is not None:
+                conn.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+            with conn:
+                yield conn
+        finally:
+            if busy_timeout_ms is not None:
+                conn.execute(f'PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}')
+            if self.idle.qsize() < self.pool_size:
+                self.idle.put(conn)
+            else:
+                conn.close()
+
+    def create_user(self, email, name, password_hash, created_at):
+        """Insert a user; returns False if the email is already registered"""
+        try:
+            with self.connection() as conn:
+                conn.execute(
+                    'INSERT INTO users (email, name, password_hash, created_at) VALUES (?, ?, ?, ?)',
+                    (email, name, password_hash, created_at)
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def get_user(self, email):
+        with self.connection() as conn:
+            row = conn.execute(
+                'SELECT name, password_hash, created_at, profile_data FROM users WHERE email = ?', (email,)
+            ).fetchone()
+        if row is None:
+            return None
+        user = dict(row)
+        user['profile_data'] = json.loads(user['profile_data'])
+        return user
+
+    def update_password_hash(self, email, password_hash):
+        with self.connection() as conn:
+            conn.execute('UPDATE users SET password_hash = ? WHERE email = ?', (password_hash, email))
+
+    def record_quiz_result(self, email, careers, scores, timestamp):
+        """Store a quiz result, add it to its day's aggregates and bump the user's progress counters atomically"""
+        day = timestamp[:10]
+        with self.connection() as conn:
+            user = conn.execute('SELECT created_at FROM users WHERE email = ?', (email,)).fetchone()
+            cohort = user['created_at'][:7] if user is not None else ''
+            conn.execute(
+                'INSERT INTO quiz_results (user_email, careers, scores, timestamp) VALUES (?, ?, ?, ?)',
+                (email, json.dumps(careers), json.dumps(scores), timestamp)
+            )
+            conn.executemany(
+                'INSERT INTO quiz_aggregates (dimension, day, key, count) VALUES (?, ?, ?, 1) '
+                'ON CONFLICT (dimension, day, key) DO UPDATE SET count = count + 1',
+                [(dimension, day, key) for dimension, key in quiz_aggregate_increments(careers, scores, cohort)]
+            )
+            if random.random() < self.QUIZ_PRUNE_PROBABILITY:
+                conn.execute('DELETE FROM quiz_results WHERE timestamp < ?',
+                             (retention_cutoff(day, QUIZ_RESULT_RETENTION_DAYS),))
+                conn.execute(
+                    f"DELETE FROM quiz_aggregates WHERE dimension IN ({', '.join('?' * len(QUIZ_AGGREGATE_DIMENSIONS))}) "
+                    'AND day < ?',
+                    QUIZ_AGGREGATE_DIMENSIONS + (retention_cutoff(day, QUIZ_AGGREGATE_RETENTION_DAYS),)
+                )
+            conn.execute(
+                'INSERT INTO progress (email, quizzes_taken, matches_found) VALUES (?, 1, ?) '
+                'ON CONFLICT (email) DO UPDATE SET quizzes_taken = quizzes_taken + 1, '
+                'matches_found = excluded.matches_found',
+                (email, len(careers))
+            )
+
+    def get_quiz_aggregates(self, dimension, since_day):
+        """[(day, key, count)] of one aggregate dimension from `since_day` on"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                'SELECT day, key, count FROM quiz_aggregates WHERE dimension = ? AND day >= ? ORDER BY day',
+                (dimension, since_day)
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def export_rows(self, table, columns, where, params, batch_size):
+        """Yield rows of `table` in (timestamp, id) order, one keyset-paginated batch at a time.
+
+        Each batch borrows a connection only for its own query, so a long
+        export neither holds a read transaction open nor ties up the pool
+        while the client downloads.
+        """
+        query = (
+            f"SELECT {', '.join(dict.fromkeys(('id', 'timestamp') + tuple(columns)))} FROM {table} "
+            f"WHERE {' AND '.join(where + ['(timestamp, id) > (?, ?)'])} ORDER BY timestamp, id LIMIT ?"
+        )
+        last = ('', 0)
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(query, params + [*last, batch_size]).fetchall()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1]['timestamp'], rows[-1]['id'])
+
+    @staticmethod
+    def time_range(since, until):
+        where, params = [], []
+        if since:
+            where.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            where.append('timestamp < ?')
+            params.append(until)
+        return where, params
+
+    def export_quiz_results(self, since=None, until=None, email=None, fields=QUIZ_EXPORT_FIELDS,
+                            batch_size=EXPORT_BATCH_SIZE):
+        """Yield quiz results with since <= timestamp < until, oldest first (served by the timestamp indexes)"""
+        unknown = set(fields) - set(QUIZ_EXPORT_FIELDS)
+        if unknown:
+            raise ValueError(f'Unknown quiz result fields: {sorted(unknown)}')
+        where, params = self.time_range(since, until)
+        if email is not None:
+            where.append('user_email = ?')
+            params.append(email)
+        columns = [column for column, needed in (
+            ('user_email', 'user_email' in fields),
+            ('careers', 'careers' in fields or 'top_career' in fields),
+            ('scores', 'scores' in fields),
+        ) if needed]
+        for row in self.export_rows('quiz_results', columns, where, params, batch_size):
+            yield quiz_export_row(
+                fields,
+                row['timestamp'],
+                row['user_email'] if 'user_email' in columns else None,
+                json.loads(row['careers']) if 'careers' in columns else None,
+                json.loads(row['scores']) if 'scores' in columns else None,
+            )
+
+    def export_feedback(self, since=None, until=None, filters=None, min_rating=None,
+                        fields=FEEDBACK_EXPORT_FIELDS, batch_size=EXPORT_BATCH_SIZE):
+        """Yield feedback entries with since <= timestamp < until matching `filters`, oldest first"""
+        filters = filters or {}
+        unknown = (set(fields) - set(FEEDBACK_EXPORT_FIELDS)) | (set(filters) - set(FEEDBACK_EXPORT_FILTERS))
+        if unknown:
+            raise ValueError(f'Unknown feedback fields: {sorted(unknown)}')
+        where, params = self.time_range(since, until)
+        for column, value in filters.items():
+            where.append(f'{column} = ?')
+            params.append(value)
+        if min_rating is not None:
+            where.append('rating >= ?')
+            params.append(min_rating)
+        for row in self.export_rows('feedback', fields, where, params, batch_size):
+            yield {field: row[field] for field in fields}
+
+    def add_activity(self, counts):
+        """Add {(email, event): count} to the per-user activity counters in one transaction"""
+        with self.connection() as conn:
+            conn.executemany(
+                'INSERT INTO user_activity (email, event, count) VALUES (?, ?, ?) '
+                'ON CONFLICT (email, event) DO UPDATE SET count = count + excluded.count',
+                [(email, event, count) for (email, event), count in counts.items()]
+            )
+
+    def get_progress(self, email):
+        """Quiz progress plus activity counters of one user"""
+        with self.connection() as conn:
+            row = conn.execute(
+                'SELECT quizzes_taken, matches_found FROM progress WHERE email = ?', (email,)
+            ).fetchone()
+            activity = conn.execute('SELECT event, count FROM user_activity WHERE email = ?', (email,)).fetchall()
+        progress = dict(row) if row is not None else {'quizzes_taken': 0, 'matches_found': 0}
+        progress.update((event, count) for event, count in activity)
+        return progress
+
+    def add_feedback(self, entry, delivery_payload=None):
+        """Store a feedback entry, queue its delivery (if a payload is given) and return its id"""
+        now = time.time()
+        with self.connection() as conn:
+            cursor = conn.execute(
+                'INSERT INTO feedback (name, email, feedback_type, subject, message, rating, timestamp, status) '
+                'VALUES (:name, :email, :feedback_type, :subject, :message, :rating, :timestamp, :status)',
+                entry
+            )
+            conn.execute(
+                'INSERT INTO feedback_outbox (feedback_id, payload, status, next_attempt_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (
+                    cursor.lastrowid,
+                    json.dumps(delivery_payload) if delivery_payload is not None else None,
+                    'pending' if delivery_payload is not None else 'skipped',
+                    now,
+                    now,
+                )
+            )
+            return cursor.lastrowid
+
+    def claim_feedback_deliveries(self, limit, lease_seconds):
+        """Lease up to `limit` due deliveries; returns [(feedback_id, payload, attempt)]
+
+        The lease pushes next_attempt_at forward, so a job held by a worker
+        that dies is picked up again once the lease runs out.
+        """
+        now = time.time()
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                "SELECT feedback_id, payload, attempts FROM feedback_outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE feedback_outbox SET attempts = attempts + 1, next_attempt_at = ? WHERE feedback_id = ?',
+                [(now + lease_seconds, row['feedback_id']) for row in rows]
+            )
+        return [(row['feedback_id'], json.loads(row['payload']), row['attempts'] + 1) for row in rows]
+
+    def finish_feedback_delivery(self, feedback_id, status, error=None, retry_at=None):
+        """Record a delivery outcome; status 'pending' with retry_at schedules a retry"""
+        with self.connection() as conn:
+            conn.execute(
+                'UPDATE feedback_outbox SET status = ?, last_error = ?, updated_at = ?, '
+                'next_attempt_at = COALESCE(?, next_attempt_at) WHERE feedback_id = ?',
+                (status, error, time.time(), retry_at, feedback_id)
+            )
+
+    def get_feedback_delivery(self, feedback_id):
+        with self.connection() as conn:
+            row = conn.execute(
+                'SELECT status, attempts, last_error, updated_at FROM feedback_outbox WHERE feedback_id = ?',
+                (feedback_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def take_token(self, key, burst, rate):
+        """Take one token from the bucket `key`; returns 0 or the seconds until one is available
+
+        Buckets live in the database so every worker draws from the same
+        counters; BEGIN IMMEDIATE serialises the read-refill-write. If the
+        write lock isn't free within CONTROL_BUSY_TIMEOUT_MS the caller is
+        told to retry in a second rather than stalling the worker.
+        """
+        now = time.time()
+        try:
+            return self.update_token_bucket(key, burst, rate, now)
+        except sqlite3.OperationalError as e:
+            if not is_lock_timeout(e):
+                raise
+            metrics.inc('storage_lock_timeouts_total', operation='take_token')
+            return 1
+
+    def update_token_bucket(self, key, burst, rate, now):
+        with self.connection(self.CONTROL_BUSY_TIMEOUT_MS) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT tokens, updated_at FROM rate_limits WHERE key = ?', (key,)).fetchone()
+            tokens = burst if row is None else min(burst, row['tokens'] + (now - row['updated_at']) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute(
+                'INSERT INTO rate_limits (key, tokens, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at',
+                (key, tokens, now)
+            )
+            if random.random() < self.RATE_LIMIT_PRUNE_PROBABILITY:
+                conn.execute('DELETE FROM rate_limits WHERE updated_at < ?', (now - self.RATE_LIMIT_IDLE_SECONDS,))
+        return wait
+
+    def acquire_lease(self, pool, limit, ttl):
+        """Take one of `limit` slots in `pool` for up to `ttl` seconds; returns a lease id or None
+
+        Leases left behind by a worker that died expire after `ttl`. A write
+        lock that isn't free within CONTROL_BUSY_TIMEOUT_MS counts as no slot.
+        """
+        now = time.time()
+        try:
+            with self.connection(self.CONTROL_BUSY_TIMEOUT_MS) as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('DELETE FROM admission_leases WHERE pool = ? AND expires_at <= ?', (pool, now))
+                in_use = conn.execute('SELECT COUNT(*) FROM admission_leases WHERE pool = ?', (pool,)).fetchone()[0]
+                if in_use >= limit:
+                    return None
+                cursor = conn.execute(
+                    'INSERT INTO admission_leases (pool, expires_at) VALUES (?, ?)', (pool, now + ttl)
+                )
+                return cursor.lastrowid
+        except sqlite3.OperationalError as e:
+            if not is_lock_timeout(e):
+                raise
+            metrics.inc('storage_lock_timeouts_total', operation='acquire_lease')
+            return None
+
+    def release_lease(self, lease_id):
+        """Delete a lease; returns False if the write lock wasn't free in time (the caller retries later)"""
+        try:
+            with self.connection(self.CONTROL_BUSY_TIMEOUT_MS) as conn:
+                conn.execute('DELETE FROM admission_leases WHERE id = ?', (lease_id,))
+        except sqlite3.OperationalError as e:
+            if not is_lock_timeout(e):
+                raise
+            metrics.inc('storage_lock_timeouts_total', operation='release_lease')
+            return False
+        return True
+
+    def get_conversation(self, conversation_id):
+        """Summary and remaining turns of a conversation, or None if it does not exist"""
+        with self.connection() as conn:
+            row = conn.execute('SELECT summary FROM chat_conversations WHERE id = ?', (conversation_id,)).fetchone()
+            if row is None:
+                return None
+            turns = conn.execute(
+                'SELECT id, role, content, tokens FROM chat_turns WHERE conversation_id = ? ORDER BY id',
+                (conversation_id,)
+            ).fetchall()
+        return {'summary': row['summary'], 'turns': [dict(turn) for turn in turns]}
+
+    def append_chat_turns(self, conversation_id, turns):
+        """Append [(role, content, tokens)] to a conversation, creating it if needed"""
+        with self.connection() as conn:
+            conn.execute(
+                'INSERT INTO chat_conversations (id, updated_at) VALUES (?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET updated_at = excluded.updated_at',
+                (conversation_id, time.time())
+            )
+            conn.executemany(
+                'INSERT INTO chat_turns (conversation_id, role, content, tokens) VALUES (?, ?, ?, ?)',
+                [(conversation_id, role, content, tokens) for role, content, tokens in turns]
+            )
+
+    def fold_chat_turns(self, conversation_id, through_id, old_summary, summary):
+        """Replace turns up to `through_id` with `summary`; False if the summary changed meanwhile
+
+        Comparing the old summary makes concurrent folds (two tabs on one
+        session) safe: only the first one applies.
+        """
+        with self.connection() as conn:
+            cursor = conn.execute(
+                'UPDATE chat_conversations SET summary = ? WHERE id = ? AND summary = ?',
+                (summary, conversation_id, old_summary)
+            )
+            if cursor.rowcount == 0:
+                return False
+            conn.execute('DELETE FROM chat_turns WHERE conversation_id = ? AND id <= ?', (conversation_id, through_id))
+            return True
+
+    def delete_conversation(self, conversation_id):
+        with self.connection() as conn:
+            conn.execute('DELETE FROM chat_turns WHERE conversation_id = ?', (conversation_id,))
+            conn.execute('DELETE FROM chat_conversations WHERE id = ?', (conversation_id,))
+
+    def prune_conversations(self, idle_before):
+        """Drop conversations untouched since `idle_before`; returns how many were removed"""
+        with self.connection() as conn:
+            conn.execute(
+                'DELETE FROM chat_turns WHERE conversation_id IN '
+                '(SELECT id FROM chat_conversations WHERE updated_at < ?)',
+                (idle_before,)
+            )
+            return conn.execute('DELETE FROM chat_conversations WHERE updated_at < ?', (idle_before,)).rowcount
+
+
+def create_storage():
+    """Build the storage backend selected by STORAGE_BACKEND (sqlite or memory)"""
+    backend = os.getenv('STORAGE_BACKEND', 'sqlite').lower()
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'sqlite':
+        return SQLiteStorage(os.getenv('DATABASE_PATH', 'smartcareer.db'))
+    raise ValueError(f'Unknown STORAGE_BACKEND: {backend}')
+
+
+if not HASHING_PROCESS:
+    storage = create_storage()
+scholarships_cache = {}
+internships_cache = {}
+jobs_cache = {}
+
+# ==================== COLLEGE QUERY ENGINE ====================
+# Maps the lowercased `type` query parameter to a college catalog category
+COLLEGE_TYPE_ALIASES = {
+    'private': 'private_universities',
+}
+
+# Sort orders precomputed for /api/colleges (missing values sort last)
+COLLEGE_SORT_KEYS = {
+    'rank': lambda college: college.get('rank') or 999,
+    'package': lambda college: -(college.get('avg_package') or 0),
+    'location': lambda college: (college.get('location') or '').lower(),
+    'nirf': lambda college: college.get('nirf_rank') or 999,
+    'name': lambda college: (college.get('name') or '').lower(),
+}
+
+MAX_COLLEGE_PAGE_SIZE = 100
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric tokens"""
+    return re.findall(r'[a-z0-9]+', (text or '').lower())
+
+
+def normalize_query_text(text):
+    """Collapse case and whitespace of a free-text parameter (None when empty)"""
+    text = ' '.join((text or '').split()).lower()
+    return text or None
+
+
+class CollegeIndex:
+    """Precomputed lookup structures over the college database.
+
+    Every filter resolves to a set of record ids through an index built once,
+    so a query only touches the colleges it returns instead of the catalog.
+    """
+
+    def __init__(self, database):
+        self.records = []
+        self.by_category = {}
+        self.by_location = {}
+        self.by_entrance = {}
+        self.by_token = {}
+
+        for category, colleges in database.items():
+            category_ids = self.by_category.setdefault(category.lower(), set())
+            for college in colleges:
+                record_id = len(self.records)
+                self.records.append(college)
+                category_ids.add(record_id)
+                self.by_location.setdefault((college.get('location') or '').lower(), set()).add(record_id)
+                if college.get('entrance'):
+                    self.by_entrance.setdefault(college['entrance'].lower(), set()).add(record_id)
+                for token in tokenize(college.get('name')):
+                    self.by_token.setdefault(token, set()).add(record_id)
+
+        # Sorted vocabulary for prefix search on college names
+        self.vocabulary = sorted(self.by_token)
+
+        # (avg_package, id) ascending so min_package is a single bisect
+        self.packages = sorted(
+            (college.get('avg_package') or 0, record_id)
+            for record_id, college in enumerate(self.records)
+        )
+        self.package_values = [package for package, _ in self.packages]
+
+        # Record ids in each sort order plus the inverse (id -> position)
+        self.orders = {}
+        self.positions = {}
+        for sort, key in COLLEGE_SORT_KEYS.items():
+            order = sorted(range(len(self.records)), key=lambda record_id: key(self.records[record_id]))
+            positions = [0] * len(order)
+            for position, record_id in enumerate(order):
+                positions[record_id] = position
+            self.orders[sort] = order
+            self.positions[sort] = positions
+
+    @staticmethod
+    def _match_keys(index, needle):
+        """Union of ids whose index key contains `needle` (scans distinct keys only)"""
+        matched = set()
+        for key, record_ids in index.items():
+            if needle in key:
+                matched |= record_ids
+        return matched
+
+    def _match_name(self, q):
+        """Ids whose name has a word starting with every token of `q`"""
+        matched = None
+        for token in tokenize(q):
+            token_ids = set()
+            start = bisect_left(self.vocabulary, token)
+            for word in self.vocabulary[start:]:
+                if not word.startswith(token):
+                    break
+                token_ids |= self.by_token[word]
+            matched = token_ids if matched is None else matched & token_ids
+            if not matched:
+                break
+        return matched if matched is not None else set()
+
+    def query(self, category=None, q=None, location=None, entrance=None,
+              min_package=None, sort='rank', limit=None, after=None):
+        """Return (colleges, next_position, total) for the given filters.
+
+        `after` is the sort position of the last college already delivered;
+        `next_position` is the value to pass back for the following page, or
+        None when there are no more results.
+        """
+        filters = []
+        if category is not None:
+            filters.append(self.by_category.get(category, set()))
+        if q and q.strip():
+            filters.append(self._match_name(q))
+        if location and location.strip():
+            filters.append(self._match_keys(self.by_location, location.strip().lower()))
+        if entrance and entrance.strip():
+            filters.append(self._match_keys(self.by_entrance, entrance.strip().lower()))
+        if min_package is not None:
+            start = bisect_left(self.package_values, min_package)
+            filters.append({record_id for _, record_id in self.packages[start:]})
+
+        positions = self.positions[sort]
+        if filters:
+            filters.sort(key=len)
+            matched = set(filters[0]).intersection(*filters[1:])
+            ordered_positions = sorted(positions[record_id] for record_id in matched)
+        else:
+            ordered_positions = range(len(self.records))
+
+        total = len(ordered_positions)
+        start = 0 if after is None else bisect_right(ordered_positions, after)
+        end = total if limit is None else min(start + limit, total)
+        page_positions = ordered_positions[start:end]
+
+        order = self.orders[sort]
+        colleges = [self.records[order[position]] for position in page_positions]
+        next_position = page_positions[-1] if end < total and page_positions else None
+        return colleges, next_position, total
+
+
+def encode_college_cursor(sort, position):
+    """Opaque pagination cursor bound to the sort order it was issued for"""
+    return base64.urlsafe_b64encode(f'{sort}:{position}'.encode()).decode()
+
+
+def decode_college_cursor(cursor, sort):
+    """Inverse of encode_college_cursor; raises ValueError on a bad cursor"""
+    try:
+        cursor_sort, position = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        position = int(position)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort or position < 0:
+        raise ValueError('Cursor does not match the requested sort order')
+    return position
+
+
+def college_query_view(index, category, q, location, entrance, min_package, sort, limit, after):
+    """Run a college query against `index` and return (colleges, pagination headers)"""
+    colleges, next_position, total = index.query(
+        category=category,
+        q=q,
+        location=location,
+        entrance=entrance,
+        min_package=min_package,
+        sort=sort,
+        limit=limit,
+        after=after,
+    )
+    headers = {'X-Total-Count': str(total)}
+    if next_position is not None:
+        headers['X-Next-Cursor'] = encode_college_cursor(sort, next_position)
+    return colleges, headers
+
+
+# ==================== CATALOG RESPONSE CACHE ====================
+class CachedPayload:
+    """A response body rendered once, with its ETag and compressed variants"""
+
+    __slots__ = ('body', 'mimetype', 'etag', 'variants', 'headers')
+
+    def __init__(self, body, mimetype='application/json', headers=None):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.headers = headers or {}
+        self.variants = {}
+        compressed = gzip.compress(self.body, compresslevel=9)
+        if len(compressed) < len(self.body):
+            self.variants['gzip'] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(self.body)
+            if len(compressed) < len(self.body):
+                self.variants['br'] = compressed
+
+
+class ResponseCache:
+    """Bounded LRU of pre-serialized catalog views.
+
+    Views are built on first use (or warmed at startup) and served as bytes
+    until `clear()` is called after the underlying data changes.
+    """
+
+    def __init__(self, name, max_entries=256):
+        self.name = name
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return the cached payload for `key`, calling build() -> CachedPayload on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        if entry is not None:
+            metrics.inc('cache_requests_total', cache=self.name, result='hit')
+            return entry
+
+        metrics.inc('cache_requests_total', cache=self.name, result='miss')
+        entry = build()
+        with self.lock:
+            self.entries[key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def json_payload(data, headers=None):
+    """Serialize data exactly like jsonify() into a CachedPayload"""
+    return CachedPayload((app.json.dumps(data) + '\n').encode('utf-8'), headers=headers)
+
+
+def cached_response(entry):
+    """Serve a CachedPayload, answering If-None-Match with 304"""
+    encoding = request.accept_encodings.best_match(list(entry.variants) + ['identity'])
+    body = entry.variants.get(encoding)
+
+    if body is None:
+        response = app.response_class(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+    else:
+        response = app.response_class(body, mimetype=entry.mimetype)
+        response.headers['Content-Encoding'] = encoding
+        # Each encoding is a distinct representation and needs its own strong ETag
+        response.set_etag(f'{entry.etag}-{encoding}')
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, no-cache'
+    response.headers.update(entry.headers)
+    return response.make_conditional(request)
+
+
+catalog_cache = ResponseCache('catalog')
+
+
+def warm_catalog_cache(snapshot):
+    """Serialize the static catalog views so the first request is already a hit"""
+    catalog_cache.get(('skills', snapshot.version), lambda: json_payload(snapshot.skills))
+    catalog_cache.get(('careers', snapshot.version), lambda: json_payload(snapshot.careers))
+    for career, payload in snapshot.roadmaps.payloads.items():
+        catalog_cache.get(('roadmap', snapshot.version, career), lambda payload=payload: json_payload(payload))
+    default_query = (None, None, None, None, None, 'rank', None, None)
+    catalog_cache.get(
+        ('colleges', snapshot.version) + default_query,
+        lambda: json_payload(*college_query_view(snapshot.college_index, *default_query))
+    )
+
+
+# ==================== SEARCH ENGINE ====================
+SEARCH_TYPES = ('career', 'skill', 'college', 'scholarship')
+MAX_SEARCH_RESULTS = 50
+MAX_SUGGESTIONS = 10
+
+# BM25 parameters; title tokens are counted SEARCH_TITLE_WEIGHT times
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEARCH_TITLE_WEIGHT = 3
+
+# Score multipliers for query tokens matched by prefix or by a typo correction
+SEARCH_PREFIX_WEIGHT = 0.7
+SEARCH_FUZZY_WEIGHT = 0.5
+
+
+class SearchDocument:
+    __slots__ = ('doc_type', 'title', 'snippet', 'url', 'length')
+
+    def __init__(self, doc_type, title, snippet, url):
+        self.doc_type = doc_type
+        self.title = title
+        self.snippet = snippet
+        self.url = url
+        self.length = 0
+
+
+def career_slug(name):
+    """URL slug of a career name used by /roadmap/<career>: 'AI/ML Engineer' -> 'AI_ML_Engineer'"""
+    return re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_')
+
+
+def search_documents(snapshot):
+    """Yield (document, body text) for every searchable record of a catalog snapshot"""
+    for name, career in snapshot.careers.items():
+        body = ' '.join([career['description'], career['education'],
+                         ' '.join(career['skills_required']), ' '.join(career['companies'])])
+        yield SearchDocument('career', name, career['description'], f'/roadmap/{career_slug(name)}'), body
+
+    for name, skill in snapshot.skills.items():
+        snippet = f"{skill['difficulty']} · {skill['industry']}"
+        yield SearchDocument('skill', name, snippet, '/career_insights'), snippet
+
+    for category, colleges in snapshot.colleges.items():
+        for college in colleges:
+            details = [college.get('location'), college.get('entrance'), college.get('top_branch')]
+            snippet = ' · '.join(detail for detail in details if detail)
+            body = f"{snippet} {COLLEGE_TYPE_ALIASES.get(category, category)}"
+            yield SearchDocument('college', college['name'], snippet, '/college_finder'), body
+
+    for scholarship in snapshot.scholarships:
+        body = ' '.join([scholarship['organization'], scholarship['description'], scholarship['category'],
+                         scholarship['education_level'], scholarship['location']])
+        yield SearchDocument('scholarship', scholarship['name'], scholarship['description'], '/scholarships'), body
+
+
+def word_deletes(word):
+    """Every string obtained by deleting one character from `word`"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein distance, or limit + 1 once it exceeds `limit`"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    """BM25-ranked inverted index over careers, skills, colleges and scholarships.
+
+    Postings map each term to {doc id: weighted term frequency}. Query tokens
+    expand to exact, prefix (sorted vocabulary + bisect) and typo-tolerant
+    matches (one-delete neighbourhoods, verified with an edit distance), so a
+    query only touches the postings of the terms it resolves to.
+    """
+
+    def __init__(self, documents):
+        self.documents = []
+        self.postings = {}
+        self.title_postings = {}
+
+        for document, body in documents:
+            doc_id = len(self.documents)
+            self.documents.append(document)
+            frequencies = {}
+            for term in tokenize(document.title):
+                frequencies[term] = frequencies.get(term, 0) + SEARCH_TITLE_WEIGHT
+                self.title_postings.setdefault(term, set()).add(doc_id)
+            for term in tokenize(body):
+                frequencies[term] = frequencies.get(term, 0) + 1
+            document.length = sum(frequencies.values())
+            for term, frequency in frequencies.items():
+                self.postings.setdefault(term, {})[doc_id] = frequency
+
+        count = len(self.documents)
+        self.average_length = sum(document.length for document in self.documents) / max(count, 1)
+        self.idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        self.vocabulary = sorted(self.postings)
+        self.title_vocabulary = sorted(self.title_postings)
+
+        self.deletes = {}
+        for term in self.vocabulary:
+            for variant in word_deletes(term) | {term}:
+                self.deletes.setdefault(variant, set()).add(term)
+
+    @staticmethod
+    def _prefixed(vocabulary, prefix):
+        start = bisect_left(vocabulary, prefix)
+        end = bisect_left(vocabulary, prefix + '￿', start)
+        return vocabulary[start:end]
+
+    def _fuzzy(self, token):
+        """Vocabulary terms within one (short tokens) or two edits of `token`"""
+        limit = 1 if len(token) < 8 else 2
+        candidates = set()
+        for variant in word_deletes(token) | {token}:
+            candidates |= self.deletes.get(variant, set())
+        return [term for term in candidates if edit_distance(token, term, limit) <= limit]
+
+    def expand(self, token):
+        """Map a query token to {index term: match weight}"""
+        terms = {}
+        if len(token) >= 2:
+            for term in self._prefixed(self.vocabulary, token):
+                terms[term] = SEARCH_PREFIX_WEIGHT
+        if token in self.postings:
+            terms[token] = 1.0
+        if not terms and len(token) >= 4:
+            for term in self._fuzzy(token):
+                terms[term] = SEARCH_FUZZY_WEIGHT
+        return terms
+
+    def search(self, q, types=None, limit=10):
+        """Return [(document, score, matched terms)] best first"""
+        scores = {}
+        matched = {}
+        for token in dict.fromkeys(tokenize(q)):
+            token_scores = {}
+            for term, weight in self.expand(token).items():
+                idf = self.idf[term]
+                for doc_id, frequency in self.postings[term].items():
+                    if types and self.documents[doc_id].doc_type not in types:
+                        continue
+                    norm = 1 - BM25_B + BM25_B * self.documents[doc_id].length / self.average_length
+                    score = weight * idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+                    if score > token_scores.get(doc_id, 0):
+                        token_scores[doc_id] = score
+                    matched.setdefault(doc_id, set()).add(term)
+            # A token contributes its best-matching expansion to each document
+            for doc_id, score in token_scores.items():
+                scores[doc_id] = scores.get(doc_id, 0) + score
+
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.documents[doc_id], score, matched[doc_id]) for doc_id, score in ranked]
+
+    def suggest(self, q, limit=MAX_SUGGESTIONS):
+        """Titles containing every token of `q`, the last one as a prefix"""
+        tokens = tokenize(q)
+        if not tokens:
+            return []
+        candidates = None
+        for position, token in enumerate(tokens):
+            if position == len(tokens) - 1:
+                terms = self._prefixed(self.title_vocabulary, token)
+            else:
+                terms = [token] if token in self.title_postings else []
+            doc_ids = set()
+            for term in terms:
+                doc_ids |= self.title_postings[term]
+            candidates = doc_ids if candidates is None else candidates & doc_ids
+            if not candidates:
+                return []
+        ranked = sorted(candidates, key=lambda doc_id: (len(self.documents[doc_id].title), doc_id))
+        return [self.documents[doc_id] for doc_id in ranked[:limit]]
+
+
+def highlight_spans(text, terms):
+    """[start, end] offsets of the words in `text` that are among `terms`"""
+    return [[match.start(), match.end()] for match in re.finditer(r'[a-z0-9]+', text.lower())
+            if match.group() in terms]
+
+
+def search_view(index, q, types, limit):
+    """Ranked mixed-type results with highlight offsets for title and snippet"""
+    results = []
+    for document, score, terms in index.search(q, types=types, limit=limit):
+        results.append({
+            'type': document.doc_type,
+            'title': document.title,
+            'snippet': document.snippet,
+            'url': document.url,
+            'score': round(score, 4),
+            'highlights': {
+                'title': highlight_spans(document.title, terms),
+                'snippet': highlight_spans(document.snippet, terms),
+            },
+        })
+    return {'query': q, 'count': len(results), 'results': results}
+
+
+search_cache = ResponseCache('search', max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '1024')))
+
+
+# ==================== SKILL RECOMMENDATION ENGINE ====================
+# Share of each market signal in a skill's value (each signal is scaled to 0..1 across the catalog)
+SKILL_VALUE_WEIGHTS = (('demand', 0.4), ('growth_rate', 0.3), ('salary', 0.3))
+SKILL_DIFFICULTY_ORDER = {'Beginner': 0, 'Intermediate': 1, 'Advanced': 2}
+RECOMMENDED_CAREERS = 3
+LEARNING_PATH_LENGTH = 5
+
+SALARY_RANGE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)')
+
+
+def parse_salary_range(text):
+    """'₹5-35 LPA' -> (5.0, 35.0); (0.0, 0.0) when there is no range to read"""
+    match = SALARY_RANGE_PATTERN.search(text or '')
+    if match is None:
+        return 0.0, 0.0
+    return float(match.group(1)), float(match.group(2))
+
+
+def scale_to_unit(values):
+    top = values.max() if values.size else 0
+    return values / top if top > 0 else np.zeros_like(values)
+
+
+class SkillRecommender:
+    """Career x skill weight matrix that turns career matches into a learning path.
+
+    Row c holds the skills career c requires, each weighted by its market
+    value (demand, growth rate and salary, see SKILL_VALUE_WEIGHTS) and
+    normalised so the row sums to 1; the share of a row a user already holds
+    is their readiness for that career. Learning skill s moves a user along
+    career c's salary range by weights[c, s] of its span, so the expected
+    uplift is that step averaged over the user's top careers, weighted by
+    match score. A whole cohort is scored at once as (users x careers) and
+    (users x skills) array operations.
+    """
+
+    def __init__(self, careers, skills):
+        self.careers = list(careers)
+        self.skills = list(skills)
+        self.career_rows = {career: row for row, career in enumerate(self.careers)}
+        self.skill_columns = {skill.lower(): column for column, skill in enumerate(self.skills)}
+
+        signals = {
+            'demand': np.array([float(skills[skill].get('demand', 0)) for skill in self.skills]),
+            'growth_rate': np.array([float(skills[skill].get('growth_rate', 0)) for skill in self.skills]),
+            'salary': np.array([
+                (float(skills[skill].get('salary_min', 0)) + float(skills[skill].get('salary_max', 0))) / 2
+                for skill in self.skills
+            ]),
+        }
+        self.skill_value = sum(weight * scale_to_unit(signals[name]) for name, weight in SKILL_VALUE_WEIGHTS)
+        self.skills_difficulty = [skills[skill].get('difficulty', 'Intermediate') for skill in self.skills]
+        self.difficulty = np.array([SKILL_DIFFICULTY_ORDER.get(name, 1) for name in self.skills_difficulty])
+
+        self.required = np.zeros((len(self.careers), len(self.skills)))
+        for row, career in enumerate(self.careers):
+            for skill in careers[career].get('skills_required', []):
+                column = self.skill_columns.get(skill.lower())
+                if column is not None:
+                    self.required[row, column] = 1
+        weighted = self.required * self.skill_value
+        totals = weighted.sum(axis=1, keepdims=True)
+        self.weights = np.divide(weighted, totals, out=np.zeros_like(weighted), where=totals > 0)
+
+        ranges = np.array([parse_salary_range(careers[career].get('salary_range')) for career in self.careers])
+        ranges = ranges.reshape(len(self.careers), 2)
+        self.salary_min = ranges[:, 0]
+        self.salary_span = ranges[:, 1] - ranges[:, 0]
+
+    def encode_skills(self, skill_sets):
+        """Build the (users x skills) matrix of skills each user already has; unknown names are ignored"""
+        matrix = np.zeros((len(skill_sets), len(self.skills)))
+        for row, names in enumerate(skill_sets):
+            for name in names:
+                column = self.skill_columns.get(name.strip().lower())
+                if column is not None:
+                    matrix[row, column] = 1
+        return matrix
+
+    def align_scores(self, careers, scores):
+        """Reorder (users x `careers`) match scores into this recommender's career columns"""
+        aligned = np.zeros((scores.shape[0], len(self.careers)))
+        pairs = [(column, self.career_rows[career]) for column, career in enumerate(careers)
+                 if career in self.career_rows]
+        if pairs:
+            source, target = zip(*pairs)
+            aligned[:, list(target)] = scores[:, list(source)]
+        return aligned
+
+    def recommend(self, career_scores, skill_matrix, careers=RECOMMENDED_CAREERS, length=LEARNING_PATH_LENGTH):
+        """Learning path per user from (users x careers) match scores and (users x skills) held skills"""
+        # Keep each user's top careers, with match scores rescaled to weights summing to 1
+        top = np.argsort(-career_scores, axis=1, kind='stable')[:, :careers]
+        fit = np.zeros_like(career_scores, dtype=float)
+        np.put_along_axis(fit, top, np.take_along_axis(career_scores, top, axis=1), axis=1)
+        fit_totals = fit.sum(axis=1, keepdims=True)
+        fit = np.divide(fit, fit_totals, out=np.zeros_like(fit), where=fit_totals > 0)
+
+        missing = 1 - skill_matrix
+        readiness = skill_matrix @ self.weights.T
+        priority = (fit @ self.weights) * missing
+        uplift = ((fit * self.salary_span) @ self.weights) * missing
+        expected_salary = (fit * (self.salary_min + readiness * self.salary_span)).sum(axis=1)
+
+        # Take the highest-priority gaps, then order them from beginner to advanced
+        ranked = np.argsort(-priority, axis=1, kind='stable')[:, :length]
+        order = np.argsort(self.difficulty[ranked], axis=1, kind='stable')
+        paths = np.take_along_axis(ranked, order, axis=1)
+
+        # Gather and round every value the response needs as arrays, then convert to Python once
+        matches = np.take_along_axis(career_scores, top, axis=1).astype(int)
+        readiness = np.rint(np.take_along_axis(readiness, top, axis=1) * 100).astype(int).tolist()
+        path_priority = np.take_along_axis(priority, paths, axis=1)
+        keep = (path_priority > 0).tolist()
+        path_priority = np.round(path_priority, 3).tolist()
+        path_uplift = np.round(np.take_along_axis(uplift, paths, axis=1), 1).tolist()
+        # Same mask as the careers list: a 0% match is not one of the user's careers
+        needed = (self.required[top[:, :, None], paths[:, None, :]].astype(bool)
+                  & (matches > 0)[:, :, None]).transpose(0, 2, 1).tolist()
+        matches = matches.tolist()
+        expected_salary = np.round(expected_salary, 1).tolist()
+
+        results = []
+        for user, (career_rows, skill_columns) in enumerate(zip(top.tolist(), paths.tolist())):
+            results.append({
+                'careers': [
+                    {'name': self.careers[row], 'match': match, 'readiness': ready}
+                    for row, match, ready in zip(career_rows, matches[user], readiness[user]) if match > 0
+                ],
+                'expected_salary_lpa': expected_salary[user],
+                'learning_path': [
+                    {
+                        'skill': self.skills[column],
+                        'difficulty': self.skills_difficulty[column],
+                        'priority': path_priority[user][step],
+                        'salary_uplift_lpa': path_uplift[user][step],
+                        'for_careers': [self.careers[row] for row, need in zip(career_rows, needed[user][step]) if need],
+                    }
+                    for step, column in enumerate(skill_columns) if keep[user][step]
+                ],
+            })
+        return results
+
+
+# ==================== SCHOLARSHIP SERVICE ====================
+SCHOLARSHIP_DEADLINE_FORMATS = ('%d %b %Y', '%d %B %Y', '%Y-%m-%d')
+SCHOLARSHIP_STATUSES = ('all', 'open', 'closed')
+SCHOLARSHIP_REQUIRED_FIELDS = ('name', 'organization', 'description', 'category', 'education_level', 'location')
+# Optional JSON-lines file of extra listings, appended to by an importer and tailed by every worker
+SCHOLARSHIP_FEED_PATH = os.getenv('SCHOLARSHIP_FEED_PATH')
+SCHOLARSHIP_FEED_INTERVAL = float(os.getenv('SCHOLARSHIP_FEED_INTERVAL', '30'))  # seconds between feed checks
+# Listings without a deadline (rolling admissions) sort after every dated one
+NO_DEADLINE = date.max.toordinal()
+
+
+def parse_deadline(text):
+    """Date of a deadline such as '15 Nov 2025' (None when absent); raises ValueError"""
+    if text is None or not str(text).strip():
+        return None
+    for fmt in SCHOLARSHIP_DEADLINE_FORMATS:
+        try:
+            return datetime.strptime(str(text).strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'unrecognized deadline {text!r}')
+
+
+def utc_timestamp(seconds):
+    """ISO-8601 UTC timestamp of a POSIX time"""
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat(timespec='seconds')
+
+
+def validate_scholarship(listing):
+    """Check one listing's fields and deadline; raises CatalogError"""
+    if not isinstance(listing, dict) or not all(isinstance(listing.get(field), str)
+                                                for field in SCHOLARSHIP_REQUIRED_FIELDS):
+        raise CatalogError(f"scholarships must be objects with {', '.join(SCHOLARSHIP_REQUIRED_FIELDS)}")
+    try:
+        parse_deadline(listing.get('deadline'))
+        if listing.get('last_updated') is not None:
+            datetime.fromisoformat(listing['last_updated'])
+    except (TypeError, ValueError) as e:
+        raise CatalogError(f"scholarship {listing['name']!r}: {e}")
+
+
+def stamp_scholarship(listing, modified):
+    """Copy of a listing carrying its last_updated time (`modified` unless it has one)"""
+    listing = {field: value for field, value in listing.items() if field != 'days_left'}
+    updated = datetime.fromisoformat(listing['last_updated']) if listing.get('last_updated') else None
+    if updated is None:
+        listing['last_updated'] = utc_timestamp(modified)
+    elif updated.tzinfo is None:
+        listing['last_updated'] = updated.replace(tzinfo=timezone.utc).isoformat(timespec='seconds')
+    return listing
+
+
+class ScholarshipIndex:
+    """Scholarship listings in deadline order with category and level lookups.
+
+    Deadlines are parsed once here. A query bisects the deadline column for
+    the open/closed/closing-soon window and intersects it with precomputed
+    id sets, and `days_left` is computed against the date passed in.
+    """
+
+    def __init__(self, listings):
+        dated = sorted(((parse_deadline(listing.get('deadline')), listing) for listing in listings),
+                       key=lambda item: (item[0] or date.max, item[1]['name'].lower()))
+        self.records = [listing for _, listing in dated]
+        self.deadlines = [deadline.toordinal() if deadline else NO_DEADLINE for deadline, _ in dated]
+        self.by_category = {}
+        self.by_level = {}
+        for record_id, listing in enumerate(self.records):
+            self.by_category.setdefault(normalize_query_text(listing['category']), set()).add(record_id)
+            # 'Diploma/Degree' is listed under both levels
+            for level in listing['education_level'].split('/'):
+                self.by_level.setdefault(normalize_query_text(level), set()).add(record_id)
+        self.last_modified = max((datetime.fromisoformat(listing['last_updated']) for listing in self.records),
+                                 default=datetime.fromtimestamp(0, timezone.utc))
+        self.version = hashlib.sha256(json.dumps(self.records, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def view(self, record_id, today):
+        listing = dict(self.records[record_id])
+        deadline = self.deadlines[record_id]
+        if deadline == NO_DEADLINE:
+            listing.update(days_left=None, status='open')
+        else:
+            listing.update(days_left=max(deadline - today, 0), status='open' if deadline >= today else 'closed')
+        return listing
+
+    def query(self, today, category=None, education_level=None, status='all', closing_within=None):
+        """Listings matching the filters as of `today`, soonest deadline first"""
+        today = today.toordinal()
+        start, end = 0, len(self.records)
+        if status == 'open' or closing_within is not None:
+            start = bisect_left(self.deadlines, today)
+        elif status == 'closed':
+            end = bisect_left(self.deadlines, today)
+        if closing_within is not None:
+            end = bisect_right(self.deadlines, today + closing_within)
+
+        filters = []
+        if category is not None:
+            filters.append(self.by_category.get(category, set()))
+        if education_level is not None:
+            filters.append(self.by_level.get(education_level, set()) | self.by_level.get('any', set()))
+        if filters:
+            matched = set.intersection(*filters)
+            record_ids = sorted(record_id for record_id in matched if start <= record_id < end)
+        else:
+            record_ids = range(start, end)
+        return [self.view(record_id, today) for record_id in record_ids]
+
+    def headers(self, today):
+        """Last-Modified for a view computed on `today` (days_left changes at midnight)"""
+        midnight = datetime(today.year, today.month, today.day).astimezone()
+        return {'Last-Modified': http_date(max(self.last_modified, midnight))}
+
+
+class ScholarshipService:
+    """Catalog scholarships plus the listings ingested from SCHOLARSHIP_FEED_PATH.
+
+    The feed is read incrementally: each refresh parses only the complete
+    lines appended since the previous one, a listing with the same name and
+    organization replaces the earlier one, and a truncated or replaced file
+    is read again from the start. The combined index is rebuilt only when
+    the catalog snapshot or the feed changed.
+    """
+
+    def __init__(self, feed_path, interval):
+        self.feed_path = feed_path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.feed_listings = {}
+        self.feed_inode = None
+        self.feed_offset = 0
+        self.checked_at = None
+        self.catalog_version = None
+        self.index = None
+
+    def feed_due(self, now):
+        return self.feed_path is not None and (self.checked_at is None or now - self.checked_at >= self.interval)
+
+    def current(self, snapshot):
+        """Index over `snapshot`'s listings and the feed, checking the feed at most every `interval` seconds"""
+        if not self.feed_path:
+            return snapshot.scholarship_index
+        now = time.monotonic()
+        if not self.feed_due(now) and self.catalog_version == snapshot.version:
+            return self.index
+        with self.lock:
+            changed = False
+            if self.feed_due(now):
+                self.checked_at = now
+                changed = self.read_feed()
+            if changed or self.catalog_version != snapshot.version:
+                self.index = ScholarshipIndex(snapshot.scholarship_index.records + list(self.feed_listings.values()))
+                self.catalog_version = snapshot.version
+            return self.index
+
+    def read_feed(self):
+        """Ingest the lines appended to the feed; True when any listing changed"""
+        try:
+            stat = os.stat(self.feed_path)
+        except OSError:
+            return False
+        changed = False
+        if stat.st_ino != self.feed_inode or stat.st_size < self.feed_offset:
+            changed = bool(self.feed_listings)
+            self.feed_listings = {}
+            self.feed_inode = stat.st_ino
+            self.feed_offset = 0
+        if stat.st_size == self.feed_offset:
+            return changed
+
+        with open(self.feed_path, 'rb') as f:
+            f.seek(self.feed_offset)
+            data = f.read(stat.st_size - self.feed_offset)
+        # A partially written last line is picked up by the next refresh
+        data = data[:data.rfind(b'\n') + 1]
+        self.feed_offset += len(data)
+
+        ingested = 0
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                listing = json.loads(line)
+                validate_scholarship(listing)
+            except (ValueError, CatalogError) as e:
+                log_event('scholarships.feed_invalid', logging.WARNING, error=str(e))
+                continue
+            listing = stamp_scholarship(listing, stat.st_mtime)
+            self.feed_listings[(listing['name'], listing['organization'])] = listing
+            ingested += 1
+        if ingested:
+            log_event('scholarships.feed_ingested', listings=ingested, total=len(self.feed_listings))
+        return changed or ingested > 0
+
+
+scholarship_service = ScholarshipService(SCHOLARSHIP_FEED_PATH, SCHOLARSHIP_FEED_INTERVAL)
+
+
+# ==================== CAREER ROADMAPS ====================
+def roadmap_skill(name, skill):
+    """A skill as listed on a roadmap stage, with its catalog figures when known"""
+    if skill is None:
+        return {'name': name}
+    return {
+        'name': name,
+        'difficulty': skill.get('difficulty'),
+        'demand': skill.get('demand'),
+        'growth_rate': skill.get('growth_rate'),
+        'salary_range': f"₹{skill.get('salary_min', 0)}-{skill.get('salary_max', 0)} LPA",
+    }
+
+
+def build_roadmap(career, slug, details, skills, stages):
+    """Roadmap payload of one career.
+
+    The career's required skills are placed on the stage matching their
+    difficulty, stages can add skills of their own (leadership stages), and
+    the career's salary range is split evenly over all stages but the last,
+    which starts at the top of the range.
+    """
+    low, high = parse_salary_range(details['salary_range'])
+    required = details['skills_required']
+    by_difficulty = {}
+    for name in required:
+        by_difficulty.setdefault(skills.get(name, {}).get('difficulty', 'Intermediate'), []).append(name)
+
+    last = len(stages) - 1
+    step = (high - low) / max(last, 1)
+    roadmap_stages = []
+    for number, stage in enumerate(stages):
+        names = by_difficulty.get(stage.get('skill_difficulty'), []) + [
+            name for name in stage.get('skills', []) if name not in required
+        ]
+        if not high:
+            salary = None
+        elif number == last:
+            salary = f'₹{high:g}+ LPA'
+        else:
+            salary = f'₹{round(low + step * number):g}-{round(low + step * (number + 1)):g} LPA'
+        years_min, years_max = stage['years']
+        roadmap_stages.append({
+            'stage': number + 1,
+            'title': stage['title'],
+            'icon': stage.get('icon'),
+            'years': {'min': years_min, 'max': years_max},
+            'duration': (f'{years_min}-{years_max} Years Experience' if years_max is not None
+                         else f'{years_min}+ Years Experience'),
+            'description': stage['description'],
+            'responsibilities': stage['responsibilities'],
+            'skills': [roadmap_skill(name, skills.get(name)) for name in names],
+            'salary_range': salary,
+        })
+    return {
+        'career': career,
+        'slug': slug,
+        'description': details['description'],
+        'salary_range': details['salary_range'],
+        'education': details['education'],
+        'companies': details['companies'],
+        'stages': roadmap_stages,
+    }
+
+
+class RoadmapIndex:
+    """Per-career roadmap payloads and the slug <-> career index of one catalog snapshot"""
+
+    def __init__(self, careers, skills, stages):
+        self.slugs = {}  # career -> canonical slug
+        self.by_slug = {}  # canonical slug -> career
+        self.aliases = {}  # lowercased slug -> career, for links in other spellings
+        self.payloads = {}
+        for career, details in careers.items():
+            slug = career_slug(career)
+            self.slugs[career] = slug
+            self.by_slug[slug] = career
+            self.aliases[slug.lower()] = career
+            self.payloads[career] = build_roadmap(career, slug, details, skills, stages)
+
+    def resolve(self, text):
+        """Career named by a non-canonical slug ('data_scientist', 'Data Scientist'), or None"""
+        return self.aliases.get(career_slug(text).lower())
+
+
+# ==================== DATA CATALOG ====================
+CATALOG_DIR = os.getenv('CATALOG_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'catalog'))
+CATALOG_FILES = {
+    'colleges': 'colleges.json',
+    'skills': 'skills.json',
+    'careers': 'careers.json',
+    'scholarships': 'scholarships.json',
+    'roadmaps': 'roadmaps.json',
+}
+# Touched after an admin reload so every gunicorn worker's watcher picks it up
+CATALOG_RELOAD_MARKER = '.reload'
+CATALOG_WATCH_INTERVAL = float(os.getenv('CATALOG_WATCH_INTERVAL', '5'))  # seconds; 0 disables the watcher
+CATALOG_ADMIN_TOKEN = os.getenv('CATALOG_ADMIN_TOKEN')
+
+
+class CatalogError(Exception):
+    """The catalog files are missing or malformed"""
+
+
+def validate_catalog(data):
+    """Check the shape the routes and indexes rely on; raises CatalogError"""
+    if not isinstance(data['colleges'], dict) or not all(
+        isinstance(colleges, list) and all(isinstance(college, dict) and college.get('name') for college in colleges)
+        for colleges in data['colleges'].values()
+    ):
+        raise CatalogError('colleges must map categories to lists of named colleges')
+    if not isinstance(data['skills'], dict) or not all(isinstance(skill, dict) for skill in data['skills'].values()):
+        raise CatalogError('skills must map skill names to objects')
+    figures = ('demand', 'salary_min', 'salary_max', 'growth_rate')
+    if not all(
+        isinstance(skill.get(field, 0), (int, float)) for skill in data['skills'].values() for field in figures
+    ):
+        raise CatalogError(f"skill {', '.join(figures)} must be numbers")
+    required = ('description', 'salary_range', 'skills_required', 'education', 'companies')
+    if not isinstance(data['careers'], dict) or not all(
+        isinstance(career, dict) and all(field in career for field in required) for career in data['careers'].values()
+    ):
+        raise CatalogError(f"careers must map career names to objects with {', '.join(required)}")
+    if not all(
+        isinstance(career['skills_required'], list) and all(isinstance(skill, str) for skill in career['skills_required'])
+        for career in data['careers'].values()
+    ):
+        raise CatalogError('career skills_required must be a list of skill names')
+    if not isinstance(data['scholarships'], list):
+        raise CatalogError('scholarships must be a list')
+    for scholarship in data['scholarships']:
+        validate_scholarship(scholarship)
+    stages = data['roadmaps'].get('stages') if isinstance(data['roadmaps'], dict) else None
+    required = ('title', 'years', 'description', 'responsibilities')
+    if not isinstance(stages, list) or not stages or not all(
+        isinstance(stage, dict) and all(field in stage for field in required) for stage in stages
+    ):
+        raise CatalogError(f"roadmaps must have a list of stages with {', '.join(required)}")
+    for stage in stages:
+        years = stage['years']
+        if not (isinstance(years, list) and len(years) == 2 and isinstance(years[0], int)
+                and (years[1] is None or isinstance(years[1], int))):
+            raise CatalogError(f"roadmap stage {stage['title']!r}: years must be [start, end or null]")
+        if stage.get('skill_difficulty') not in (None, *SKILL_DIFFICULTY_ORDER):
+            raise CatalogError(f"roadmap stage {stage['title']!r}: unknown skill_difficulty")
+        unknown = [name for name in stage.get('skills', []) if name not in data['skills']]
+        if unknown:
+            raise CatalogError(f"roadmap stage {stage['title']!r}: unknown skills {', '.join(unknown)}")
+    slugs = {}
+    for career in data['careers']:
+        other = slugs.setdefault(career_slug(career).lower(), career)
+        if other != career:
+            raise CatalogError(f'careers {other!r} and {career!r} have the same URL slug')
+
+
+class Catalog:
+    """Immutable snapshot of the reference data plus every index derived from it.
+
+    Requests take one reference to the current snapshot and use it throughout,
+    so a reload (which builds a complete new snapshot and swaps a single
+    global) never shows a request half-old, half-new data.
+    """
+
+    __slots__ = ('version', 'loaded_at', 'colleges', 'skills', 'careers', 'scholarships',
+                 'college_index', 'search_index', 'recommender', 'scholarship_index', 'roadmaps')
+
+    def __init__(self, version, colleges, skills, careers, scholarships, roadmaps):
+        self.version = version
+        self.loaded_at = datetime.now().isoformat()
+        self.colleges = colleges
+        self.skills = skills
+        self.careers = careers
+        self.scholarships = scholarships
+        self.college_index = CollegeIndex(colleges)
+        self.search_index = SearchIndex(search_documents(self))
+        self.recommender = SkillRecommender(careers, skills)
+        self.scholarship_index = ScholarshipIndex(scholarships)
+        self.roadmaps = RoadmapIndex(careers, skills, roadmaps['stages'])
+
+    @classmethod
+    def load(cls, directory):
+        """Read, validate and index the catalog files in `directory`"""
+        digest = hashlib.sha256()
+        data = {}
+        modified = {}
+        for name, filename in CATALOG_FILES.items():
+            try:
+                with open(os.path.join(directory, filename), 'rb') as f:
+                    raw = f.read()
+                    modified[name] = os.fstat(f.fileno()).st_mtime
+                data[name] = json.loads(raw)
+            except (OSError, ValueError) as e:
+                raise CatalogError(f'{filename}: {e}')
+            digest.update(filename.encode() + b'\0' + raw)
+        validate_catalog(data)
+        data['scholarships'] = [stamp_scholarship(scholarship, modified['scholarships'])
+                                for scholarship in data['scholarships']]
+        return cls(digest.hexdigest()[:16], **data)
+
+    def counts(self):
+        return {
+            'colleges': len(self.college_index.records),
+            'skills': len(self.skills),
+            'careers': len(self.careers),
+            'scholarships': len(self.scholarships),
+            'roadmaps': len(self.roadmaps.payloads),
+        }
+
+
+def catalog_signature(directory):
+    """(file, mtime, size) of every catalog file plus the reload marker"""
+    signature = []
+    for filename in list(CATALOG_FILES.values()) + [CATALOG_RELOAD_MARKER]:
+        try:
+            stat = os.stat(os.path.join(directory, filename))
+            signature.append((filename, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append((filename, None, None))
+    return tuple(signature)
+
+
+catalog_lock = threading.Lock()
+
+
+def reload_catalog():
+    """Load a new snapshot and swap it in; the old one keeps serving if loading fails"""
+    global catalog
+    with catalog_lock:
+        snapshot = Catalog.load(CATALOG_DIR)
+        if snapshot.version == catalog.version:
+            return catalog, False
+        # Cache keys carry the version, so entries of the old snapshot are only dead weight
+        catalog = snapshot
+        catalog_cache.clear()
+        search_cache.clear()
+        warm_catalog_cache(snapshot)
+        return snapshot, True
+
+
+class CatalogWatcher:
+    """Polls the catalog directory and reloads this process's snapshot on change"""
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.pid = None
+        self.signature = None
+
+    def ensure_started(self):
+        """Start the thread once per process (workers fork after import)"""
+        if self.interval <= 0 or self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.signature = catalog_signature(self.directory)
+            threading.Thread(target=self.run, name='catalog-watcher', daemon=True).start()
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            signature = catalog_signature(self.directory)
+            if signature == self.signature:
+                continue
+            self.signature = signature
+            try:
+                snapshot, changed = reload_catalog()
+                if changed:
+                    log_event('catalog.reloaded', version=snapshot.version, counts=snapshot.counts())
+            except CatalogError as e:
+                log_event('catalog.reload_failed', logging.ERROR, version=catalog.version, error=str(e))
+
+
+if not HASHING_PROCESS:
+    catalog = Catalog.load(CATALOG_DIR)
+    warm_catalog_cache(catalog)
+catalog_watcher = CatalogWatcher(CATALOG_DIR, CATALOG_WATCH_INTERVAL)
+
+
+# ==================== QUIZ SCORING ENGINE ====================
+QUIZ_CAREERS = [
+    'Software Developer',
+    'Data Scientist',
+    'AI/ML Engineer',
+    'UX/UI Designer',
+    'Digital Marketing Specialist',
+    'Cybersecurity Expert',
+    'Product Manager',
+    'Cloud Architect',
+    'Business Analyst',
+    'Content Writer',
+]
+
+# question -> answer option -> points awarded per career
+QUIZ_SCORING_RULES = {
+    # Question 1: Type of work
+    'q1': {
+        'building_tech': {'Software Developer': 20, 'AI/ML Engineer': 15, 'Cloud Architect': 15},
+        'analyzing_data': {'Data Scientist': 20, 'Business Analyst': 15, 'Product Manager': 10},
+        'creating_visual': {'UX/UI Designer': 20, 'Digital Marketing Specialist': 10},
+        'communicating': {'Digital Marketing Specialist': 20, 'Content Writer': 15, 'Product Manager': 10},
+    },
+    # Question 2: Skill to develop
+    'q2': {
+        'programming': {'Software Developer': 15, 'AI/ML Engineer': 15, 'Cloud Architect': 15},
+        'data_analytics': {'Data Scientist': 15, 'Business Analyst': 15},
+        'creative_design': {'UX/UI Designer': 15},
+        'cybersecurity': {'Cybersecurity Expert': 20},
+    },
+    # Question 3: Work environment
+    'q3': {
+        'remote': dict.fromkeys(QUIZ_CAREERS, 5),
+    },
+    # Question 4: Subjects interest
+    'q4': {
+        'mathematics': {'Data Scientist': 10, 'AI/ML Engineer': 10},
+        'science_tech': {'Software Developer': 10, 'Cloud Architect': 10},
+        'arts_design': {'UX/UI Designer': 10},
+        'business': {'Business Analyst': 10, 'Product Manager': 10},
+    },
+}
+
+# Any other `q*` answer with one of these values adds a flat bonus to every career
+QUIZ_GENERIC_ANSWERS = frozenset(['yes', 'very', 'high'])
+QUIZ_GENERIC_POINTS = 2
+
+MAX_QUIZ_BATCH_SIZE = 10000
+
+
+class QuizScorer:
+    """Evaluates quiz scoring rules (QUIZ_SCORING_RULES) as a matrix product.
+
+    Each answer set is encoded as a feature vector (one column per
+    question/option pair plus a count of generic positive answers) and
+    multiplied by a precomputed feature x career weight matrix, so a batch of
+    answer sets is scored with a single matrix multiplication.
+    """
+
+    def __init__(self, rules, careers):
+        self.rules = rules
+        self.careers = careers
+        self.features = {}
+        for question, options in rules.items():
+            for option in options:
+                self.features[(question, option)] = len(self.features)
+        self.generic_feature = len(self.features)
+
+        self.weights = np.zeros((len(self.features) + 1, len(careers)), dtype=np.int64)
+        career_columns = {career: column for column, career in enumerate(careers)}
+        for (question, option), row in self.features.items():
+            for career, points in rules[question][option].items():
+                self.weights[row, career_columns[career]] = points
+        self.weights[self.generic_feature, :] = QUIZ_GENERIC_POINTS
+
+    def encode(self, answer_sets):
+        """Build the (answer sets x features) matrix"""
+        matrix = np.zeros((len(answer_sets), self.generic_feature + 1), dtype=np.int64)
+        for row, answers in enumerate(answer_sets):
+            for key, value in answers.items():
+                if not isinstance(value, str):
+                    continue
+                feature = self.features.get((key, value))
+                if feature is not None:
+                    matrix[row, feature] = 1
+                elif key.startswith('q') and key not in self.rules and value in QUIZ_GENERIC_ANSWERS:
+                    matrix[row, self.generic_feature] += 1
+        return matrix
+
+    def score(self, answer_sets):
+        """Return (raw scores, match percentages) arrays of shape (answer sets x careers)"""
+        scores = self.encode(answer_sets) @ self.weights
+        max_scores = scores.max(axis=1, keepdims=True)
+        percentages = np.minimum(((scores / (max_scores + 20)) * 100).astype(np.int64), 100)
+        percentages[max_scores[:, 0] <= 0] = 50
+        return scores, percentages
+
+    def top_careers(self, answer_sets, count=3):
+        """Return the top `count` (career, percentage) pairs for each answer set"""
+        _, percentages = self.score(answer_sets)
+        # Stable sort keeps declaration order for ties, matching sorted(..., reverse=True)
+        ranked = np.argsort(-percentages, axis=1, kind='stable')[:, :count]
+        ranked_percentages = np.take_along_axis(percentages, ranked, axis=1)
+        return [
+            [(self.careers[column], percentage) for column, percentage in zip(columns, row_percentages)]
+            for columns, row_percentages in zip(ranked.tolist(), ranked_percentages.tolist())
+        ]
+
+
+def describe_top_careers(top_careers):
+    """Attach career details to scored (career, percentage) pairs"""
+    careers = catalog.careers
+    return [
+        {
+            'name': career,
+            'score': score,
+            'description': careers.get(career, {}).get('description', ''),
+            'salary': careers.get(career, {}).get('salary_range', 'N/A'),
+            'skills': careers.get(career, {}).get('skills_required', []),
+            'slug': career_slug(career)
+        }
+        for career, score in top_careers
+    ]
+
+
+quiz_scorer = QuizScorer(QUIZ_SCORING_RULES, QUIZ_CAREERS)
+
+
+def profile_error(profile):
+    """Validate a recommendation profile; returns an error message or None"""
+    if not isinstance(profile, dict):
+        return 'Each profile must be an object'
+    if 'answers' in profile:
+        if not isinstance(profile['answers'], dict):
+            return 'answers must be an object'
+    elif isinstance(profile.get('career_scores'), dict):
+        if not all(isinstance(score, (int, float)) for score in profile['career_scores'].values()):
+            return 'career_scores must map career names to numbers'
+    else:
+        return 'Provide quiz answers or career_scores'
+    skills = profile.get('skills', [])
+    if not isinstance(skills, list) or not all(isinstance(skill, str) for skill in skills):
+        return 'skills must be a list of skill names'
+    return None
+
+
+def recommend_learning_paths(recommender, profiles):
+    """Learning paths for validated profiles, scored as one batch.
+
+    Profiles with quiz `answers` are scored together by quiz_scorer; explicit
+    `career_scores` (career name -> match percentage) are used as given.
+    """
+    scores = np.zeros((len(profiles), len(recommender.careers)))
+    quiz_rows = [row for row, profile in enumerate(profiles) if 'answers' in profile]
+    if quiz_rows:
+        _, percentages = quiz_scorer.score([profiles[row]['answers'] for row in quiz_rows])
+        scores[quiz_rows] = recommender.align_scores(quiz_scorer.careers, percentages)
+    for row, profile in enumerate(profiles):
+        if 'answers' not in profile:
+            career_scores = profile['career_scores']
+            values = np.array([list(career_scores.values())], dtype=float).reshape(1, len(career_scores))
+            scores[row] = recommender.align_scores(list(career_scores), values)[0]
+    skills = recommender.encode_skills([profile.get('skills', []) for profile in profiles])
+    return recommender.recommend(scores, skills)
+
+
+# ==================== QUIZ ANALYTICS ====================
+QUIZ_ANALYTICS_DEFAULT_DAYS = 30
+
+
+def analytics_days(days):
+    """The last `days` ISO days, oldest first, ending today"""
+    today = date.today()
+    return [(today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+
+
+def score_bucket_label(bucket):
+    bucket = int(bucket)
+    upper = 100 if bucket + QUIZ_SCORE_BUCKET >= 100 else bucket + QUIZ_SCORE_BUCKET - 1
+    return f'{bucket}-{upper}'
+
+
+def career_popularity(days):
+    """Quizzes per day, first choices per career per day and totals per career"""
+    window = analytics_days(days)
+    daily = {day: {'day': day, 'quizzes': 0, 'top': {}} for day in window}
+    totals = {}
+    for day, career, count in storage.get_quiz_aggregates('top', window[0]):
+        if day in daily:
+            daily[day]['top'][career] = count
+            daily[day]['quizzes'] += count
+            totals.setdefault(career, {'career': career, 'top': 0, 'matched': 0})['top'] += count
+    for day, career, count in storage.get_quiz_aggregates('match', window[0]):
+        if day in daily:
+            totals.setdefault(career, {'career': career, 'top': 0, 'matched': 0})['matched'] += count
+    return {
+        'since': window[0],
+        'quizzes': sum(entry['quizzes'] for entry in daily.values()),
+        'careers': sorted(totals.values(), key=lambda total: (-total['top'], -total['matched'], total['career'])),
+        'daily': list(daily.values()),
+    }
+
+
+def score_distribution(days, career=None):
+    """Histogram of match percentages per career (10-point buckets)"""
+    window = analytics_days(days)
+    labels = [score_bucket_label(bucket) for bucket in range(0, 100, QUIZ_SCORE_BUCKET)]
+    histograms = {}
+    for _, key, count in storage.get_quiz_aggregates('score', window[0]):
+        name, bucket = key.rsplit('|', 1)
+        if career is not None and name != career:
+            continue
+        histogram = histograms.setdefault(name, dict.fromkeys(labels, 0))
+        histogram[score_bucket_label(bucket)] += count
+    return {'since': window[0], 'careers': histograms}
+
+
+def cohort_breakdown(days):
+    """First-choice careers of the quizzes taken by each signup-month cohort"""
+    window = analytics_days(days)
+    cohorts = {}
+    for _, key, count in storage.get_quiz_aggregates('cohort', window[0]):
+        cohort, career = key.split('|', 1)
+        entry = cohorts.setdefault(cohort, {'cohort': cohort, 'quizzes': 0, 'top': {}})
+        entry['quizzes'] += count
+        entry['top'][career] = entry['top'].get(career, 0) + count
+    return {'since': window[0], 'cohorts': [cohorts[cohort] for cohort in sorted(cohorts)]}
+
+
+# ==================== DATA EXPORT ====================
+EXPORT_ADMIN_TOKEN = os.getenv('EXPORT_ADMIN_TOKEN')
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+EXPORT_CHUNK_BYTES = 64 * 1024  # encoded rows are sent (and compressed) in chunks of about this size
+
+
+class CSVEcho:
+    """File-like target that hands back what csv.writer writes instead of buffering it"""
+
+    def write(self, value):
+        return value
+
+
+def export_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def export_stream(dataset, rows, fields, export_format, compress=False):
+    """Encode `rows` as CSV or NDJSON chunks, gzip-compressed on the fly when `compress` is set.
+
+    Rows are pulled from the storage generator as the client reads, so
+    memory stays bounded by one storage batch and one chunk however many
+    rows are exported.
+    """
+    started = time.perf_counter()
+    count = 0
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # 31: gzip container
+
+    def encoded():
+        nonlocal count
+        if export_format == 'csv':
+            writer = csv.writer(CSVEcho())
+            yield writer.writerow(fields)
+            for row in rows:
+                count += 1
+                yield writer.writerow([export_cell(row[field]) for field in fields])
+        else:
+            for row in rows:
+                count += 1
+                yield json.dumps(row, ensure_ascii=False) + '\n'
+
+    def chunks():
+        pending = []
+        size = 0
+        for line in encoded():
+            pending.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_BYTES:
+                yield ''.join(pending).encode('utf-8')
+                pending, size = [], 0
+        if pending:
+            yield ''.join(pending).encode('utf-8')
+
+    try:
+        for chunk in chunks():
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor is not None:
+            yield compressor.flush()
+    except Exception as e:
+        # Headers are already sent, so the client only sees a truncated file
+        log_event('export.failed', logging.ERROR, dataset=dataset, rows=count, error=str(e))
+        raise
+    metrics.inc('export_rows_total', count, dataset=dataset)
+    log_event('export.finished', dataset=dataset, format=export_format, rows=count,
+              duration_ms=round((time.perf_counter() - started) * 1000, 1))
+
+
+def export_time_bound(name):
+    """Naive local ISO timestamp from the `name` query parameter (None when absent).
+
+    Stored timestamps are naive local time compared as strings, so a bound
+    with a UTC offset is converted to local time and the offset dropped.
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        bound = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO date or timestamp')
+    if bound.tzinfo is not None:
+        bound = bound.astimezone().replace(tzinfo=None)
+    return bound.isoformat()
+
+
+# ==================== OUTBOUND HTTP ====================
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv('UPSTREAM_MAX_CONCURRENCY', '200'))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv('UPSTREAM_QUEUE_TIMEOUT', '10'))
+
+
+class UpstreamBusy(Exception):
+    """No upstream call slot became free within the queue timeout"""
+
+
+class UpstreamClient:
+    """Shared HTTP client for the OpenRouter and Web3Forms calls.
+
+    A per-worker keep-alive pool replaces a fresh TCP/TLS handshake per call,
+    and a semaphore bounds how many upstream calls a worker has in flight.
+    Under the gevent worker class (see gunicorn.conf.py) these blocking calls
+    yield to other requests, so one worker can hold hundreds of them at once.
+    """
+
+    def __init__(self, max_concurrency, queue_timeout):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.pid = None
+        self._session = None
+
+    @property
+    def session(self):
+        """Keep-alive session, created on first use in each worker (never shared across a fork)"""
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+                    self.pid = os.getpid()
+        return self._session
+
+    def acquire(self, service='upstream'):
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            metrics.inc('upstream_rejected_total', service=service)
+            raise UpstreamBusy('Too many upstream requests in flight, please try again shortly')
+
+    def release(self):
+        self.slots.release()
+
+    def _send(self, service, mode, url, **kwargs):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = self.session.post(url, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            metrics.observe('upstream_request_duration_seconds', time.perf_counter() - started,
+                            service=service, mode=mode)
+            metrics.inc('upstream_requests_total', service=service, status=status)
+
+    def post(self, url, service='upstream', **kwargs):
+        """POST while holding a concurrency slot for the whole call"""
+        self.acquire(service)
+        try:
+            return self._send(service, 'request', url, **kwargs)
+        finally:
+            self.release()
+
+    def open_stream(self, url, service='upstream', **kwargs):
+        """POST with stream=True; the caller must release() once the response is closed"""
+        self.acquire(service)
+        try:
+            return self._send(service, 'stream', url, stream=True, **kwargs)
+        except Exception:
+            self.release()
+            raise
+
+
+upstream = UpstreamClient(UPSTREAM_MAX_CONCURRENCY, UPSTREAM_QUEUE_TIMEOUT)
+
+
+# ==================== CHAT RESPONSE CACHE ====================
+CHAT_CACHE_STOPWORDS = frozenset([
+    'a', 'an', 'the', 'i', 'me', 'my', 'you', 'your', 'to', 'do', 'does', 'is', 'are', 'am', 'be',
+    'for', 'of', 'in', 'on', 'and', 'or', 'can', 'should', 'what', 'which', 'how', 'please', 'tell',
+    'about', 'some', 'with', 'it', 'as', 'at', 'from',
+])
+
+
+class ChatCacheEntry:
+    __slots__ = ('answer', 'expires_at', 'terms', 'bands', 'size')
+
+    def __init__(self, answer, expires_at, terms, bands):
+        self.answer = answer
+        self.expires_at = expires_at
+        self.terms = terms
+        self.bands = bands
+        self.size = len(answer.encode('utf-8'))
+
+
+class ChatResponseCache:
+    """LRU cache of chatbot answers keyed on normalized message text.
+
+    Exact lookups use the lowercased, punctuation-free message. When
+    `similarity` is above zero, a MinHash/LSH tier also serves a cached answer
+    for a near-duplicate question: messages sharing an LSH band are candidates
+    and the answer is reused only if the Jaccard similarity of their content
+    words reaches the threshold. Entries expire after `ttl` seconds and the
+    least recently used ones are evicted beyond `max_entries` or `max_bytes`.
+    """
+
+    NUM_HASHES = 32
+    BAND_ROWS = 4
+
+    def __init__(self, ttl, max_entries, max_bytes, similarity):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.similarity = similarity
+        self.entries = OrderedDict()
+        self.band_index = {}
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'similar_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    @staticmethod
+    def normalize(message):
+        return ' '.join(tokenize(message))
+
+    def signature_bands(self, terms):
+        """LSH band keys of the MinHash signature of a term set"""
+        if not terms:
+            return ()
+        signature = [
+            min(zlib.crc32(f'{seed}:{term}'.encode()) for term in terms)
+            for seed in range(self.NUM_HASHES)
+        ]
+        return tuple(
+            (start, tuple(signature[start:start + self.BAND_ROWS]))
+            for start in range(0, self.NUM_HASHES, self.BAND_ROWS)
+        )
+
+    def get(self, message):
+        """Return a cached answer for `message`, or None"""
+        key = self.normalize(message)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(key)
+                self.stats['expirations'] += 1
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry.answer
+
+            if self.similarity > 0:
+                similar_key = self._find_similar(key, now)
+                if similar_key is not None:
+                    self.entries.move_to_end(similar_key)
+                    self.stats['similar_hits'] += 1
+                    return self.entries[similar_key].answer
+
+            self.stats['misses'] += 1
+            return None
+
+    def _find_similar(self, key, now):
+        terms = frozenset(key.split()) - CHAT_CACHE_STOPWORDS
+        candidates = set()
+        for band in self.signature_bands(terms):
+            candidates |= self.band_index.get(band, set())
+
+        best_key, best_score = None, self.similarity
+        for candidate in candidates:
+            entry = self.entries[candidate]
+            if entry.expires_at <= now:
+                continue
+            score = len(terms & entry.terms) / len(terms | entry.terms)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
+
+    def put(self, message, answer):
+        key = self.normalize(message)
+        terms = frozenset(key.split()) - CHAT_CACHE_STOPWORDS
+        entry = ChatCacheEntry(answer, time.time() + self.ttl, terms, self.signature_bands(terms))
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = entry
+            self.total_bytes += entry.size
+            for band in entry.bands:
+                self.band_index.setdefault(band, set()).add(key)
+            while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                self._remove(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry.size
+        for band in entry.bands:
+            keys = self.band_index[band]
+            keys.discard(key)
+            if not keys:
+                del self.band_index[band]
+
+    def snapshot(self):
+        """Counters plus current size, for monitoring"""
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['similar_hits'] + self.stats['misses']
+            return dict(
+                self.stats,
+                entries=len(self.entries),
+                bytes=self.total_bytes,
+                hit_ratio=(lookups - self.stats['misses']) / lookups if lookups else 0.0,
+            )
+
+
+chat_cache = ChatResponseCache(
+    ttl=int(os.getenv('CHAT_CACHE_TTL', '86400')),
+    max_entries=int(os.getenv('CHAT_CACHE_MAX_ENTRIES', '1000')),
+    max_bytes=int(os.getenv('CHAT_CACHE_MAX_BYTES', str(8 * 1024 * 1024))),
+    similarity=float(os.getenv('CHAT_CACHE_SIMILARITY', '0.8')),
+)
+
+
+def chat_cache_metrics():
+    stats = chat_cache.snapshot()
+    return [
+        ('counter', 'cache_requests_total', {'cache': 'chat', 'result': 'hit'}, stats['hits']),
+        ('counter', 'cache_requests_total', {'cache': 'chat', 'result': 'similar_hit'}, stats['similar_hits']),
+        ('counter', 'cache_requests_total', {'cache': 'chat', 'result': 'miss'}, stats['misses']),
+        ('counter', 'chat_cache_evictions_total', {}, stats['evictions']),
+        ('counter', 'chat_cache_expirations_total', {}, stats['expirations']),
+        ('gauge', 'chat_cache_entries', {}, stats['entries']),
+        ('gauge', 'chat_cache_bytes', {}, stats['bytes']),
+    ]
+
+
+metrics.collectors.append(chat_cache_metrics)
+
+
+# ==================== CHAT CONVERSATIONS ====================
+CHAT_HISTORY_TOKENS = int(os.getenv('CHAT_HISTORY_TOKENS', '2000'))
+CHAT_SUMMARY_TOKENS = int(os.getenv('CHAT_SUMMARY_TOKENS', '400'))
+CHAT_MESSAGE_TOKENS = int(os.getenv('CHAT_MESSAGE_TOKENS', '1000'))
+CHAT_CONVERSATION_IDLE = int(os.getenv('CHAT_CONVERSATION_IDLE', '86400'))  # seconds
+
+CHAT_SYSTEM_PROMPT = (
+    "You are a professional career guidance counselor assistant for Indian students and "
+    "professionals. Give clear, practical, step-by-step advice about careers, skills, "
+    "education paths, colleges, and job search. Keep answers structured and easy to follow."
+)
+
+# Stand-in for the model tokenizer: words split into pieces of up to four
+# characters, plus punctuation. Close enough to size prompts against a budget.
+TOKEN_PATTERN = re.compile(r'\w{1,4}|[^\w\s]')
+
+
+def count_tokens(text):
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def truncate_tokens(text, limit):
+    """Cut `text` after at most `limit` tokens at a word boundary, marking the cut with an ellipsis"""
+    for index, match in enumerate(TOKEN_PATTERN.finditer(text)):
+        if index == limit:
+            head = text[:match.start()]
+            if head[-1:].isalnum() and match.group()[0].isalnum():
+                head = head.rsplit(None, 1)[0] if len(head.split()) > 1 else head  # don't split a word
+            return head.rstrip() + '…'
+    return text
+
+
+class ConversationMemory:
+    """Server-side chat history with a token-bounded prompt.
+
+    Each conversation keeps a rolling summary plus its recent turns verbatim.
+    When the turns pass `history_tokens`, the oldest ones are folded into the
+    summary until half the budget is free again. Folding in blocks rather
+    than one turn at a time keeps the prompt prefix (system prompt, summary,
+    earlier turns) byte-identical across consecutive requests, so upstream
+    prompt caching keeps hitting. The summary is extractive (each folded
+    question and the opening of its answer), so folding costs no model call;
+    its oldest lines are dropped beyond `summary_tokens`.
+    """
+
+    QUESTION_TOKENS = 60
+    ANSWER_TOKENS = 40
+
+    def __init__(self, system_prompt, history_tokens, summary_tokens, idle_seconds, prune_probability=0.01):
+        self.system_prompt = system_prompt
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.idle_seconds = idle_seconds
+        self.prune_probability = prune_probability
+
+    def messages(self, conversation_id, user_message):
+        """Prompt for the next turn: system prompt, summary, recent turns, then the new message"""
+        conversation = storage.get_conversation(conversation_id) or {'summary': '', 'turns': []}
+        messages = [{'role': 'system', 'content': self.system_prompt}]
+        if conversation['summary']:
+            messages.append({
+                'role': 'system',
+                'content': 'Summary of the earlier conversation:\n' + conversation['summary'],
+            })
+        messages.extend({'role': turn['role'], 'content': turn['content']} for turn in conversation['turns'])
+        messages.append({'role': 'user', 'content': user_message})
+        return messages
+
+    def record(self, conversation_id, user_message, answer):
+        storage.append_chat_turns(conversation_id, [
+            ('user', user_message, count_tokens(user_message)),
+            ('assistant', answer, count_tokens(answer)),
+        ])
+        self.compact(conversation_id)
+        if random.random() < self.prune_probability:
+            removed = storage.prune_conversations(time.time() - self.idle_seconds)
+            if removed:
+                log_event('chat.conversations_pruned', removed=removed)
+
+    def compact(self, conversation_id):
+        conversation = storage.get_conversation(conversation_id)
+        turns = conversation['turns']
+        total = sum(turn['tokens'] for turn in turns)
+        if total <= self.history_tokens:
+            return
+        folded = []
+        # Fold down to half the budget, and never leave an answer without its question
+        while turns and (total > self.history_tokens // 2 or turns[0]['role'] != 'user'):
+            turn = turns.pop(0)
+            total -= turn['tokens']
+            folded.append(turn)
+        summary = self.summarize(conversation['summary'], folded)
+        storage.fold_chat_turns(conversation_id, folded[-1]['id'], conversation['summary'], summary)
+
+    def summarize(self, summary, turns):
+        lines = summary.splitlines() if summary else []
+        for turn in turns:
+            text = ' '.join(turn['content'].split())
+            if turn['role'] == 'user':
+                lines.append('- User asked: ' + truncate_tokens(text, self.QUESTION_TOKENS))
+            else:
+                first_sentence = re.split(r'(?<=[.!?:])\s', text, maxsplit=1)[0]
+                lines.append('  Advisor: ' + truncate_tokens(first_sentence, self.ANSWER_TOKENS))
+        while lines and (count_tokens('\n'.join(lines)) > self.summary_tokens or lines[0].startswith(' ')):
+            lines.pop(0)
+        return '\n'.join(lines)
+
+    def clear(self, conversation_id):
+        storage.delete_conversation(conversation_id)
+
+
+conversation_memory = ConversationMemory(
+    CHAT_SYSTEM_PROMPT, CHAT_HISTORY_TOKENS, CHAT_SUMMARY_TOKENS, CHAT_CONVERSATION_IDLE
+)
+
+
+# ==================== CHAT STREAMING ====================
+def sse_event(data, event=None):
+    """Format one server-sent event frame"""
+    prefix = f'event: {event}\n' if event else ''
+    return f'{prefix}data: {json.dumps(data)}\n\n'
+
+
+def iter_completion_deltas(response):
+    """Yield content deltas from an OpenAI-compatible `stream: true` response"""
+    for line in response.iter_lines():
+        # Skip blank separators and ': keep-alive' comment lines
+        if not line.startswith(b'data:'):
+            continue
+        chunk = line[5:].strip()
+        if chunk == b'[DONE]':
+            return
+        choices = json.loads(chunk).get('choices') or []
+        if choices:
+            delta = (choices[0].get('delta') or {}).get('content')
+            if delta:
+                yield delta
+
+
+def stream_chat_response(api_url, headers, payload, on_complete=None, on_close=None):
+    """Relay an upstream streaming completion to the browser as server-sent events.
+
+    The upstream request is opened before responding so connection errors and
+    non-200 statuses still produce a normal JSON error response. `on_complete`
+    receives the full answer once the stream finishes; `on_close` runs once
+    the upstream response is closed, whether the stream finished or not.
+    """
+    response = upstream.open_stream(
+        api_url, service='openrouter', headers=headers, json=dict(payload, stream=True), timeout=30
+    )
+    if response.status_code != 200:
+        error_text = response.text
+        response.close()
+        upstream.release()
+        if on_close is not None:
+            on_close()
+        return jsonify({
+            'error': f'API request failed with status {response.status_code}: {error_text}',
+            'success': False,
+        }), response.status_code
+
+    def generate():
+        try:
+            answer = []
+            for delta in iter_completion_deltas(response):
+                answer.append(delta)
+                yield sse_event({'delta': delta})
+            if on_complete is not None and answer:
+                on_complete(''.join(answer))
+            yield sse_event({'success': True}, event='done')
+        except requests.exceptions.RequestException as e:
+            yield sse_event({'error': f'Network error: {str(e)}', 'success': False}, event='error')
+
+    def close_upstream():
+        response.close()
+        upstream.release()
+        if on_close is not None:
+            on_close()
+
+    # call_on_close also runs when the client disconnects before the first chunk
+    stream = app.response_class(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    stream.call_on_close(close_upstream)
+    return stream
+
+
+def stream_cached_answer(answer):
+    """Replay a cached answer in the same event format as a live stream"""
+    events = sse_event({'delta': answer}) + sse_event({'success': True, 'cached': True}, event='done')
+    return app.response_class(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+# ==================== RESUME RENDERING ====================
+RESUME_THEMES = ('classic', 'modern')
+RESUME_FORMATS = ('html', 'pdf')
+
+# Resume fields and the placeholder shown when a field is missing from the request
+RESUME_FIELDS = {
+    'name': 'Your Name',
+    'email': 'email@example.com',
+    'phone': '+91-XXXXXXXXXX',
+    'location': 'City, State',
+    'summary': 'Passionate professional with expertise in multiple domains.',
+    'education': 'B.Tech Computer Science',
+    'university': 'University Name',
+    'graduation_year': '2024',
+    'job_title': 'Your Job Title',
+    'company': 'Company Name',
+    'employment_period': 'Jan 2023 - Present',
+    'job_description': 'Describe your key responsibilities and achievements.',
+    'project_name': 'Project Name',
+    'project_description': 'Project description and technologies used.',
+}
+
+
+def normalize_resume(data):
+    """Canonical resume: known fields only, strings stripped, placeholders for missing fields"""
+    resume = {}
+    for field, placeholder in RESUME_FIELDS.items():
+        value = data.get(field, placeholder)
+        resume[field] = str(value).strip() if value is not None else ''
+    skills = data.get('skills') or []
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    resume['skills'] = [str(skill).strip() for skill in skills if str(skill).strip()]
+    return resume
+
+
+def resume_cache_key(resume, theme, fmt):
+    """Content address of a rendered resume"""
+    digest = hashlib.sha256(json.dumps(resume, sort_keys=True).encode('utf-8')).hexdigest()
+    return digest, theme, fmt
+
+
+def resume_filename(name, extension):
+    stem = re.sub(r'[^A-Za-z0-9_.-]', '', (name or '').strip().replace(' ', '_')) or 'resume'
+    return f'{stem}_resume.{extension}'
+
+
+def render_resume(resume, theme, fmt):
+    """Render a normalized resume with a compiled theme template (autoescaped)"""
+    html = app.jinja_env.get_template(f'resumes/{theme}.html').render(resume=resume)
+    headers = {'Cache-Control': 'private, no-cache'}
+    if fmt == 'pdf':
+        from weasyprint import HTML
+        return CachedPayload(HTML(string=html).write_pdf(), mimetype='application/pdf', headers=headers)
+    return CachedPayload(html.encode('utf-8'), mimetype='text/html', headers=headers)
+
+
+# Compile every theme once at startup; Jinja keeps the compiled templates
+for _theme in RESUME_THEMES:
+    app.jinja_env.get_template(f'resumes/{_theme}.html')
+
+resume_cache = ResponseCache('resume', max_entries=int(os.getenv('RESUME_CACHE_MAX_ENTRIES', '512')))
+
+
+# ==================== PAGE RENDER CACHE ====================
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '256'))
+TEMPLATE_CHECK_INTERVAL = float(os.getenv('TEMPLATE_CHECK_INTERVAL', '2'))
+
+
+def folder_signature(folder, skip=None):
+    """(signature, newest mtime) of every file under `folder`, leaving out the `skip` subfolder"""
+    signature = []
+    skip = os.path.join(folder, skip) if skip else None
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != skip]
+        for filename in files:
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature.append((os.path.relpath(path, folder), stat.st_mtime_ns, stat.st_size))
+    signature.sort()
+    newest = max((mtime for _, mtime, _ in signature), default=0)
+    return tuple(signature), newest / 1e9
+
+
+class PageCache:
+    """Rendered HTML pages, served as bytes without running Jinja.
+
+    Page templates only read the route parameters and, through base.html,
+    whether someone is logged in and their name, so those make up the key.
+    At most every `check_interval` seconds a request re-stats the template
+    files; if any changed, the rendered pages and Jinja's compiled templates
+    are dropped so the next request renders the new version.
+    """
+
+    def __init__(self, folder, max_entries, check_interval):
+        self.folder = folder
+        self.check_interval = check_interval
+        self.pages = ResponseCache('page', max_entries=max_entries)
+        self.lock = threading.Lock()
+        self.signature, self.last_modified = folder_signature(folder)
+        self.checked_at = time.monotonic()
+
+    def check_templates(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return
+        with self.lock:
+            if now - self.checked_at < self.check_interval:
+                return
+            self.checked_at = now
+            signature, last_modified = folder_signature(self.folder)
+            if signature == self.signature:
+                return
+            self.signature, self.last_modified = signature, last_modified
+            if app.jinja_env.cache is not None:
+                app.jinja_env.cache.clear()
+            self.pages.clear()
+        log_event('templates.changed', last_modified=datetime.fromtimestamp(last_modified).isoformat())
+
+    def render(self, template, **context):
+        """Serve `template` rendered with `context`, from the cache when possible"""
+        self.check_templates()
+        if static_assets.check():
+            self.pages.clear()  # the pages link to the old asset names
+        user = session.get('user_name') if session.get('user_email') else None
+        key = (template, tuple(sorted(context.items())), user)
+
+        def build():
+            headers = {'Last-Modified': http_date(self.last_modified)}
+            if user is not None:
+                headers['Cache-Control'] = 'private, no-cache'
+            return CachedPayload(render_template(template, **context).encode('utf-8'),
+                                 mimetype='text/html', headers=headers)
+
+        return cached_response(self.pages.get(key, build))
+
+
+page_cache = PageCache(os.path.join(app.root_path, app.template_folder),
+                       PAGE_CACHE_MAX_ENTRIES, TEMPLATE_CHECK_INTERVAL)
+
+
+# ==================== STATIC ASSETS ====================
+ASSET_PIPELINE = os.getenv('ASSET_PIPELINE', 'true').lower() == 'true'
+ASSET_BUILD_DIR = 'dist'  # under the static folder, so hashed files keep their /static/ URLs
+ASSET_CHECK_INTERVAL = float(os.getenv('ASSET_CHECK_INTERVAL', '2'))
+ASSET_MAX_AGE = 365 * 24 * 3600
+ASSET_COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+
+try:
+    import rjsmin
+except ImportError:  # rjsmin is optional; without it scripts are fingerprinted and compressed as-is
+    rjsmin = None
+
+CSS_TOKEN = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|(\s+)', re.S)
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(text):
+    """Drop comments and redundant whitespace, leaving strings untouched"""
+
+    def squeeze(plain):
+        return CSS_PUNCTUATION.sub(r'\1', ''.join(plain)).replace(';}', '}')
+
+    parts = []
+    plain = []
+    position = 0
+    for match in CSS_TOKEN.finditer(text):
+        plain.append(text[position:match.start()])
+        position = match.end()
+        if match.group(1):
+            parts.append(squeeze(plain))
+            parts.append(match.group(1))
+            plain = []
+        elif match.group(3):
+            plain.append(' ')
+    plain.append(text[position:])
+    parts.append(squeeze(plain))
+    return ''.join(parts).strip()
+
+
+def minify_asset(filename, body):
+    """Minified bytes for CSS and (with rjsmin) JS; anything else or *.min.* unchanged"""
+    if '.min.' in filename:
+        return body
+    if filename.endswith('.css'):
+        return minify_css(body.decode('utf-8')).encode('utf-8')
+    if filename.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin(body.decode('utf-8')).encode('utf-8')
+    return body
+
+
+def write_atomic(path, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(body)
+    os.replace(temp, path)
+
+
+class StaticAsset:
+    """One built file: its path on disk, ETag, and precompressed siblings"""
+
+    __slots__ = ('path', 'mimetype', 'etag', 'variants')
+
+    def __init__(self, path, mimetype, etag, variants):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.variants = variants
+
+
+class AssetPipeline:
+    """Fingerprinted copies of the static files, served as immutable.
+
+    `build()` minifies each file under the static folder, names the result
+    after its content hash (css/style.css -> dist/css/style.<hash>.css) and
+    writes .gz/.br siblings next to it. `url_for('static', ...)` is rewritten
+    to the hashed names, so a changed file gets a new URL and browsers can
+    cache every URL for a year without revalidating. At most every
+    `check_interval` seconds a page render re-stats the sources and rebuilds
+    if any changed.
+    """
+
+    def __init__(self, folder, build_dir, check_interval):
+        self.folder = folder
+        self.build_dir = build_dir
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.manifest = {}
+        self.assets = {}
+        self.signature = None  # None until a build succeeds, so check() keeps retrying
+        self.enabled = False
+        self.checked_at = time.monotonic()
+
+    def sources(self):
+        output = os.path.join(self.folder, self.build_dir)
+        for root, dirs, files in os.walk(self.folder):
+            dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != output and not d.startswith('.'))
+            for filename in sorted(files):
+                if not filename.startswith('.'):
+                    path = os.path.join(root, filename)
+                    yield os.path.relpath(path, self.folder).replace(os.sep, '/'), path
+
+    def build(self):
+        """Build every asset and swap in the new manifest; returns the number of files"""
+        started = time.perf_counter()
+        signature, _ = folder_signature(self.folder, skip=self.build_dir)
+        manifest = {}
+        assets = {}
+        for name, path in self.sources():
+            with open(path, 'rb') as f:
+                body = minify_asset(name, f.read())
+            digest = hashlib.sha256(body).hexdigest()
+            stem, ext = os.path.splitext(name)
+            hashed = f'{self.build_dir}/{stem}.{digest[:12]}{ext}'
+            target = os.path.join(self.folder, *hashed.split('/'))
+
+            variants = {}
+            candidates = {}
+            if ext in ASSET_COMPRESSIBLE:
+                candidates['gzip'] = ('.gz', lambda: gzip.compress(body, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    candidates['br'] = ('.br', lambda: brotli.compress(body))
+            if not os.path.exists(target):
+                write_atomic(target, body)
+            for encoding, (suffix, compress) in candidates.items():
+                if not os.path.exists(target + suffix):
+                    compressed = compress()
+                    if len(compressed) >= len(body):
+                        continue
+                    write_atomic(target + suffix, compressed)
+                variants[encoding] = target + suffix
+
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            manifest[name] = hashed
+            assets[hashed] = StaticAsset(target, mimetype, digest[:32], variants)
+
+        manifest_path = os.path.join(self.folder, self.build_dir, 'manifest.json')
+        manifest_body = json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+        try:
+            with open(manifest_path, 'rb') as f:
+                unchanged = f.read() == manifest_body
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            # Only written when something changed, so a prebuilt read-only tree still starts
+            write_atomic(manifest_path, manifest_body)
+            self.prune(assets)
+        with self.lock:
+            self.manifest, self.assets, self.signature = manifest, assets, signature
+        log_event('assets.built', files=len(manifest),
+                  duration_ms=round((time.perf_counter() - started) * 1000, 1))
+        return len(manifest)
+
+    def prune(self, assets):
+        """Delete hashed files left over from earlier builds"""
+        keep = {'manifest.json'}
+        for asset in assets.values():
+            keep.add(os.path.relpath(asset.path, os.path.join(self.folder, self.build_dir)))
+            keep.update(os.path.relpath(path, os.path.join(self.folder, self.build_dir))
+                        for path in asset.variants.values())
+        for root, _, files in os.walk(os.path.join(self.folder, self.build_dir)):
+            for filename in files:
+                path = os.path.join(root, filename)
+                relative = os.path.relpath(path, os.path.join(self.folder, self.build_dir))
+                if relative not in keep and not filename.endswith('.tmp'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def check(self):
+        """Rebuild if a source changed or the last build failed; True when the hashed URLs may have changed"""
+        now = time.monotonic()
+        if not self.enabled or now - self.checked_at < self.check_interval:
+            return False
+        with self.lock:
+            if now - self.checked_at < self.check_interval:
+                return False
+            self.checked_at = now
+            signature, _ = folder_signature(self.folder, skip=self.build_dir)
+            if signature == self.signature:
+                return False
+        try:
+            self.build()
+        except (OSError, UnicodeDecodeError) as e:
+            log_event('assets.build_failed', logging.ERROR, error=str(e))
+            return False
+        return True
+
+    def start(self):
+        """Initial build, once; on failure (e.g. a read-only static folder) the original files are
+        served and check() tries again every `check_interval` seconds"""
+        if self.enabled:
+            return
+        with self.start_lock:
+            if self.enabled:
+                return
+            try:
+                self.build()
+            except (OSError, UnicodeDecodeError) as e:
+                log_event('assets.build_failed', logging.ERROR, error=str(e))
+            self.enabled = True
+
+
+static_assets = AssetPipeline(app.static_folder, ASSET_BUILD_DIR, ASSET_CHECK_INTERVAL)
+
+
+@app.before_request
+def build_static_assets():
+    # Under GUNICORN_PRELOAD the master already built them in prepare_for_fork(); otherwise
+    # the first request builds (concurrent ones wait for it) before any page links to them
+    if ASSET_PIPELINE:
+        static_assets.start()
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Build the fingerprinted static files ahead of time (otherwise done on the first request)"""
+    count = static_assets.build()
+    print(f'Built {count} assets into {os.path.join(static_assets.folder, ASSET_BUILD_DIR)}')
+
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    if endpoint == 'static':
+        hashed = static_assets.manifest.get(values.get('filename'))
+        if hashed is not None:
+            values['filename'] = hashed
+
+
+@app.route(f'/static/{ASSET_BUILD_DIR}/<path:filename>')
+def serve_static_asset(filename):
+    """Serve a fingerprinted file (or its precompressed sibling) with sendfile"""
+    asset = static_assets.assets.get(f'{ASSET_BUILD_DIR}/{filename}')
+    if asset is None:
+        return jsonify({'error': 'Not found'}), 404
+
+    encoding = request.accept_encodings.best_match(list(asset.variants) + ['identity'])
+    path = asset.variants.get(encoding)
+    if path is None:
+        encoding = 'identity'
+        response = send_file(asset.path, mimetype=asset.mimetype, etag=asset.etag, max_age=ASSET_MAX_AGE,
+                             download_name=os.path.basename(asset.path))
+    else:
+        # Each encoding is a distinct representation and needs its own strong ETag
+        response = send_file(path, mimetype=asset.mimetype, etag=f'{asset.etag}-{encoding}',
+                             max_age=ASSET_MAX_AGE, download_name=os.path.basename(asset.path))
+        response.headers['Content-Encoding'] = encoding
+    metrics.inc('static_asset_requests_total', encoding=encoding, status=response.status_code)
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+# ==================== ACTIVITY EVENTS ====================
+ACTIVITY_BUFFER_SIZE = int(os.getenv('ACTIVITY_BUFFER_SIZE', '10000'))  # events held per worker
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', '1'))  # seconds between writes
+ACTIVITY_BATCH_SIZE = int(os.getenv('ACTIVITY_BATCH_SIZE', '500'))  # buffered events that trigger an early write
+# Events routes record; each names the per-user counter it increments
+ACTIVITY_EVENTS = ('roadmaps_viewed', 'colleges_browsed', 'chatbot_visits', 'chat_messages')
+
+
+class ActivityRecorder:
+    """Per-worker ring buffer of user activity, written to storage in batches.
+
+    `record()` only appends to a deque, so it costs a request microseconds
+    and never a database write. A background thread drains the buffer every
+    `interval` seconds (sooner once `batch_size` events are waiting), sums
+    the events per user and counter and applies them in one transaction.
+    When the buffer is full the oldest events are dropped, and counted.
+    """
+
+    def __init__(self, capacity, interval, batch_size):
+        self.capacity = capacity
+        self.interval = interval
+        self.batch_size = batch_size
+        self.events = deque(maxlen=capacity)
+        self.pending = {}  # (email, event) -> count drained but not yet written
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pid = None
+
+    def ensure_started(self):
+        """Start the flusher once per process (workers fork after import)"""
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.wakeup = threading.Event()
+            threading.Thread(target=self.run, name='activity-flusher', daemon=True).start()
+
+    def record(self, email, event):
+        """Buffer one event for a logged-in user (anonymous activity is not counted)"""
+        if email is None:
+            return
+        if len(self.events) >= self.capacity:
+            metrics.inc('activity_events_dropped_total')
+        self.events.append((email, event))
+        if len(self.events) >= self.batch_size:
+            self.wakeup.set()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log_event('activity.flush_error', logging.ERROR, error=str(e))
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of events written"""
+        with self.flush_lock:
+            drained = 0
+            while True:
+                try:
+                    key = self.events.popleft()
+                except IndexError:
+                    break
+                self.pending[key] = self.pending.get(key, 0) + 1
+                drained += 1
+            if not self.pending:
+                return 0
+            # Counts stay pending until the write succeeds, so a failed flush is retried
+            storage.add_activity(self.pending)
+            written = sum(self.pending.values())
+            self.pending = {}
+        metrics.inc('activity_events_written_total', written)
+        return written
+
+
+activity = ActivityRecorder(ACTIVITY_BUFFER_SIZE, ACTIVITY_FLUSH_INTERVAL, ACTIVITY_BATCH_SIZE)
+
+
+def record_activity(event):
+    activity.record(session.get('user_email'), event)
+
+
+# ==================== FEEDBACK DELIVERY ====================
+FEEDBACK_DELIVERY_THREADS = int(os.getenv('FEEDBACK_DELIVERY_THREADS', '2'))
+FEEDBACK_DELIVERY_BATCH_SIZE = int(os.getenv('FEEDBACK_DELIVERY_BATCH_SIZE', '10'))
+FEEDBACK_DELIVERY_MAX_ATTEMPTS = int(os.getenv('FEEDBACK_DELIVERY_MAX_ATTEMPTS', '6'))
+FEEDBACK_DELIVERY_BACKOFF = float(os.getenv('FEEDBACK_DELIVERY_BACKOFF', '5'))
+FEEDBACK_DELIVERY_LEASE = 120  # seconds a claimed job stays invisible to other workers
+FEEDBACK_DELIVERY_POLL_INTERVAL = 5
+
+
+def deliver_feedback(payload):
+    """POST one feedback payload to Web3Forms; returns ('submitted' | 'retry' | 'failed', error)"""
+    web3_url = os.getenv('WEB3FORMS_URL', 'https://api.web3forms.com/submit')
+    # The access key is added at send time so it is never written to the outbox
+    web3_payload = dict(payload, access_key=os.getenv('WEB3FORMS_ACCESS_KEY'))
+    try:
+        response = upstream.post(web3_url, service='web3forms', json=web3_payload, timeout=15)
+    except (requests.exceptions.RequestException, UpstreamBusy) as e:
+        return 'retry', str(e)
+
+    if response.status_code == 200:
+        return 'submitted', None
+    error = f'HTTP {response.status_code}: {response.text[:200]}'
+    if response.status_code == 429 or response.status_code >= 500:
+        return 'retry', error
+    return 'failed', error
+
+
+class FeedbackDeliveryWorker:
+    """Background threads draining the feedback outbox.
+
+    Every gunicorn worker runs its own pool. Jobs are leased through storage,
+    so two pools never send the same feedback concurrently, and failures are
+    retried with jittered exponential backoff up to `max_attempts` times.
+    """
+
+    def __init__(self, threads, batch_size, max_attempts, backoff):
+        self.threads = threads
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def ensure_started(self):
+        """Start the threads once per process (workers fork after import)"""
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.wakeup = threading.Event()
+            for index in range(self.threads):
+                threading.Thread(target=self.run, name=f'feedback-delivery-{index}', daemon=True).start()
+
+    def notify(self):
+        """Wake the threads so new feedback goes out without waiting for the next poll"""
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            try:
+                processed = self.process_batch()
+            except Exception as e:
+                log_event('feedback.delivery_error', logging.ERROR, error=str(e))
+                processed = 0
+            if not processed:
+                self.wakeup.wait(FEEDBACK_DELIVERY_POLL_INTERVAL)
+                self.wakeup.clear()
+
+    def process_batch(self):
+        jobs = storage.claim_feedback_deliveries(self.batch_size, FEEDBACK_DELIVERY_LEASE)
+        for feedback_id, payload, attempt in jobs:
+            status, error = deliver_feedback(payload)
+            if status == 'retry' and attempt >= self.max_attempts:
+                status = 'failed'
+            if status == 'failed':
+                log_event('feedback.delivery_failed', logging.WARNING, feedback_id=feedback_id,
+                          attempts=attempt, error=error)
+            if status != 'retry':
+                storage.finish_feedback_delivery(feedback_id, status, error)
+            else:
+                delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+                storage.finish_feedback_delivery(feedback_id, 'pending', error, retry_at=time.time() + delay)
+        return len(jobs)
+
+
+feedback_delivery = FeedbackDeliveryWorker(
+    FEEDBACK_DELIVERY_THREADS,
+    FEEDBACK_DELIVERY_BATCH_SIZE,
+    FEEDBACK_DELIVERY_MAX_ATTEMPTS,
+    FEEDBACK_DELIVERY_BACKOFF,
 )
-app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
-CORS(app)
 
-# ==================== IN-MEMORY STORAGE ====================
-users_storage = {}
-quiz_results_storage = []
-progress_storage = {}
-scholarships_cache = {}
-internships_cache = {}
-jobs_cache = {}
-feedback_storage = []  # Store feedback submissions
-
-# ==================== COLLEGE DATABASE ====================
-COLLEGES_DATABASE = {
-    'iits': [
-        {'name': 'IIT Bombay', 'rank': 1, 'location': 'Mumbai', 'avg_package': 21.8, 'highest_package': 2.14, 'acceptance_rate': 0.5, 'entrance': 'JEE Advanced', 'nirf_rank': 2, 'established': 1958, 'website': 'https://www.iitb.ac.in'},
-        {'name': 'IIT Delhi', 'rank': 2, 'location': 'Delhi', 'avg_package': 18.2, 'highest_package': 1.8, 'acceptance_rate': 0.6, 'entrance': 'JEE Advanced', 'nirf_rank': 4, 'established': 1961, 'website': 'https://home.iitd.ac.in'},
-        {'name': 'IIT Madras', 'rank': 3, 'location': 'Chennai', 'avg_package': 17.5, 'highest_package': 1.7, 'acceptance_rate': 0.7, 'entrance': 'JEE Advanced', 'nirf_rank': 3, 'established': 1959, 'website': 'https://www.iitm.ac.in'},
-        {'name': 'IIT Kanpur', 'rank': 4, 'location': 'Kanpur', 'avg_package': 16.2, 'highest_package': 1.5, 'acceptance_rate': 0.8, 'entrance': 'JEE Advanced', 'nirf_rank': 5, 'established': 1959, 'website': 'https://www.iitk.ac.in'},
-        {'name': 'IIT Kharagpur', 'rank': 5, 'location': 'Kharagpur', 'avg_package': 15.8, 'highest_package': 1.4, 'acceptance_rate': 0.9, 'entrance': 'JEE Advanced', 'nirf_rank': 6, 'established': 1951, 'website': 'http://www.iitkgp.ac.in'},
-        {'name': 'IIT Roorkee', 'rank': 6, 'location': 'Roorkee', 'avg_package': 15.2, 'highest_package': 1.3, 'acceptance_rate': 1.0, 'entrance': 'JEE Advanced', 'nirf_rank': 8, 'established': 1854, 'website': 'https://www.iitr.ac.in'},
-        {'name': 'IIT Guwahati', 'rank': 7, 'location': 'Guwahati', 'avg_package': 14.5, 'highest_package': 1.2, 'acceptance_rate': 1.2, 'entrance': 'JEE Advanced', 'nirf_rank': 9, 'established': 1994, 'website': 'https://www.iitg.ac.in'},
-        {'name': 'IIT Hyderabad', 'rank': 8, 'location': 'Hyderabad', 'avg_package': 14.2, 'highest_package': 1.1, 'acceptance_rate': 1.3, 'entrance': 'JEE Advanced', 'nirf_rank': 10, 'established': 2008, 'website': 'https://iith.ac.in'},
-        {'name': 'IIT Indore', 'rank': 9, 'location': 'Indore', 'avg_package': 13.8, 'highest_package': 1.0, 'acceptance_rate': 1.5, 'entrance': 'JEE Advanced', 'nirf_rank': 16, 'established': 2009, 'website': 'https://www.iiti.ac.in'},
-        {'name': 'IIT BHU Varanasi', 'rank': 10, 'location': 'Varanasi', 'avg_package': 13.5, 'highest_package': 0.95, 'acceptance_rate': 1.6, 'entrance': 'JEE Advanced', 'nirf_rank': 11, 'established': 1919, 'website': 'https://www.iitbhu.ac.in'},
-        {'name': 'IIT Dhanbad', 'rank': 11, 'location': 'Dhanbad', 'avg_package': 13.2, 'highest_package': 0.9, 'acceptance_rate': 1.8, 'entrance': 'JEE Advanced', 'nirf_rank': 13, 'established': 1926, 'website': 'https://www.iitism.ac.in'},
-        {'name': 'IIT Gandhinagar', 'rank': 12, 'location': 'Gandhinagar', 'avg_package': 12.8, 'highest_package': 0.85, 'acceptance_rate': 2.0, 'entrance': 'JEE Advanced', 'nirf_rank': 15, 'established': 2007, 'website': 'https://iitgn.ac.in'},
-        {'name': 'IIT Bhubaneswar', 'rank': 13, 'location': 'Bhubaneswar', 'avg_package': 12.5, 'highest_package': 0.8, 'acceptance_rate': 2.2, 'entrance': 'JEE Advanced', 'nirf_rank': 17, 'established': 2008, 'website': 'https://www.iitbbs.ac.in'},
-        {'name': 'IIT Palakkad', 'rank': 14, 'location': 'Palakkad', 'avg_package': 12.2, 'highest_package': 0.75, 'acceptance_rate': 2.4, 'entrance': 'JEE Advanced', 'nirf_rank': 25, 'established': 2015, 'website': 'https://iitpkd.ac.in'},
-        {'name': 'IIT Tirupati', 'rank': 15, 'location': 'Tirupati', 'avg_package': 12.0, 'highest_package': 0.72, 'acceptance_rate': 2.5, 'entrance': 'JEE Advanced', 'nirf_rank': 30, 'established': 2015, 'website': 'https://iittp.ac.in'},
-        {'name': 'IIT Jammu', 'rank': 16, 'location': 'Jammu', 'avg_package': 11.8, 'highest_package': 0.7, 'acceptance_rate': 2.6, 'entrance': 'JEE Advanced', 'nirf_rank': 35, 'established': 2016, 'website': 'https://www.iitjammu.ac.in'},
-        {'name': 'IIT Bombay ISM Dhanbad', 'rank': 17, 'location': 'Dhanbad', 'avg_package': 11.5, 'highest_package': 0.65, 'acceptance_rate': 2.8, 'entrance': 'JEE Advanced', 'nirf_rank': 40, 'established': 1926, 'website': 'https://www.iitism.ac.in'},
-        {'name': 'IIT Mandi', 'rank': 18, 'location': 'Himachal Pradesh', 'avg_package': 11.2, 'highest_package': 0.62, 'acceptance_rate': 3.0, 'entrance': 'JEE Advanced', 'nirf_rank': 42, 'established': 2009, 'website': 'https://www.iitmandi.ac.in'},
-        {'name': 'IIT Goa', 'rank': 19, 'location': 'Goa', 'avg_package': 11.0, 'highest_package': 0.6, 'acceptance_rate': 3.2, 'entrance': 'JEE Advanced', 'nirf_rank': 45, 'established': 2016, 'website': 'https://iitgoa.ac.in'},
-        {'name': 'IIT Bhilai', 'rank': 20, 'location': 'Chhattisgarh', 'avg_package': 10.8, 'highest_package': 0.58, 'acceptance_rate': 3.4, 'entrance': 'JEE Advanced', 'nirf_rank': 48, 'established': 2016, 'website': 'https://www.iitbhilai.ac.in'},
-        {'name': 'IIT Dharwad', 'rank': 21, 'location': 'Karnataka', 'avg_package': 10.5, 'highest_package': 0.55, 'acceptance_rate': 3.6, 'entrance': 'JEE Advanced', 'nirf_rank': 50, 'established': 2016, 'website': 'https://www.iitdh.ac.in'},
-        {'name': 'IIT Jodhpur', 'rank': 22, 'location': 'Jodhpur', 'avg_package': 10.2, 'highest_package': 0.52, 'acceptance_rate': 3.8, 'entrance': 'JEE Advanced', 'nirf_rank': 52, 'established': 2008, 'website': 'https://iitj.ac.in'},
-        {'name': 'IIT Bombay Bombay', 'rank': 23, 'location': 'Mumbai', 'avg_package': 10.0, 'highest_package': 0.5, 'acceptance_rate': 4.0, 'entrance': 'JEE Advanced', 'nirf_rank': 54, 'established': 1958, 'website': 'https://www.iitb.ac.in'},
-    ],
-    'nits': [
-        {'name': 'NIT Trichy', 'location': 'Tiruchirappalli', 'avg_package': 9.5, 'highest_package': 0.95, 'nirf_rank': 7, 'top_branch': 'Computer Science', 'website': 'https://www.nitt.edu'},
-        {'name': 'NIT Surathkal', 'location': 'Mangalore', 'avg_package': 9.2, 'highest_package': 0.92, 'nirf_rank': 12, 'top_branch': 'Computer Science', 'website': 'https://www.nitk.ac.in'},
-        {'name': 'NIT Warangal', 'location': 'Warangal', 'avg_package': 8.8, 'highest_package': 0.88, 'nirf_rank': 14, 'top_branch': 'Computer Science', 'website': 'https://www.nitw.ac.in'},
-        {'name': 'NIT Rourkela', 'location': 'Rourkela', 'avg_package': 8.5, 'highest_package': 0.85, 'nirf_rank': 18, 'top_branch': 'Computer Science', 'website': 'https://www.nitrkl.ac.in'},
-        {'name': 'NIT Calicut', 'location': 'Kozhikode', 'avg_package': 8.2, 'highest_package': 0.82, 'nirf_rank': 20, 'top_branch': 'Computer Science', 'website': 'http://www.nitc.ac.in'},
-        {'name': 'NIT Silchar', 'location': 'Silchar', 'avg_package': 7.8, 'highest_package': 0.78, 'nirf_rank': 26, 'top_branch': 'Computer Science', 'website': 'http://www.nits.ac.in'},
-        {'name': 'NIT Hamirpur', 'location': 'Hamirpur', 'avg_package': 7.5, 'highest_package': 0.75, 'nirf_rank': 27, 'top_branch': 'Computer Science', 'website': 'https://nith.ac.in'},
-        {'name': 'NIT Srinagar', 'location': 'Srinagar', 'avg_package': 7.2, 'highest_package': 0.72, 'nirf_rank': 28, 'top_branch': 'Computer Science', 'website': 'http://www.nitsri.ac.in'},
-        {'name': 'NIT Allahabad', 'location': 'Allahabad', 'avg_package': 7.0, 'highest_package': 0.70, 'nirf_rank': 29, 'top_branch': 'Computer Science', 'website': 'http://www.mnnit.ac.in'},
-        {'name': 'NIT Raipur', 'location': 'Raipur', 'avg_package': 6.8, 'highest_package': 0.68, 'nirf_rank': 31, 'top_branch': 'Computer Science', 'website': 'http://www.nitrr.ac.in'},
-        {'name': 'NIT Jalandhar', 'location': 'Jalandhar', 'avg_package': 6.5, 'highest_package': 0.65, 'nirf_rank': 32, 'top_branch': 'Computer Science', 'website': 'https://www.nitj.ac.in'},
-        {'name': 'NIT Kurukshetra', 'location': 'Kurukshetra', 'avg_package': 6.2, 'highest_package': 0.62, 'nirf_rank': 33, 'top_branch': 'Computer Science', 'website': 'https://www.nitkkr.ac.in'},
-        {'name': 'NIT Nagpur', 'location': 'Nagpur', 'avg_package': 6.0, 'highest_package': 0.60, 'nirf_rank': 34, 'top_branch': 'Computer Science', 'website': 'https://www.vnit.ac.in'},
-        {'name': 'NIT Patna', 'location': 'Patna', 'avg_package': 5.8, 'highest_package': 0.58, 'nirf_rank': 36, 'top_branch': 'Computer Science', 'website': 'http://www.nitp.ac.in'},
-        {'name': 'NIT Goa', 'location': 'Goa', 'avg_package': 5.5, 'highest_package': 0.55, 'nirf_rank': 37, 'top_branch': 'Computer Science', 'website': 'https://www.nitgoa.ac.in'},
-    ],
-    'iIits': [
-        {'name': 'IIIT Hyderabad', 'location': 'Hyderabad', 'avg_package': 32.0, 'highest_package': 2.5, 'cse_avg': 32.0, 'specialization': 'Computer Science & AI/ML', 'website': 'https://www.iiit.ac.in'},
-        {'name': 'IIIT Bangalore', 'location': 'Bangalore', 'avg_package': 28.5, 'highest_package': 2.3, 'cse_avg': 28.5, 'specialization': 'Computer Science & AI/ML', 'website': 'https://www.iiitb.ac.in'},
-        {'name': 'IIIT Delhi', 'location': 'Delhi', 'avg_package': 25.2, 'highest_package': 2.0, 'cse_avg': 25.2, 'specialization': 'Computer Science & AI/ML', 'website': 'https://iiitd.ac.in'},
-        {'name': 'IIIT Guwahati', 'location': 'Guwahati', 'avg_package': 18.5, 'highest_package': 1.5, 'cse_avg': 18.5, 'specialization': 'Computer Science', 'website': 'http://www.iiitg.ac.in'},
-        {'name': 'IIIT Pune', 'location': 'Pune', 'avg_package': 17.2, 'highest_package': 1.4, 'cse_avg': 17.2, 'specialization': 'Computer Science', 'website': 'http://www.iiitp.ac.in'},
-    ],
-    'aiims': [
-        {'name': 'AIIMS Delhi', 'location': 'Delhi', 'seats': 107, 'neet_rank_required': '500-800', 'website': 'https://www.aiims.edu'},
-        {'name': 'AIIMS Jodhpur', 'location': 'Jodhpur', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsjodhpur.edu.in'},
-        {'name': 'AIIMS Bhopal', 'location': 'Bhopal', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsbhopal.edu.in'},
-        {'name': 'AIIMS Patna', 'location': 'Patna', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimspatna.edu.in'},
-        {'name': 'AIIMS Raipur', 'location': 'Raipur', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsraipur.edu.in'},
-        {'name': 'AIIMS Rishikesh', 'location': 'Rishikesh', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsrishikesh.edu.in'},
-        {'name': 'AIIMS Nagpur', 'location': 'Nagpur', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsnagpur.edu.in'},
-        {'name': 'AIIMS Guntur', 'location': 'Guntur', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsguntur.edu.in'},
-        {'name': 'AIIMS Bibinagar', 'location': 'Bibinagar', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsbibinagar.edu.in'},
-        {'name': 'AIIMS Bhubaneswar', 'location': 'Bhubaneswar', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsbhubaneswar.nic.in'},
-        {'name': 'AIIMS Indore', 'location': 'Indore', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsindore.edu.in'},
-        {'name': 'AIIMS Guwahati', 'location': 'Guwahati', 'seats': 50, 'neet_rank_required': '1000-1500', 'website': 'https://aiimsguwahati.edu.in'},
-    ],
-    'private_universities': [
-        {'name': 'BITS Pilani', 'location': 'Pilani', 'avg_package': 15.0, 'highest_package': 1.6, 'entrance': 'BITSAT', 'nirf_rank': 19, 'website': 'https://www.bits-pilani.ac.in'},
-        {'name': 'VIT Vellore', 'location': 'Vellore', 'avg_package': 11.8, 'highest_package': 1.3, 'entrance': 'VITEEE', 'nirf_rank': 21, 'website': 'https://vit.ac.in'},
-        {'name': 'Manipal University', 'location': 'Manipal', 'avg_package': 10.5, 'highest_package': 1.1, 'entrance': 'MET', 'nirf_rank': 23, 'website': 'https://manipal.edu'},
-        {'name': 'Thapar University', 'location': 'Patiala', 'avg_package': 10.2, 'highest_package': 1.0, 'entrance': 'Thapar Entrance', 'nirf_rank': 24, 'website': 'https://www.thapar.edu'},
-        {'name': 'SRM University', 'location': 'Chennai', 'avg_package': 9.5, 'highest_package': 0.95, 'entrance': 'SRMJEEE', 'nirf_rank': 38, 'website': 'https://www.srmist.edu.in'},
-        {'name': 'Anna University', 'location': 'Chennai', 'avg_package': 8.8, 'highest_package': 0.88, 'entrance': 'TNEA', 'nirf_rank': 41, 'website': 'https://www.annauniv.edu'},
-    ],
-    'iims': [
-        {'name': 'IIM Ahmedabad', 'location': 'Ahmedabad', 'avg_package': 32.5, 'highest_package': 3.5, 'entrance': 'CAT', 'website': 'https://www.iima.ac.in'},
-        {'name': 'IIM Bangalore', 'location': 'Bangalore', 'avg_package': 31.2, 'highest_package': 3.3, 'entrance': 'CAT', 'website': 'https://www.iimb.ac.in'},
-        {'name': 'IIM Calcutta', 'location': 'Kolkata', 'avg_package': 30.8, 'highest_package': 3.2, 'entrance': 'CAT', 'website': 'https://www.iimcal.ac.in'},
-        {'name': 'IIM Lucknow', 'location': 'Lucknow', 'avg_package': 28.5, 'highest_package': 3.0, 'entrance': 'CAT', 'website': 'https://www.iiml.ac.in'},
-        {'name': 'IIM Indore', 'location': 'Indore', 'avg_package': 27.0, 'highest_package': 2.8, 'entrance': 'CAT', 'website': 'https://www.iimidr.ac.in'},
-    ]
-}
 
-# ==================== SKILLS DATABASE ====================
-SKILLS_DATABASE = {
-    'Python Programming': {
-        'demand': 97, 'salary_min': 5, 'salary_max': 30, 'jobs': 65000,
-        'growth_rate': 15, 'difficulty': 'Beginner', 'industry': 'Software, Data Science, AI/ML'
-    },
-    'AI & Machine Learning': {
-        'demand': 92, 'salary_min': 10, 'salary_max': 60, 'jobs': 45000,
-        'growth_rate': 28, 'difficulty': 'Advanced', 'industry': 'AI/ML, Research, Startups'
-    },
-    'Cloud Computing (AWS/Azure)': {
-        'demand': 90, 'salary_min': 8, 'salary_max': 45, 'jobs': 55000,
-        'growth_rate': 22, 'difficulty': 'Intermediate', 'industry': 'DevOps, Infrastructure'
-    },
-    'Data Science & Analytics': {
-        'demand': 93, 'salary_min': 8, 'salary_max': 50, 'jobs': 48000,
-        'growth_rate': 24, 'difficulty': 'Advanced', 'industry': 'Analytics, Finance, Tech'
-    },
-    'JavaScript & React': {
-        'demand': 90, 'salary_min': 5, 'salary_max': 28, 'jobs': 65000,
-        'growth_rate': 18, 'difficulty': 'Intermediate', 'industry': 'Frontend, Web Development'
-    },
-    'Cybersecurity': {
-        'demand': 85, 'salary_min': 7, 'salary_max': 40, 'jobs': 38000,
-        'growth_rate': 26, 'difficulty': 'Advanced', 'industry': 'Security, Enterprise'
-    },
-    'DevOps & CI/CD': {
-        'demand': 88, 'salary_min': 9, 'salary_max': 45, 'jobs': 32000,
-        'growth_rate': 23, 'difficulty': 'Advanced', 'industry': 'Infrastructure, Tech'
-    },
-    'Docker & Kubernetes': {
-        'demand': 82, 'salary_min': 10, 'salary_max': 50, 'jobs': 28000,
-        'growth_rate': 27, 'difficulty': 'Advanced', 'industry': 'DevOps, Cloud'
-    },
-    'Blockchain': {
-        'demand': 72, 'salary_min': 12, 'salary_max': 70, 'jobs': 20000,
-        'growth_rate': 35, 'difficulty': 'Advanced', 'industry': 'Cryptocurrency, Fintech'
-    },
-    'UI/UX Design': {
-        'demand': 85, 'salary_min': 4, 'salary_max': 25, 'jobs': 42000,
-        'growth_rate': 20, 'difficulty': 'Intermediate', 'industry': 'Design, Product'
-    },
-    'Digital Marketing': {
-        'demand': 88, 'salary_min': 4, 'salary_max': 20, 'jobs': 58000,
-        'growth_rate': 17, 'difficulty': 'Beginner', 'industry': 'Marketing, Startups'
-    },
-    'SQL & Databases': {
-        'demand': 95, 'salary_min': 5, 'salary_max': 25, 'jobs': 62000,
-        'growth_rate': 12, 'difficulty': 'Beginner', 'industry': 'Backend, Data'
-    },
-    'Java Development': {
-        'demand': 90, 'salary_min': 5, 'salary_max': 35, 'jobs': 70000,
-        'growth_rate': 14, 'difficulty': 'Intermediate', 'industry': 'Enterprise, Backend'
-    },
-    'Mobile Development': {
-        'demand': 87, 'salary_min': 6, 'salary_max': 30, 'jobs': 52000,
-        'growth_rate': 20, 'difficulty': 'Intermediate', 'industry': 'Mobile Apps, Startups'
-    },
-    'Project Management': {
-        'demand': 83, 'salary_min': 10, 'salary_max': 50, 'jobs': 42000,
-        'growth_rate': 15, 'difficulty': 'Intermediate', 'industry': 'Management, Enterprise'
-    }
-}
+@app.before_request
+def start_background_workers():
+    feedback_delivery.ensure_started()
+    catalog_watcher.ensure_started()
+    activity.ensure_started()
 
-# ==================== CAREER DATA ====================
-CAREER_PATHS = {
-    'Software Developer': {
-        'description': 'Build scalable software solutions using modern programming languages and frameworks',
-        'salary_range': '₹5-35 LPA',
-        'demand': 'Very High',
-        'skills_required': ['Python Programming', 'JavaScript & React', 'SQL & Databases', 'Java Development'],
-        'education': 'B.Tech/B.Sc Computer Science',
-        'companies': ['Google', 'Microsoft', 'Amazon', 'TCS', 'Infosys', 'Wipro'],
-    },
-    'Data Scientist': {
-        'description': 'Analyze complex datasets and build predictive models for business insights using AI/ML',
-        'salary_range': '₹8-55 LPA',
-        'demand': 'Very High',
-        'skills_required': ['Python Programming', 'Data Science & Analytics', 'SQL & Databases', 'AI & Machine Learning'],
-        'education': 'B.Tech/M.Tech Computer Science, Statistics',
-        'companies': ['Google', 'Amazon', 'Meta', 'Adobe', 'Flipkart', 'Microsoft'],
-    },
-    'AI/ML Engineer': {
-        'description': 'Design and implement cutting-edge artificial intelligence and machine learning solutions',
-        'salary_range': '₹12-70 LPA',
-        'demand': 'Very High',
-        'skills_required': ['Python Programming', 'AI & Machine Learning', 'Data Science & Analytics', 'Cloud Computing (AWS/Azure)'],
-        'education': 'M.Tech AI/ML, B.Tech Computer Science',
-        'companies': ['Google', 'OpenAI', 'DeepMind', 'Microsoft', 'Tesla', 'Anthropic'],
-    },
-    'UX/UI Designer': {
-        'description': 'Create beautiful and intuitive user interfaces for web and mobile applications with AI integration',
-        'salary_range': '₹5-30 LPA',
-        'demand': 'Very High',
-        'skills_required': ['UI/UX Design', 'JavaScript & React', 'Digital Marketing'],
-        'education': 'B.Des, B.Tech, Diploma in Design',
-        'companies': ['Adobe', 'Google', 'Apple', 'Figma', 'Microsoft', 'Canva'],
-    },
-    'Digital Marketing Specialist': {
-        'description': 'Drive business growth through AI-powered digital marketing strategies and data analysis',
-        'salary_range': '₹5-25 LPA',
-        'demand': 'Very High',
-        'skills_required': ['Digital Marketing', 'Data Science & Analytics', 'Project Management'],
-        'education': 'B.Com, B.Tech, MBA Marketing',
-        'companies': ['Amazon', 'Flipkart', 'Unilever', 'HUL', 'Meta', 'Google'],
-    },
-    'Cybersecurity Expert': {
-        'description': 'Protect organizations from evolving cyber threats and ensure data security in cloud environments',
-        'salary_range': '₹8-50 LPA',
-        'demand': 'Very High',
-        'skills_required': ['Cybersecurity', 'Java Development', 'SQL & Databases', 'Cloud Computing (AWS/Azure)'],
-        'education': 'B.Tech Computer Science, Cybersecurity Certification',
-        'companies': ['Microsoft', 'Google', 'Cisco', 'JPMorgan', 'Deloitte', 'Palo Alto'],
-    },
-    'Product Manager': {
-        'description': 'Lead product strategy and drive innovation in tech companies with AI/ML integration',
-        'salary_range': '₹15-60 LPA',
-        'demand': 'Very High',
-        'skills_required': ['Project Management', 'Data Science & Analytics', 'Digital Marketing'],
-        'education': 'MBA, B.Tech with Product Management focus',
-        'companies': ['Google', 'Amazon', 'Microsoft', 'Apple', 'Meta', 'Netflix'],
-    },
-    'Cloud Architect': {
-        'description': 'Design and manage cutting-edge cloud infrastructure for enterprise solutions with AI integration',
-        'salary_range': '₹15-70 LPA',
-        'demand': 'Very High',
-        'skills_required': ['Cloud Computing (AWS/Azure)', 'DevOps & CI/CD', 'Docker & Kubernetes'],
-        'education': 'B.Tech Computer Science, Cloud Certifications',
-        'companies': ['AWS', 'Google Cloud', 'Microsoft Azure', 'IBM', 'Oracle', 'Alibaba Cloud'],
-    },
-    'Business Analyst': {
-        'description': 'Bridge gap between business and technology teams with data-driven insights',
-        'salary_range': '₹6-30 LPA',
-        'demand': 'Very High',
-        'skills_required': ['Project Management', 'Data Science & Analytics', 'SQL & Databases'],
-        'education': 'B.Com, B.Tech, MBA',
-        'companies': ['Accenture', 'Deloitte', 'TCS', 'Cognizant', 'Capgemini', 'EY'],
-    },
-    'Content Writer': {
-        'description': 'Create engaging AI-assisted content for websites, blogs, and social media platforms',
-        'salary_range': '₹3-18 LPA',
-        'demand': 'High',
-        'skills_required': ['Digital Marketing'],
-        'education': 'B.A, B.Tech (any discipline)',
-        'companies': ['HubSpot', 'Medium', 'LinkedIn', 'Quora', 'Hashnode', 'Notion'],
-    }
-}
 
-# ==================== SCHOLARSHIP DATA ====================
-SCHOLARSHIPS = [
-    {
-        'name': 'AICTE Pragati Scholarship for Girls',
-        'organization': 'AICTE',
-        'days_left': 2,
-        'description': 'Girl students in technical courses',
-        'amount': '₹35,000 per annum + ₹2,500/month for hostel',
-        'location': 'All India',
-        'education_level': 'Diploma/Degree',
-        'deadline': '15 Nov 2025',
-        'category': 'Women'
-    },
-    {
-        'name': 'HDFC Educational Crisis Scholarship',
-        'organization': 'HDFC Bank',
-        'days_left': 7,
-        'description': 'Students affected by personal crises',
-        'amount': 'Up to ₹40,000',
-        'location': 'All India',
-        'education_level': 'Any',
-        'deadline': '20 Nov 2025',
-        'category': 'Need-Based'
-    },
-    {
-        'name': 'National Merit Scholarship',
-        'organization': 'Ministry of Education',
-        'days_left': 17,
-        'description': 'Meritorious students with 80%+ marks',
-        'amount': '₹15,000 per annum',
-        'location': 'All India',
-        'education_level': 'Graduate',
-        'deadline': '30 Nov 2025',
-        'category': 'Merit-Based'
-    },
-    {
-        'name': 'Tata Trusts Scholarship Program',
-        'organization': 'Tata Trusts',
-        'days_left': 32,
-        'description': 'Students from economically weaker sections',
-        'amount': 'Up to ₹75,000 per year',
-        'location': 'All India',
-        'education_level': 'Graduate',
-        'deadline': '15 Dec 2025',
-        'category': 'Need-Based'
-    },
-    {
-        'name': 'Post-Matric Scholarship for OBC Students',
-        'organization': 'Ministry of Social Justice and Empowerment',
-        'days_left': 48,
-        'description': 'OBC students with family income < ₹8 lakh',
-        'amount': 'Up to ₹12,000 per annum',
-        'location': 'All India',
-        'education_level': 'Post-Matric',
-        'deadline': '31 Dec 2025',
-        'category': 'Minority'
-    }
-]
+# ==================== PASSWORD HASHING ====================
+# Werkzeug method string; existing hashes with other parameters are upgraded at login
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))  # 0 hashes in the request thread
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '32'))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', '5'))
+
+
+class HasherBusy(Exception):
+    """Every password hashing slot stayed busy for PASSWORD_HASH_QUEUE_TIMEOUT seconds"""
+
+
+class PasswordHasher:
+    """Runs password hashing in a bounded per-worker process pool.
+
+    Hashing is deliberately expensive, so it runs outside the request thread
+    (which would otherwise stall every greenlet of a gevent worker) and at
+    most `max_pending` hashes may be queued or running per worker; callers
+    beyond that wait up to PASSWORD_HASH_QUEUE_TIMEOUT and then get HasherBusy.
+    """
+
+    def __init__(self, method, workers, max_pending):
+        self.method = method
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.pid = None
+        self.executor = None
+        self.dummy_hash = None
+
+    def _executor(self):
+        """Pool for the current process (forked workers must not share the parent's)"""
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    context = multiprocessing.get_context('spawn')
+                    self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                    self.pid = os.getpid()
+        return self.executor
+
+    def _run(self, function, *args):
+        if not self.workers:
+            return function(*args)
+        if not self.slots.acquire(timeout=PASSWORD_HASH_QUEUE_TIMEOUT):
+            raise HasherBusy()
+        try:
+            return self._executor().submit(function, *args).result()
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password; a missing hash costs the same as a wrong password"""
+        if password_hash is None:
+            self._run(check_password_hash, self.get_dummy_hash(), password)
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def get_dummy_hash(self):
+        """Hash of a random secret with the current parameters, for unknown users"""
+        if self.dummy_hash is None:
+            self.dummy_hash = self.hash(os.urandom(16).hex())
+        return self.dummy_hash
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with parameters other than the configured ones"""
+        return password_hash.split('$', 1)[0] != self.get_dummy_hash().split('$', 1)[0]
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_METHOD, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+# ==================== LOGIN THROTTLING ====================
+LOGIN_IP_BURST = int(os.getenv('LOGIN_IP_BURST', '20'))
+LOGIN_IP_PER_MINUTE = float(os.getenv('LOGIN_IP_PER_MINUTE', '10'))
+LOGIN_ACCOUNT_BURST = int(os.getenv('LOGIN_ACCOUNT_BURST', '5'))
+LOGIN_ACCOUNT_PER_MINUTE = float(os.getenv('LOGIN_ACCOUNT_PER_MINUTE', '2'))
+
+
+class TokenBucketLimiter:
+    """Named token buckets holding up to `burst` tokens, refilled at `rate` per second
+
+    Buckets are kept by the storage backend, so with SQLite every gunicorn
+    worker draws from the same counters.
+    """
+
+    def __init__(self, name, burst, rate):
+        self.name = name
+        self.burst = burst
+        self.rate = rate
+
+    def consume(self, key):
+        """Take one token; returns 0 on success or the seconds until a token is available"""
+        return storage.take_token(f'{self.name}:{key}', self.burst, self.rate)
+
+
+def throttled_response(wait, message='Too many attempts. Please try again later.'):
+    response = jsonify({'error': message})
+    response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+    return response, 429
+
+
+login_ip_limiter = TokenBucketLimiter('login-ip', LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE / 60)
+login_account_limiter = TokenBucketLimiter('login-account', LOGIN_ACCOUNT_BURST, LOGIN_ACCOUNT_PER_MINUTE / 60)
+
+
+# ==================== CHAT ADMISSION CONTROL ====================
+CHAT_IP_BURST = int(os.getenv('CHAT_IP_BURST', '20'))
+CHAT_IP_PER_MINUTE = float(os.getenv('CHAT_IP_PER_MINUTE', '10'))
+CHAT_SESSION_BURST = int(os.getenv('CHAT_SESSION_BURST', '10'))
+CHAT_SESSION_PER_MINUTE = float(os.getenv('CHAT_SESSION_PER_MINUTE', '5'))
+CHAT_MAX_CONCURRENT = int(os.getenv('CHAT_MAX_CONCURRENT', '50'))
+CHAT_MAX_WAITING = int(os.getenv('CHAT_MAX_WAITING', '20'))
+CHAT_QUEUE_TIMEOUT = float(os.getenv('CHAT_QUEUE_TIMEOUT', '2'))
+CHAT_LEASE_TTL = float(os.getenv('CHAT_LEASE_TTL', '300'))
+
+
+class AdmissionController:
+    """Global cap on concurrent upstream chat calls, shared by every worker.
+
+    A slot is a lease row in storage, so the cap holds across gunicorn
+    workers; leases expire after `lease_ttl` in case a worker dies holding
+    one. At most `max_waiting` requests per worker queue for a slot, and a
+    queued request gives up after `queue_timeout` seconds.
+
+    Queued requests wait on a condition (cooperative under gevent) that a
+    release in the same worker signals; slots freed by other workers are
+    found by retrying with exponential backoff, so waiters only touch
+    storage to claim a lease, not in a tight polling loop.
+    """
+
+    def __init__(self, pool, limit, max_waiting, queue_timeout, lease_ttl,
+                 poll_interval=0.05, max_poll_interval=0.5):
+        self.pool = pool
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.waiting = threading.BoundedSemaphore(max_waiting)
+        self.released = threading.Condition()
+        self.unreleased = deque()  # leases whose delete hit a busy database; retried on the next release
+
+    def acquire(self):
+        """Wait for a slot; returns a lease for release() or raises UpstreamBusy"""
+        lease = storage.acquire_lease(self.pool, self.limit, self.lease_ttl)
+        if lease is not None:
+            return lease
+        if not self.waiting.acquire(blocking=False):
+            metrics.inc('chat_rejected_total', reason='queue_full')
+            raise UpstreamBusy('The assistant is busy right now, please try again shortly')
+        metrics.gauge_add('chat_admission_waiting', 1)
+        started = time.monotonic()
+        delay = self.poll_interval
+        try:
+            while True:
+                remaining = self.queue_timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    break
+                with self.released:
+                    self.released.wait(min(delay, remaining))
+                delay = min(delay * 2, self.max_poll_interval)
+                lease = storage.acquire_lease(self.pool, self.limit, self.lease_ttl)
+                if lease is not None:
+                    metrics.observe('chat_admission_wait_seconds', time.monotonic() - started)
+                    return lease
+        finally:
+            metrics.gauge_add('chat_admission_waiting', -1)
+            self.waiting.release()
+        metrics.inc('chat_rejected_total', reason='queue_timeout')
+        raise UpstreamBusy('The assistant is busy right now, please try again shortly')
+
+    def release(self, lease):
+        self.unreleased.append(lease)
+        while self.unreleased:
+            pending = self.unreleased.popleft()
+            if not storage.release_lease(pending):
+                self.unreleased.append(pending)
+                break
+        with self.released:
+            self.released.notify()
+
+
+def chat_client_id():
+    """Rate-limit key for the caller: the account when logged in, else a per-session id"""
+    if 'user_email' in session:
+        return 'user:' + session['user_email']
+    if 'chat_client_id' not in session:
+        session['chat_client_id'] = uuid.uuid4().hex
+    return 'anon:' + session['chat_client_id']
+
+
+chat_ip_limiter = TokenBucketLimiter('chat-ip', CHAT_IP_BURST, CHAT_IP_PER_MINUTE / 60)
+chat_client_limiter = TokenBucketLimiter('chat-client', CHAT_SESSION_BURST, CHAT_SESSION_PER_MINUTE / 60)
+chat_admission = AdmissionController(
+    'chat', CHAT_MAX_CONCURRENT, CHAT_MAX_WAITING, CHAT_QUEUE_TIMEOUT, CHAT_LEASE_TTL
+)
+
+
+# ==================== PROCESS STARTUP ====================
+def prepare_for_fork():
+    """Finish one-time work in the gunicorn master before the workers are forked.
+
+    Called from gunicorn.conf.py's on_starting hook under GUNICORN_PRELOAD.
+    Compiling every page template here lets the workers share the compiled
+    code instead of each compiling it on its first requests, and the static
+    assets are built once here rather than on each worker's first request.
+    Per-process resources (database connections, the HTTP session, background
+    threads, the hashing pool) are created lazily in each worker and must not
+    be touched here.
+    """
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    if ASSET_PIPELINE:
+        static_assets.start()
 
 
 # ==================== AUTHENTICATION ROUTES ====================
@@ -337,20 +4008,26 @@ def register():
         if not re.match(r'^[^@]+@[^@]+\.[^@]+$', email):
             return jsonify({'error': 'Invalid email format'}), 400
         
-        if email in users_storage:
+        # Throttled like login attempts, so the duplicate-email answer can't be used to probe for accounts
+        wait = login_ip_limiter.consume(request.remote_addr) or login_account_limiter.consume(email)
+        if wait:
+            return throttled_response(wait)
+        
+        if storage.get_user(email) is not None:
             return jsonify({'error': 'Email already registered'}), 400
         
-        # Register user
-        users_storage[email] = {
-            'name': name,
-            'password_hash': generate_password_hash(password),
-            'created_at': datetime.now().isoformat(),
-            'profile_data': {}
-        }
+        try:
+            password_hash = password_hasher.hash(password)
+        except HasherBusy:
+            return jsonify({'error': 'Server busy, please try again'}), 503
+        
+        # Register user (the insert also guards against a concurrent registration)
+        if not storage.create_user(email, name, password_hash, datetime.now().isoformat()):
+            return jsonify({'error': 'Email already registered'}), 400
         
         return jsonify({'message': 'Registration successful! Please login.'}), 201
     
-    return render_template('register.html')
+    return page_cache.render('register.html')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -359,19 +4036,27 @@ def login():
         email = data.get('email', '').strip().lower()
         password = data.get('password', '')
         
-        if email not in users_storage:
-            return jsonify({'error': 'Invalid email or password'}), 401
+        wait = login_ip_limiter.consume(request.remote_addr) or login_account_limiter.consume(email)
+        if wait:
+            return throttled_response(wait)
         
-        user = users_storage[email]
-        if not check_password_hash(user['password_hash'], password):
-            return jsonify({'error': 'Invalid email or password'}), 401
+        user = storage.get_user(email)
+        try:
+            # Unknown emails are checked against a dummy hash so they cost as much as a wrong password
+            if not password_hasher.verify(user['password_hash'] if user else None, password):
+                return jsonify({'error': 'Invalid email or password'}), 401
+            
+            if password_hasher.needs_rehash(user['password_hash']):
+                storage.update_password_hash(email, password_hasher.hash(password))
+        except HasherBusy:
+            return jsonify({'error': 'Server busy, please try again'}), 503
         
         session['user_email'] = email
         session['user_name'] = user['name']
         
         return jsonify({'message': 'Login successful', 'redirect': '/dashboard'}), 200
     
-    return render_template('login.html')
+    return page_cache.render('login.html')
 
 @app.route('/logout')
 def logout():
@@ -381,75 +4066,80 @@ def logout():
 # ==================== CORE FEATURE ROUTES ====================
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return page_cache.render('index.html')
 
 @app.route('/quiz')
 def quiz():
     if 'user_email' not in session:
         return redirect(url_for('login'))
-    return render_template('quiz.html')
+    return page_cache.render('quiz.html')
 
 @app.route('/results')
 def results():
     if 'user_email' not in session:
         return redirect(url_for('login'))
-    return render_template('results.html')
+    return page_cache.render('results.html')
 
 @app.route('/dashboard')
 def dashboard():
     if 'user_email' not in session:
         return redirect(url_for('login'))
-    return render_template('dashboard.html')
+    return page_cache.render('dashboard.html')
 
 
 @app.route('/roadmap')
 def roadmap_general():
     """General career progression roadmap"""
-    return render_template('roadmap.html', career='General')
+    record_activity('roadmaps_viewed')
+    return page_cache.render('roadmap.html', career='General')
 
 @app.route('/roadmap/<career>')
 def roadmap(career):
-    # Convert URL-friendly career name back to actual career name
-    # Replace underscores with spaces and handle special cases
-    actual_career = career.replace('_', ' ')
-    # Handle special case for AI/ML Engineer
-    actual_career = actual_career.replace('AI ML Engineer', 'AI/ML Engineer')
-    
-    if actual_career not in CAREER_PATHS:
-        return redirect(url_for('roadmap_general'))
-    return render_template('roadmap.html', career=actual_career)
+    """Career-specific roadmap; the page loads its stages from /api/roadmap/<slug>"""
+    roadmaps = catalog.roadmaps
+    name = roadmaps.by_slug.get(career)
+    if name is None:
+        # Other spellings of a known career move to its canonical URL
+        name = roadmaps.resolve(career)
+        if name is None:
+            return redirect(url_for('roadmap_general'))
+        return redirect(url_for('roadmap', career=roadmaps.slugs[name]), 301)
+    record_activity('roadmaps_viewed')
+    return page_cache.render('roadmap.html', career=name, slug=career)
 
 @app.route('/resume_builder')
 def resume_builder():
-    return render_template('resume_builder.html')
+    return page_cache.render('resume_builder.html')
 
 @app.route('/college_finder')
 def college_finder():
-    return render_template('college_finder.html')
+    record_activity('colleges_browsed')
+    return page_cache.render('college_finder.html')
 
 @app.route('/scholarships')
 def scholarships():
-    return render_template('scholarships.html')
+    return page_cache.render('scholarships.html')
 
 @app.route('/career_services')
 def career_services():
-    return render_template('career_services.html')
+    return page_cache.render('career_services.html')
 
 @app.route('/career_insights')
 def career_insights():
-    return render_template('career_insights.html')
+    return page_cache.render('career_insights.html')
 
 @app.route('/ai_ml_datascience')
 def ai_ml_datascience():
-    return render_template('ai_ml_datascience.html')
+    return page_cache.render('ai_ml_datascience.html')
 
 @app.route('/chatbot')
 def chatbot():
-    return render_template('chatbot.html')
+    record_activity('chatbot_visits')
+    return page_cache.render('chatbot.html')
 
 @app.route('/feedback')
 def feedback():
-    return render_template('feedback.html')
+    return page_cache.render('feedback.html')
 
 # ==================== API ENDPOINTS ====================
 
@@ -462,227 +4152,198 @@ def submit_quiz():
         
         data = request.get_json()
         answers = data.get('answers', {})
+        profile = {'answers': answers, 'skills': data.get('skills', [])}
+        error = profile_error(profile)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Scoring algorithm for 10 career paths
-        career_scores = {
-            'Software Developer': 0,
-            'Data Scientist': 0,
-            'AI/ML Engineer': 0,
-            'UX/UI Designer': 0,
-            'Digital Marketing Specialist': 0,
-            'Cybersecurity Expert': 0,
-            'Product Manager': 0,
-            'Cloud Architect': 0,
-            'Business Analyst': 0,
-            'Content Writer': 0
+        top_careers = quiz_scorer.top_careers([answers])[0]
+        snapshot = catalog
+        result = {
+            'top_careers': describe_top_careers(top_careers),
+            'recommendation': recommend_learning_paths(snapshot.recommender, [profile])[0],
         }
         
-        # Scoring logic based on answers
-        # Question 1: Type of work
-        q1 = answers.get('q1', '')
-        if q1 == 'building_tech':
-            career_scores['Software Developer'] += 20
-            career_scores['AI/ML Engineer'] += 15
-            career_scores['Cloud Architect'] += 15
-        elif q1 == 'analyzing_data':
-            career_scores['Data Scientist'] += 20
-            career_scores['Business Analyst'] += 15
-            career_scores['Product Manager'] += 10
-        elif q1 == 'creating_visual':
-            career_scores['UX/UI Designer'] += 20
-            career_scores['Digital Marketing Specialist'] += 10
-        elif q1 == 'communicating':
-            career_scores['Digital Marketing Specialist'] += 20
-            career_scores['Content Writer'] += 15
-            career_scores['Product Manager'] += 10
-        
-        # Question 2: Skill to develop
-        q2 = answers.get('q2', '')
-        if q2 == 'programming':
-            for career in ['Software Developer', 'AI/ML Engineer', 'Cloud Architect']:
-                career_scores[career] += 15
-        elif q2 == 'data_analytics':
-            career_scores['Data Scientist'] += 15
-            career_scores['Business Analyst'] += 15
-        elif q2 == 'creative_design':
-            career_scores['UX/UI Designer'] += 15
-        elif q2 == 'cybersecurity':
-            career_scores['Cybersecurity Expert'] += 20
-        
-        # Question 3: Work environment
-        q3 = answers.get('q3', '')
-        if q3 == 'remote':
-            for career in career_scores:
-                career_scores[career] += 5
-        
-        # Question 4: Subjects interest
-        q4 = answers.get('q4', '')
-        if q4 == 'mathematics':
-            career_scores['Data Scientist'] += 10
-            career_scores['AI/ML Engineer'] += 10
-        elif q4 == 'science_tech':
-            career_scores['Software Developer'] += 10
-            career_scores['Cloud Architect'] += 10
-        elif q4 == 'arts_design':
-            career_scores['UX/UI Designer'] += 10
-        elif q4 == 'business':
-            career_scores['Business Analyst'] += 10
-            career_scores['Product Manager'] += 10
-        
-        # Process remaining answers (simplified)
-        for key, value in answers.items():
-            if key.startswith('q') and key not in ['q1', 'q2', 'q3', 'q4']:
-                # Distribute points based on answer values
-                if value in ['yes', 'very', 'high']:
-                    for career in career_scores:
-                        career_scores[career] += 2
-        
-        # Calculate match percentages
-        max_score = max(career_scores.values()) if career_scores.values() else 1
-        match_percentages = {}
-        for career, score in career_scores.items():
-            if max_score > 0:
-                percentage = min(int((score / (max_score + 20)) * 100), 100)
-            else:
-                percentage = 50
-            match_percentages[career] = percentage
+        # Store results and update progress
+        storage.record_quiz_result(
+            session['user_email'],
+            [c[0] for c in top_careers],
+            {c[0]: c[1] for c in top_careers},
+            datetime.now().isoformat()
+        )
+        
+        return jsonify(result), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/submit_quiz/batch', methods=['POST'])
+def submit_quiz_batch():
+    """Score many answer sets in one call (cohort imports); results are not stored"""
+    try:
+        if 'user_email' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
         
-        # Get top 3 careers
-        top_careers = sorted(match_percentages.items(), key=lambda x: x[1], reverse=True)[:3]
+        data = request.get_json() or {}
+        answer_sets = data.get('answer_sets')
+        if not isinstance(answer_sets, list) or not answer_sets:
+            return jsonify({'error': 'answer_sets must be a non-empty list'}), 400
+        if len(answer_sets) > MAX_QUIZ_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_QUIZ_BATCH_SIZE} answer sets per batch'}), 400
+        if not all(isinstance(answers, dict) for answers in answer_sets):
+            return jsonify({'error': 'Each answer set must be an object'}), 400
         
-        result = {
-            'top_careers': [
-                {
-                    'name': career,
-                    'score': score,
-                    'description': CAREER_PATHS.get(career, {}).get('description', ''),
-                    'salary': CAREER_PATHS.get(career, {}).get('salary_range', 'N/A'),
-                    'skills': CAREER_PATHS.get(career, {}).get('skills_required', [])
-                }
-                for career, score in top_careers
-            ]
-        }
+        results = [
+            {'top_careers': describe_top_careers(top_careers)}
+            for top_careers in quiz_scorer.top_careers(answer_sets)
+        ]
+        return jsonify({'results': results}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recommendations', methods=['POST'])
+def get_recommendations():
+    """Ranked learning path from quiz `answers` (or `career_scores`) and the `skills` already held"""
+    try:
+        profile = request.get_json() or {}
+        error = profile_error(profile)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Store results
-        quiz_results_storage.append({
-            'user_email': session['user_email'],
-            'careers': [c[0] for c in top_careers],
-            'scores': {c[0]: c[1] for c in top_careers},
-            'timestamp': datetime.now().isoformat()
-        })
+        snapshot = catalog
+        return jsonify(recommend_learning_paths(snapshot.recommender, [profile])[0]), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recommendations/batch', methods=['POST'])
+def get_recommendations_batch():
+    """Learning paths for a whole cohort of profiles in one vectorized pass"""
+    try:
+        if 'user_email' not in session:
+            return jsonify({'error': 'Not authenticated'}), 401
         
-        # Update progress
-        if session['user_email'] not in progress_storage:
-            progress_storage[session['user_email']] = {'quizzes_taken': 0, 'matches_found': 0}
-        progress_storage[session['user_email']]['quizzes_taken'] += 1
-        progress_storage[session['user_email']]['matches_found'] = len(top_careers)
+        data = request.get_json() or {}
+        profiles = data.get('profiles')
+        if not isinstance(profiles, list) or not profiles:
+            return jsonify({'error': 'profiles must be a non-empty list'}), 400
+        if len(profiles) > MAX_QUIZ_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_QUIZ_BATCH_SIZE} profiles per batch'}), 400
+        for index, profile in enumerate(profiles):
+            error = profile_error(profile)
+            if error:
+                return jsonify({'error': f'Profile {index}: {error}'}), 400
         
-        return jsonify(result), 200
+        snapshot = catalog
+        return jsonify({'results': recommend_learning_paths(snapshot.recommender, profiles)}), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/build_resume', methods=['POST'])
 def build_resume():
-    """Resume generation endpoint"""
+    """Resume generation endpoint (HTML wrapped in JSON; see /api/resume/render)"""
     try:
-        data = request.get_json()
-        
-        html_resume = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>{data.get('name', 'Resume')}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }}
-        .header {{ text-align: center; margin-bottom: 20px; border-bottom: 2px solid #333; padding-bottom: 10px; }}
-        .header h1 {{ margin: 0; font-size: 28px; }}
-        .header p {{ margin: 5px 0; color: #666; }}
-        .section {{ margin: 20px 0; }}
-        .section h2 {{ font-size: 14px; font-weight: bold; text-transform: uppercase; border-bottom: 1px solid #999; padding-bottom: 5px; }}
-        .entry {{ margin: 10px 0; }}
-        .entry h3 {{ margin: 0; font-size: 14px; }}
-        .entry p {{ margin: 5px 0; }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>{data.get('name', 'Your Name')}</h1>
-        <p>{data.get('email', 'email@example.com')} | {data.get('phone', '+91-XXXXXXXXXX')}</p>
-        <p>{data.get('location', 'City, State')}</p>
-    </div>
-    
-    <div class="section">
-        <h2>Professional Summary</h2>
-        <p>{data.get('summary', 'Passionate professional with expertise in multiple domains.')}</p>
-    </div>
-    
-    <div class="section">
-        <h2>Education</h2>
-        <div class="entry">
-            <h3>{data.get('education', 'B.Tech Computer Science')}</h3>
-            <p>{data.get('university', 'University Name')} | {data.get('graduation_year', '2024')}</p>
-        </div>
-    </div>
-    
-    <div class="section">
-        <h2>Experience</h2>
-        <div class="entry">
-            <h3>{data.get('job_title', 'Your Job Title')}</h3>
-            <p>{data.get('company', 'Company Name')} | {data.get('employment_period', 'Jan 2023 - Present')}</p>
-            <p>{data.get('job_description', 'Describe your key responsibilities and achievements.')}</p>
-        </div>
-    </div>
-    
-    <div class="section">
-        <h2>Skills</h2>
-        <p>{', '.join(data.get('skills', []))}</p>
-    </div>
-    
-    <div class="section">
-        <h2>Projects</h2>
-        <div class="entry">
-            <h3>{data.get('project_name', 'Project Name')}</h3>
-            <p>{data.get('project_description', 'Project description and technologies used.')}</p>
-        </div>
-    </div>
-</body>
-</html>
-        """
+        data = request.get_json() or {}
+        resume = normalize_resume(data)
+        entry = resume_cache.get(
+            resume_cache_key(resume, 'classic', 'html'),
+            lambda: render_resume(resume, 'classic', 'html')
+        )
         
         return jsonify({
-            'html': html_resume,
-            'filename': f"{data.get('name', 'resume').replace(' ', '_')}_resume.html"
+            'html': entry.body.decode('utf-8'),
+            'filename': resume_filename(data.get('name'), 'html')
         }), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/resume/render', methods=['POST'])
+def render_resume_document():
+    """Render a resume and return the HTML or PDF document itself"""
+    try:
+        data = request.get_json() or {}
+        theme = request.args.get('theme', 'classic').lower()
+        fmt = request.args.get('format', 'html').lower()
+        
+        if theme not in RESUME_THEMES:
+            return jsonify({'error': f'Unknown theme: {theme}'}), 400
+        if fmt not in RESUME_FORMATS:
+            return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+        if fmt == 'pdf' and not PDF_EXPORT_AVAILABLE:
+            return jsonify({'error': 'PDF export is not available on this server'}), 501
+        
+        # Repeated previews of an unchanged resume are served from the cache
+        resume = normalize_resume(data)
+        entry = resume_cache.get(resume_cache_key(resume, theme, fmt), lambda: render_resume(resume, theme, fmt))
+        response = cached_response(entry)
+        if request.args.get('download'):
+            filename = resume_filename(data.get('name'), fmt)
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/colleges', methods=['GET'])
 def get_colleges():
-    """Get college database"""
+    """Query the college database with filtering, sorting and pagination"""
     try:
-        college_type = request.args.get('type', 'all').lower()
-        
-        if college_type == 'iits':
-            return jsonify(COLLEGES_DATABASE['iits']), 200
-        elif college_type == 'nits':
-            return jsonify(COLLEGES_DATABASE['nits']), 200
-        elif college_type == 'iits':
-            return jsonify(COLLEGES_DATABASE['iIits']), 200
-        elif college_type == 'aiims':
-            return jsonify(COLLEGES_DATABASE['aiims']), 200
-        elif college_type == 'private':
-            return jsonify(COLLEGES_DATABASE['private_universities']), 200
-        elif college_type == 'iims':
-            return jsonify(COLLEGES_DATABASE['iims']), 200
-        else:
-            # Return all colleges
-            all_colleges = []
-            for colleges in COLLEGES_DATABASE.values():
-                all_colleges.extend(colleges)
-            return jsonify(all_colleges), 200
+        args = request.args
+        snapshot = catalog
+        college_type = args.get('type', 'all').lower()
+        category = COLLEGE_TYPE_ALIASES.get(college_type, college_type)
+        if category not in snapshot.college_index.by_category:
+            category = None
+
+        sort = args.get('sort', 'rank').lower()
+        if sort not in COLLEGE_SORT_KEYS:
+            return jsonify({'error': f'Unsupported sort: {sort}'}), 400
+
+        limit = None
+        if args.get('limit'):
+            try:
+                limit = int(args['limit'])
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                return jsonify({'error': 'limit must be a positive integer'}), 400
+            limit = min(limit, MAX_COLLEGE_PAGE_SIZE)
+
+        min_package = None
+        if args.get('min_package'):
+            try:
+                min_package = float(args['min_package'])
+            except ValueError:
+                min_package = math.nan
+            if not math.isfinite(min_package):
+                return jsonify({'error': 'min_package must be a number'}), 400
+
+        after = None
+        if args.get('cursor'):
+            try:
+                after = decode_college_cursor(args['cursor'], sort)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        query = (
+            category,
+            normalize_query_text(args.get('q')),
+            normalize_query_text(args.get('location')),
+            normalize_query_text(args.get('entrance')),
+            min_package,
+            sort,
+            limit,
+            after,
+        )
+        entry = catalog_cache.get(
+            ('colleges', snapshot.version) + query,
+            lambda: json_payload(*college_query_view(snapshot.college_index, *query))
+        )
+        # Body stays a plain list; pagination metadata travels in headers
+        return cached_response(entry)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -690,30 +4351,153 @@ def get_colleges():
 @app.route('/api/skills', methods=['GET'])
 def get_skills():
     """Get skills database"""
-    return jsonify(SKILLS_DATABASE), 200
+    snapshot = catalog
+    return cached_response(catalog_cache.get(('skills', snapshot.version), lambda: json_payload(snapshot.skills)))
 
 @app.route('/api/careers', methods=['GET'])
 def get_careers():
     """Get career paths"""
-    return jsonify(CAREER_PATHS), 200
+    snapshot = catalog
+    return cached_response(catalog_cache.get(('careers', snapshot.version), lambda: json_payload(snapshot.careers)))
+
+@app.route('/api/roadmap', methods=['GET'])
+def list_roadmaps():
+    """Careers with a roadmap and their slugs"""
+    snapshot = catalog
+    return cached_response(catalog_cache.get(('roadmaps', snapshot.version), lambda: json_payload([
+        {'career': career, 'slug': slug, 'url': f'/api/roadmap/{slug}'}
+        for career, slug in snapshot.roadmaps.slugs.items()
+    ])))
+
+@app.route('/api/roadmap/<slug>', methods=['GET'])
+def get_roadmap(slug):
+    """Precomputed roadmap of one career: stages with durations, skills and salary ranges"""
+    snapshot = catalog
+    career = snapshot.roadmaps.by_slug.get(slug)
+    if career is None:
+        career = snapshot.roadmaps.resolve(slug)
+        if career is None:
+            return jsonify({'error': 'Unknown career'}), 404
+        return redirect(url_for('get_roadmap', slug=snapshot.roadmaps.slugs[career]), 301)
+    return cached_response(catalog_cache.get(
+        ('roadmap', snapshot.version, career), lambda: json_payload(snapshot.roadmaps.payloads[career])
+    ))
 
 @app.route('/api/scholarships', methods=['GET'])
 def get_scholarships():
-    """Get scholarship listings"""
-    # In a real application, this would fetch from a database
-    # For now, we'll return the static data with some dynamic elements
-    import random
-    from datetime import datetime, timedelta
-    
-    # Add dynamic elements to the scholarship data
-    scholarships_with_dates = []
-    for scholarship in SCHOLARSHIPS:
-        # Create a copy with dynamic last updated time
-        sch_copy = scholarship.copy()
-        sch_copy['last_updated'] = datetime.now().strftime('%d/%m/%Y, %I:%M:%S %p')
-        scholarships_with_dates.append(sch_copy)
-    
-    return jsonify(scholarships_with_dates), 200
+    """Scholarship listings, soonest deadline first, with days left computed for today"""
+    try:
+        args = request.args
+        status = args.get('status', 'all').lower()
+        if status not in SCHOLARSHIP_STATUSES:
+            return jsonify({'error': f'Unsupported status: {status}'}), 400
+        
+        closing_within = args.get('closing_within', type=int)
+        if closing_within is not None and closing_within < 0:
+            return jsonify({'error': 'closing_within must be a number of days'}), 400
+        
+        index = scholarship_service.current(catalog)
+        today = date.today()
+        query = (
+            normalize_query_text(args.get('category')),
+            normalize_query_text(args.get('education_level')),
+            status,
+            closing_within,
+        )
+        entry = catalog_cache.get(
+            ('scholarships', index.version, today) + query,
+            lambda: json_payload(index.query(today, *query), headers=index.headers(today))
+        )
+        return cached_response(entry)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    """Full-text search across careers, skills, colleges and scholarships"""
+    try:
+        q = normalize_query_text(request.args.get('q'))
+        if not q:
+            return jsonify({'error': 'q is required'}), 400
+        
+        types = request.args.get('type')
+        if types:
+            types = tuple(sorted(set(t.strip().lower() for t in types.split(',') if t.strip())))
+            unknown = [t for t in types if t not in SEARCH_TYPES]
+            if unknown:
+                return jsonify({'error': f"Unknown type: {', '.join(unknown)}"}), 400
+        
+        try:
+            limit = min(max(int(request.args.get('limit', 10)), 1), MAX_SEARCH_RESULTS)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        
+        snapshot = catalog
+        key = ('search', snapshot.version, q, types or None, limit)
+        return cached_response(search_cache.get(
+            key, lambda: json_payload(search_view(snapshot.search_index, q, types, limit))
+        ))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search/suggest', methods=['GET'])
+def search_suggest():
+    """Title autocomplete for the navbar search box"""
+    try:
+        q = normalize_query_text(request.args.get('q'))
+        if not q:
+            return jsonify([]), 200
+        
+        snapshot = catalog
+        
+        def build():
+            return json_payload([
+                {'type': document.doc_type, 'title': document.title, 'url': document.url}
+                for document in snapshot.search_index.suggest(q)
+            ])
+        
+        return cached_response(search_cache.get(('suggest', snapshot.version, q), build))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/catalog', methods=['GET'])
+def catalog_info():
+    """Version and size of the reference data this worker is serving"""
+    snapshot = catalog
+    return jsonify({
+        'version': snapshot.version,
+        'loaded_at': snapshot.loaded_at,
+        'counts': snapshot.counts()
+    }), 200
+
+@app.route('/api/admin/catalog/reload', methods=['POST'])
+def reload_catalog_endpoint():
+    """Reload the catalog files now and signal the other workers (X-Admin-Token)"""
+    if not CATALOG_ADMIN_TOKEN:
+        return jsonify({'error': 'Catalog reload is disabled (CATALOG_ADMIN_TOKEN not set)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), CATALOG_ADMIN_TOKEN):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    
+    try:
+        snapshot, changed = reload_catalog()
+    except CatalogError as e:
+        return jsonify({'error': str(e), 'version': catalog.version}), 422
+    
+    try:
+        # Other workers only watch the files; bump the marker so they reload too
+        with open(os.path.join(CATALOG_DIR, CATALOG_RELOAD_MARKER), 'w') as f:
+            f.write(snapshot.version)
+    except OSError as e:
+        log_event('catalog.marker_failed', logging.WARNING, error=str(e))
+    
+    return jsonify({
+        'version': snapshot.version,
+        'changed': changed,
+        'counts': snapshot.counts()
+    }), 200
 
 @app.route('/api/user/stats', methods=['GET'])
 def user_stats():
@@ -722,8 +4506,8 @@ def user_stats():
         return jsonify({'error': 'Not authenticated'}), 401
     
     email = session['user_email']
-    user = users_storage.get(email, {})
-    progress = progress_storage.get(email, {'quizzes_taken': 0, 'matches_found': 0})
+    user = storage.get_user(email) or {}
+    progress = storage.get_progress(email)
     
     return jsonify({
         'name': user.get('name', 'User'),
@@ -731,40 +4515,179 @@ def user_stats():
         'joined': user.get('created_at', ''),
         'quizzes_taken': progress.get('quizzes_taken', 0),
         'matches_found': progress.get('matches_found', 0),
-        'roadmaps_viewed': progress.get('roadmaps_viewed', 0)
+        **{event: progress.get(event, 0) for event in ACTIVITY_EVENTS}
     }), 200
 
+def analytics_window_days():
+    """Validated `days` query parameter for the analytics endpoints (None when invalid)"""
+    days = request.args.get('days', QUIZ_ANALYTICS_DEFAULT_DAYS, type=int)
+    return days if days is not None and 1 <= days <= QUIZ_AGGREGATE_RETENTION_DAYS else None
+
+@app.route('/api/analytics/careers', methods=['GET'])
+def analytics_careers():
+    """Career popularity per day from the quiz aggregates"""
+    if 'user_email' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    days = analytics_window_days()
+    if days is None:
+        return jsonify({'error': f'days must be between 1 and {QUIZ_AGGREGATE_RETENTION_DAYS}'}), 400
+    
+    try:
+        return jsonify(career_popularity(days)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/scores', methods=['GET'])
+def analytics_scores():
+    """Match percentage distribution per career"""
+    if 'user_email' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    days = analytics_window_days()
+    if days is None:
+        return jsonify({'error': f'days must be between 1 and {QUIZ_AGGREGATE_RETENTION_DAYS}'}), 400
+    
+    try:
+        return jsonify(score_distribution(days, request.args.get('career'))), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/cohorts', methods=['GET'])
+def analytics_cohorts():
+    """First-choice careers broken down by signup month"""
+    if 'user_email' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    days = analytics_window_days()
+    if days is None:
+        return jsonify({'error': f'days must be between 1 and {QUIZ_AGGREGATE_RETENTION_DAYS}'}), 400
+    
+    try:
+        return jsonify(cohort_breakdown(days)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/export/<dataset>', methods=['GET'])
+def export_data(dataset):
+    """Stream quiz results or feedback as CSV or NDJSON (X-Admin-Token)
+
+    Query parameters: `format` (csv or ndjson), `since`/`until` (ISO date or
+    timestamp, until exclusive), `fields` (comma separated), `email`, and for
+    feedback also `feedback_type`, `status` and `min_rating`. The body is
+    gzip-compressed on the fly when the client accepts it.
+    """
+    if not EXPORT_ADMIN_TOKEN:
+        return jsonify({'error': 'Data export is disabled (EXPORT_ADMIN_TOKEN not set)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), EXPORT_ADMIN_TOKEN):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    
+    available = {'quiz_results': QUIZ_EXPORT_FIELDS, 'feedback': FEEDBACK_EXPORT_FIELDS}.get(dataset)
+    if available is None:
+        return jsonify({'error': 'Unknown dataset (use quiz_results or feedback)'}), 404
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    
+    fields = tuple(field.strip() for field in request.args.get('fields', '').split(',') if field.strip()) or available
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        return jsonify({'error': f'Unknown fields: {", ".join(unknown)}', 'fields': list(available)}), 400
+    
+    try:
+        since, until = export_time_bound('since'), export_time_bound('until')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    email = request.args.get('email') or None
+    if dataset == 'quiz_results':
+        rows = storage.export_quiz_results(since, until, email=email, fields=fields)
+    else:
+        min_rating = request.args.get('min_rating', type=float)
+        if 'min_rating' in request.args and min_rating is None:
+            return jsonify({'error': 'min_rating must be a number'}), 400
+        filters = {column: request.args[column] for column in FEEDBACK_EXPORT_FILTERS if request.args.get(column)}
+        rows = storage.export_feedback(since, until, filters=filters, min_rating=min_rating, fields=fields)
+    
+    compress = request.accept_encodings.best_match(['gzip', 'identity']) == 'gzip'
+    headers = {
+        'Content-Disposition': f'attachment; filename={dataset}-{date.today().isoformat()}.{export_format}',
+        'Cache-Control': 'no-store',
+        'Vary': 'Accept-Encoding',
+        'X-Accel-Buffering': 'no',
+    }
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    return app.response_class(export_stream(dataset, rows, fields, export_format, compress),
+                              mimetype=EXPORT_FORMATS[export_format], headers=headers)
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    """Career guidance chatbot endpoint using OpenRouter API (stateless)."""
+    """Career guidance chatbot endpoint using OpenRouter API.
+
+    The conversation is kept server-side per browser session (see
+    ConversationMemory); `"clear_history": true` starts a new one.
+    Pass `"stream": true` to receive the answer as server-sent events
+    (`data: {"delta": ...}` frames, then an `event: done` frame).
+    """
     try:
         data = request.get_json() or {}
-        user_message = (data.get('message') or '').strip()
+        user_message = truncate_tokens((data.get('message') or '').strip(), CHAT_MESSAGE_TOKENS)
         clear_history = data.get('clear_history', False)
 
-        # If frontend asks to clear history, just acknowledge (no server-side history now)
-        if clear_history and not user_message:
-            return jsonify({'message': 'Chat history cleared', 'success': True}), 200
+        if clear_history:
+            conversation_id = session.pop('chat_conversation_id', None)
+            if conversation_id:
+                conversation_memory.clear(conversation_id)
+            if not user_message:
+                return jsonify({'message': 'Chat history cleared', 'success': True}), 200
 
         if not user_message:
             return jsonify({'error': 'Message cannot be empty', 'success': False}), 400
 
+        if 'chat_conversation_id' not in session:
+            session['chat_conversation_id'] = uuid.uuid4().hex
+        conversation_id = session['chat_conversation_id']
+        messages = conversation_memory.messages(conversation_id, user_message)
+        # remember() may run after a stream ends, outside this request's session
+        user_email = session.get('user_email')
+
+        # Answers depend on the conversation so far, so only opening questions use the cache.
+        # "cache": false or Cache-Control: no-cache skips the lookup; the answer is still stored.
+        first_turn = len(messages) == 2
+        use_cache = (first_turn and data.get('cache', True) is not False
+                     and 'no-cache' not in request.headers.get('Cache-Control', ''))
+        stream = bool(data.get('stream'))
+        if use_cache:
+            cached_answer = chat_cache.get(user_message)
+            if cached_answer is not None:
+                conversation_memory.record(conversation_id, user_message, cached_answer)
+                activity.record(user_email, 'chat_messages')
+                if stream:
+                    return stream_cached_answer(cached_answer)
+                return jsonify({'message': cached_answer, 'success': True, 'cached': True}), 200
+
+        def remember(answer):
+            conversation_memory.record(conversation_id, user_message, answer)
+            activity.record(user_email, 'chat_messages')
+            if first_turn:
+                chat_cache.put(user_message, answer)
+
         api_key = os.getenv('OPENROUTER_API_KEY')
         if not api_key:
             return jsonify({'error': 'API key not configured on server', 'success': False}), 500
 
-        system_prompt = (
-            "You are a professional career guidance counselor assistant for Indian students and "
-            "professionals. Give clear, practical, step-by-step advice about careers, skills, "
-            "education paths, colleges, and job search. Keep answers structured and easy to follow."
-        )
-
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message},
-        ]
+        # Cached answers above are free; only calls that reach the model are limited.
+        # The client bucket goes first so a throttled session does not drain its IP's bucket.
+        for reason, limiter, key in (('client', chat_client_limiter, chat_client_id()),
+                                     ('ip', chat_ip_limiter, request.remote_addr)):
+            wait = limiter.consume(key)
+            if wait:
+                metrics.inc('chat_rejected_total', reason=reason)
+                return throttled_response(wait, 'Too many messages. Please slow down and try again shortly.')
 
-        api_url = 'https://openrouter.ai/api/v1/chat/completions'
+        api_url = os.getenv('OPENROUTER_API_URL', 'https://openrouter.ai/api/v1/chat/completions')
         site_url = os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5000')
         app_title = os.getenv('OPENROUTER_APP_TITLE', 'SmartCareer')
 
@@ -782,25 +4705,32 @@ def chat():
             'max_tokens': 800,
         }
 
-        # Log the request for debugging
-        print(f"Sending request to OpenRouter API with message: {user_message}")
-        print(f"Using API key: {api_key[:10]}...")  # Log first 10 chars of API key for verification
+        lease = chat_admission.acquire()
+        try:
+            if stream:
+                # The lease now belongs to the stream and is released when it closes
+                streamed = stream_chat_response(
+                    api_url, headers, payload,
+                    on_complete=remember,
+                    on_close=lambda stream_lease=lease: chat_admission.release(stream_lease)
+                )
+                lease = None
+                return streamed
 
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-        
-        print(f"API Response Status Code: {response.status_code}")
-        print(f"API Response Headers: {dict(response.headers)}")
+            response = upstream.post(api_url, service='openrouter', headers=headers, json=payload, timeout=30)
+        finally:
+            if lease is not None:
+                chat_admission.release(lease)
 
         if response.status_code != 200:
             error_text = response.text
-            print(f"API Error Response: {error_text}")
+            log_event('chat.upstream_error', logging.WARNING, status=response.status_code, body=error_text[:500])
             return jsonify({
                 'error': f'API request failed with status {response.status_code}: {error_text}',
                 'success': False,
             }), response.status_code
 
         result = response.json()
-        print(f"API Success Response: {result}")
         
         # Check if we have a valid response
         if 'choices' not in result or not result['choices']:
@@ -810,19 +4740,23 @@ def chat():
             }), 500
             
         choice = result['choices'][0]
-        assistant_message = choice.get('message', {}).get(
-            'content',
-            'Sorry, I could not generate a response right now.'
-        )
+        content = choice.get('message', {}).get('content')
+        if content:
+            remember(content)
+        assistant_message = content or 'Sorry, I could not generate a response right now.'
 
         return jsonify({'message': assistant_message, 'success': True}), 200
 
+    except UpstreamBusy as e:
+        response = jsonify({'error': str(e), 'success': False})
+        response.headers['Retry-After'] = str(max(1, math.ceil(CHAT_QUEUE_TIMEOUT)))
+        return response, 503
     except requests.exceptions.Timeout:
         return jsonify({'error': 'Request timed out. Please try again.', 'success': False}), 504
     except requests.exceptions.RequestException as e:
         return jsonify({'error': f'Network error: {str(e)}', 'success': False}), 500
     except Exception as e:
-        print(f"Unexpected error in chat endpoint: {str(e)}")
+        logger.exception('chat.failed')
         return jsonify({'error': f'An error occurred: {str(e)}', 'success': False}), 500
 
 @app.route('/api/submit_feedback', methods=['POST'])
@@ -848,7 +4782,6 @@ def submit_feedback():
         
         # Create feedback entry
         feedback_entry = {
-            'id': len(feedback_storage) + 1,
             'name': data.get('name'),
             'email': data.get('email'),
             'feedback_type': data.get('feedback_type'),
@@ -859,37 +4792,28 @@ def submit_feedback():
             'status': 'new'
         }
         
-        # Store feedback locally
-        feedback_storage.append(feedback_entry)
-        
-        # Send to Web3 Forms API
+        # Queue delivery to Web3 Forms; the outbox worker sends it in the background
         web3_api_key = os.getenv('WEB3FORMS_ACCESS_KEY')
-        web3_url = 'https://api.web3forms.com/submit'
         if not web3_api_key:
-            print("WEB3FORMS_ACCESS_KEY is not configured; skipping external Web3 submission")
+            log_event('feedback.delivery_skipped', logging.WARNING, reason='WEB3FORMS_ACCESS_KEY is not configured')
+            web3_payload = None
             web3_status = 'skipped'
         else:
+            web3_payload = {
+                'name': data.get('name'),
+                'email': data.get('email'),
+                'subject': data.get('subject'),
+                'message': data.get('message'),
+                'feedback_type': data.get('feedback_type'),
+                'rating': data.get('rating', 0),
+                'from': 'SmartCareer Feedback Form',
+            }
             web3_status = 'pending'
-        web3_payload = {
-            'access_key': web3_api_key,
-            'name': data.get('name'),
-            'email': data.get('email'),
-            'subject': data.get('subject'),
-            'message': data.get('message'),
-            'feedback_type': data.get('feedback_type'),
-            'rating': data.get('rating', 0),
-            'from': 'SmartCareer Feedback Form',
-        }
         
-        if web3_api_key:
-            print(f"Submitting feedback to Web3 Forms API: {web3_payload['name']} <{web3_payload['email']}>")
-            web3_response = requests.post(web3_url, json=web3_payload, timeout=15)
-            print(f"Web3 Forms API response status: {web3_response.status_code}")
-            if web3_response.status_code != 200:
-                print(f"Web3 Forms API error response: {web3_response.text}")
-                web3_status = 'failed'
-            else:
-                web3_status = 'submitted'
+        # Store feedback locally
+        feedback_entry['id'] = storage.add_feedback(feedback_entry, web3_payload)
+        if web3_payload is not None:
+            feedback_delivery.notify()
         
         return jsonify({
             'success': True,
@@ -899,9 +4823,40 @@ def submit_feedback():
         }), 200
     
     except Exception as e:
-        print(f"Error in submit_feedback: {str(e)}")
+        logger.exception('feedback.failed')
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
 
+@app.route('/api/feedback/<int:feedback_id>/status', methods=['GET'])
+def feedback_status(feedback_id):
+    """Delivery status of a feedback submission"""
+    delivery = storage.get_feedback_delivery(feedback_id)
+    if delivery is None:
+        return jsonify({'error': 'Feedback not found'}), 404
+    
+    return jsonify({
+        'feedback_id': feedback_id,
+        'web3_status': delivery['status'],
+        'attempts': delivery['attempts'],
+        'updated_at': datetime.fromtimestamp(delivery['updated_at']).isoformat()
+    }), 200
+
+# ==================== MONITORING ====================
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text-format metrics (summed across workers when METRICS_DIR is set)"""
+    body = metrics.render(metrics.worker_snapshots())
+    return app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/profiles/<request_id>', methods=['GET'])
+def get_profile(request_id):
+    """Collapsed stacks of a request profiled with `X-Profile` (feed to flamegraph.pl or speedscope)"""
+    token = request.headers.get('X-Profile', '')
+    if not PROFILER_TOKEN or not hmac.compare_digest(token, PROFILER_TOKEN):
+        return jsonify({'error': 'Profiling is disabled or the token is invalid'}), 403
+    if request_id not in recent_profiles:
+        return jsonify({'error': 'Profile not found (profiles are kept per worker)'}), 404
+    return app.response_class(recent_profiles[request_id], mimetype='text/plain')
+
 # ==================== ERROR HANDLERS ====================
 @app.errorhandler(404)
 def not_found(error):
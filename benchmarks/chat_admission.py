@@ -0,0 +1,146 @@
+"""Exercise /api/chat rate limiting and admission control across gunicorn workers.
+
+Boots benchmarks/stub_upstream.py with injected latency and gunicorn with
+several gevent workers sharing one SQLite database, then:
+
+1. capacity: floods /api/chat with rate limits lifted and checks that the
+   stub never sees more than CHAT_MAX_CONCURRENT completions at once, and
+   that requests beyond the wait queue are turned away fast with a 503;
+2. rate limits: sends a burst from one client and checks that requests past
+   the token bucket get a 429 with Retry-After, whichever worker serves them.
+
+Usage: python benchmarks/chat_admission.py [--workers 2] [--max-concurrent 5] [--requests 120]
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from upstream_concurrency import ROOT, free_port, wait_for_port
+
+BODY = {'message': 'How do I become a data scientist?', 'cache': False}
+
+
+def request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    started = time.perf_counter()
+    conn.request(method, path, json.dumps(body) if body is not None else None,
+                 dict({'Content-Type': 'application/json'}, **(headers or {})))
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response.status, response.getheader('Retry-After'), data, time.perf_counter() - started
+
+
+def start_server(port, workers, env):
+    server = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'app:app', '-k', 'gevent', '-w', str(workers),
+        '-b', f'127.0.0.1:{port}', '--timeout', '300', '--log-level', 'warning',
+    ], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port)
+    return server
+
+
+def report(results):
+    by_status = {}
+    for status, retry_after, _, latency in results:
+        by_status.setdefault(status, []).append((retry_after, latency))
+    for status, rows in sorted(by_status.items()):
+        latencies = [latency for _, latency in rows]
+        retry = Counter(retry_after for retry_after, _ in rows if retry_after)
+        print(f'    {status}: {len(rows):4d}  p50 {statistics.median(latencies) * 1e3:7.1f} ms  '
+              f'max {max(latencies) * 1e3:7.1f} ms' + (f'  Retry-After {dict(retry)}' if retry else ''))
+    return by_status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.5, help='injected upstream latency (s)')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-concurrent', type=int, default=5)
+    parser.add_argument('--max-waiting', type=int, default=10, help='queued requests allowed per worker')
+    parser.add_argument('--requests', type=int, default=120)
+    parser.add_argument('--concurrency', type=int, default=60)
+    parser.add_argument('--burst', type=int, default=8, help='per-client burst for the rate limit phase')
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'benchmarks', 'stub_upstream.py'),
+        '--port', str(stub_port), '--latency', str(args.latency),
+    ], stdout=subprocess.DEVNULL)
+    wait_for_port(stub_port)
+
+    base_env = dict(
+        os.environ,
+        OPENROUTER_API_KEY='stub',
+        OPENROUTER_API_URL=f'http://127.0.0.1:{stub_port}/api/v1/chat/completions',
+        CHAT_MAX_CONCURRENT=str(args.max_concurrent),
+        CHAT_MAX_WAITING=str(args.max_waiting),
+        CHAT_QUEUE_TIMEOUT=str(args.latency * 4),
+    )
+    try:
+        print(f'{args.workers} gevent workers, upstream latency {args.latency}s, '
+              f'CHAT_MAX_CONCURRENT={args.max_concurrent}, CHAT_MAX_WAITING={args.max_waiting} per worker')
+
+        print(f'\n1. capacity: {args.requests} requests, concurrency {args.concurrency}, rate limits lifted')
+        env = dict(base_env, CHAT_IP_BURST='1000000', CHAT_SESSION_BURST='1000000',
+                   DATABASE_PATH=os.path.join(tempfile.mkdtemp(), 'admission.db'))
+        port = free_port()
+        server = start_server(port, args.workers, env)
+        try:
+            request(stub_port, 'POST', '/stats/reset', {})
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                results = list(pool.map(lambda _: request(port, 'POST', '/api/chat', BODY), range(args.requests)))
+            report(results)
+            stats = json.loads(request(stub_port, 'GET', '/stats')[2])
+            verdict = 'ok' if stats['max_in_flight'] <= args.max_concurrent else 'EXCEEDED'
+            print(f'    upstream saw {stats["requests"]} calls, at most {stats["max_in_flight"]} at once ({verdict})')
+        finally:
+            server.terminate()
+            server.wait()
+
+        print(f'\n2. rate limits: CHAT_SESSION_BURST={args.burst}, CHAT_IP_BURST={args.burst * 4}, '
+              'one request at a time (a new connection each, spread over the workers)')
+        env = dict(base_env, CHAT_IP_BURST=str(args.burst * 4), CHAT_SESSION_BURST=str(args.burst),
+                   CHAT_IP_PER_MINUTE='1', CHAT_SESSION_PER_MINUTE='1',
+                   DATABASE_PATH=os.path.join(tempfile.mkdtemp(), 'admission.db'))
+        port = free_port()
+        server = start_server(port, args.workers, env)
+        try:
+            # The first answer sets the session cookie carrying the anonymous client id
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+            conn.request('POST', '/api/chat', json.dumps(BODY), {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            cookie = response.getheader('Set-Cookie', '').split(';')[0]
+            conn.close()
+
+            print(f'  one session, {args.burst * 2} more requests')
+            results = [request(port, 'POST', '/api/chat', BODY, {'Cookie': cookie}) for _ in range(args.burst * 2)]
+            report(results)
+            admitted = 1 + sum(status == 200 for status, _, _, _ in results)
+            print(f'    admitted {admitted} of {len(results) + 1} (expected {args.burst})')
+
+            print(f'  new session per request, {args.burst * 4} requests from the same IP')
+            results = [request(port, 'POST', '/api/chat', BODY) for _ in range(args.burst * 4)]
+            report(results)
+            admitted += sum(status == 200 for status, _, _, _ in results)
+            print(f'    admitted {admitted} from this IP in total (expected {args.burst * 4})')
+        finally:
+            server.terminate()
+            server.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == '__main__':
+    main()
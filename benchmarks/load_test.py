@@ -0,0 +1,369 @@
+"""Reproducible load test of the HTTP endpoints under gunicorn.
+
+Boots benchmarks/stub_upstream.py (standing in for OpenRouter and Web3Forms)
+and gunicorn on app:app with a fresh SQLite database, registers and logs in a
+pool of users, then runs closed-loop virtual users for a fixed duration. Each
+virtual user keeps its own keep-alive connection and session cookie and picks
+the next scenario from a weighted traffic mix (pages, college browsing with
+cursor pagination, search, quiz submissions, recommendations, resume renders,
+chat and feedback) with a seeded RNG, so runs send the same request mix.
+
+Reports p50/p95/p99 latency, throughput and errors per endpoint plus the
+memory (RSS/PSS/USS, see startup.py) and CPU of each worker, and writes them
+to a JSON file tagged with the git commit. `--compare` prints the change of
+every endpoint against an earlier result file and exits with status 1 when a
+p95 latency or throughput regressed by more than `--threshold`.
+
+The load generator is Python threads; if its own CPU saturates, the numbers
+stop moving with more workers and the client is the bottleneck, not the app.
+
+Linux only (reads /proc). Usage:
+    python benchmarks/load_test.py [--workers 4] [--duration 30] [--concurrency 32]
+    python benchmarks/load_test.py --output after.json --compare before.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from startup import children, cpu_seconds, memory
+from upstream_concurrency import FEEDBACK_BODY, ROOT, free_port, wait_for_port
+
+QUIZ_OPTIONS = {
+    'q1': ['building_tech', 'analyzing_data', 'creating_visual', 'communicating'],
+    'q2': ['programming', 'data_analytics', 'creative_design', 'cybersecurity'],
+    'q3': ['remote', 'office', 'hybrid', 'freelance'],
+    'q4': ['mathematics', 'science_tech', 'arts_design', 'business'],
+    'q5': ['alone', 'team', 'both', 'lead'],
+    'q6': ['very', 'moderate', 'low', 'not'],
+}
+SKILLS = ['Python', 'SQL', 'Machine Learning', 'JavaScript', 'Cloud Computing', 'Data Analysis', 'UI/UX Design']
+PAGES = ['/', '/college_finder', '/career_insights', '/scholarships', '/chatbot', '/dashboard', '/roadmap/Data_Scientist']
+SEARCHES = ['data science', 'python', 'iit', 'scholarship girls', 'cloud', 'machine lerning', 'design', 'mba']
+COLLEGE_FILTERS = ['', 'type=iit', 'type=nit', 'type=private', 'location=delhi', 'min_package=10',
+                   'sort=package', 'sort=name', 'q=institute']
+QUESTIONS = [
+    'How do I become a data scientist?',
+    'What skills does a cloud architect need?',
+    'Is a masters degree worth it for AI/ML roles?',
+    'How should I prepare for campus placements?',
+    'Which certifications help a cybersecurity career?',
+]
+RESUME = {
+    'name': 'Load Test', 'email': 'load@example.com', 'summary': 'Synthetic resume from the load test.',
+    'skills': ['Python', 'SQL', 'Statistics'],
+}
+
+# scenario -> relative weight in the traffic mix
+TRAFFIC_MIX = {
+    'page': 20,
+    'browse_colleges': 20,
+    'search': 12,
+    'catalog': 8,
+    'quiz': 12,
+    'recommendations': 6,
+    'resume': 6,
+    'chat': 10,
+    'feedback': 6,
+}
+PERCENTILES = (50, 95, 99)
+
+
+def random_answers(rng):
+    return {question: rng.choice(options) for question, options in QUIZ_OPTIONS.items()}
+
+
+class VirtualUser:
+    """A keep-alive connection plus session cookie; records every request it makes"""
+
+    def __init__(self, port, cookie, seed, results):
+        self.port = port
+        self.cookie = cookie
+        self.rng = random.Random(seed)
+        self.results = results
+        self.conn = None
+
+    def request(self, label, method, path, body=None):
+        """Send one request; returns (status, headers) and appends (label, status, seconds, bytes)"""
+        headers = {'Accept-Encoding': 'gzip'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            self.conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+            response = self.conn.getresponse()
+            size = len(response.read())
+            status, response_headers = response.status, response.headers
+            if response.will_close:
+                self.close()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            status, response_headers, size = 'error', {}, 0
+        self.results.append((label, status, time.perf_counter() - started, size))
+        return status, response_headers
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # Scenarios: one visitor action each, sometimes a few requests long
+
+    def page(self):
+        self.request('GET page', 'GET', self.rng.choice(PAGES))
+
+    def browse_colleges(self):
+        query = f'/api/colleges?limit=20&{self.rng.choice(COLLEGE_FILTERS)}'
+        path = query
+        for _ in range(self.rng.randint(1, 3)):
+            status, headers = self.request('GET /api/colleges', 'GET', path)
+            cursor = headers.get('X-Next-Cursor') if status == 200 else None
+            if not cursor:
+                break
+            path = f'{query}&cursor={cursor}'
+
+    def search(self):
+        q = self.rng.choice(SEARCHES)
+        self.request('GET /api/search/suggest', 'GET', f'/api/search/suggest?q={q[:3]}')
+        self.request('GET /api/search', 'GET', f'/api/search?q={q.replace(" ", "+")}')
+
+    def catalog(self):
+        self.request('GET catalog views', 'GET', self.rng.choice(['/api/skills', '/api/careers', '/api/scholarships']))
+
+    def quiz(self):
+        self.request('POST /api/submit_quiz', 'POST', '/api/submit_quiz', {
+            'answers': random_answers(self.rng), 'skills': self.rng.sample(SKILLS, 2),
+        })
+
+    def recommendations(self):
+        self.request('POST /api/recommendations', 'POST', '/api/recommendations', {
+            'answers': random_answers(self.rng), 'skills': self.rng.sample(SKILLS, 3),
+        })
+
+    def resume(self):
+        resume = dict(RESUME, job_title=self.rng.choice(['Analyst', 'Engineer', 'Designer', 'Intern']))
+        self.request('POST /api/resume/render', 'POST', '/api/resume/render', resume)
+
+    def chat(self):
+        # Half repeat a common opening question (answerable from the cache), half are new
+        message = self.rng.choice(QUESTIONS)
+        if self.rng.random() < 0.5:
+            message = f'{message} (case {self.rng.randrange(10 ** 6)})'
+        self.request('POST /api/chat', 'POST', '/api/chat', {'message': message, 'clear_history': True})
+
+    def feedback(self):
+        self.request('POST /api/submit_feedback', 'POST', '/api/submit_feedback', FEEDBACK_BODY)
+
+    def run(self, stop_at, mix):
+        scenarios, weights = zip(*mix.items())
+        while time.perf_counter() < stop_at:
+            getattr(self, self.rng.choices(scenarios, weights)[0])()
+        self.close()
+
+
+def log_in(port, index, password):
+    """Register and log in load-test user `index`; returns its session cookie"""
+    email = f'load{index}@example.com'
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    for path, body in (('/register', {'email': email, 'password': password, 'name': f'Load User {index}'}),
+                       ('/login', {'email': email, 'password': password})):
+        conn.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+    conn.close()
+    if response.status != 200:
+        raise RuntimeError(f'login of {email} failed with {response.status}')
+    return response.getheader('Set-Cookie', '').split(';')[0]
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))]
+
+
+def summarize(results, duration):
+    by_label = defaultdict(list)
+    for row in results:
+        by_label[row[0]].append(row)
+    by_label['total'] = results
+    endpoints = {}
+    for label, rows in sorted(by_label.items()):
+        latencies = sorted(seconds for _, _, seconds, _ in rows)
+        statuses = Counter(str(status) for _, status, _, _ in rows)
+        summary = {
+            'requests': len(rows),
+            'throughput_rps': round(len(rows) / duration, 2),
+            'errors': sum(count for status, count in statuses.items() if not status.startswith(('2', '3'))),
+            'statuses': dict(statuses),
+            'mean_bytes': round(sum(size for _, _, _, size in rows) / len(rows)),
+        }
+        for p in PERCENTILES:
+            summary[f'p{p}_ms'] = round(percentile(latencies, p) * 1e3, 2)
+        summary['max_ms'] = round(latencies[-1] * 1e3, 2)
+        endpoints[label] = summary
+    return endpoints
+
+
+def sample_workers(master):
+    workers = []
+    for pid in sorted(children(master)):
+        rss, pss, uss = memory(pid)
+        workers.append({'pid': pid, 'cpu_seconds': round(cpu_seconds(pid), 2),
+                        'rss_mib': round(rss, 1), 'pss_mib': round(pss, 1), 'uss_mib': round(uss, 1)})
+    return workers
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {'commit': git('rev-parse', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def print_report(result):
+    print(f'{"endpoint":<28} {"requests":>8} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for label, row in result['endpoints'].items():
+        print(f'{label:<28} {row["requests"]:>8} {row["throughput_rps"]:>8.1f} {row["p50_ms"]:>8.1f} '
+              f'{row["p95_ms"]:>8.1f} {row["p99_ms"]:>8.1f} {row["errors"]:>7}')
+    print('\nworkers after the run')
+    for worker in result['workers']:
+        print(f'  pid {worker["pid"]:>7}  CPU {worker["cpu_seconds"]:6.1f} s  RSS {worker["rss_mib"]:6.1f}  '
+              f'PSS {worker["pss_mib"]:6.1f}  USS {worker["uss_mib"]:6.1f} MiB')
+
+
+def compare(result, baseline, threshold):
+    """Print per-endpoint changes against `baseline`; returns the regressed endpoints"""
+    print(f'\nagainst {baseline["git"]["commit"] or "unknown commit"} ({baseline["started_at"]})')
+    print(f'{"endpoint":<28} {"req/s":>16} {"p50 ms":>16} {"p95 ms":>16} {"p99 ms":>16}')
+    regressions = []
+    for label, row in result['endpoints'].items():
+        before = baseline['endpoints'].get(label)
+        if before is None:
+            continue
+        cells = []
+        for field in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            change = (row[field] - before[field]) / before[field] if before[field] else 0.0
+            cells.append(f'{row[field]:>8.1f} {change:+6.0%}')
+        print(f'{label:<28} ' + ' '.join(f'{cell:>16}' for cell in cells))
+        slower = before['p95_ms'] and (row['p95_ms'] - before['p95_ms']) / before['p95_ms'] > threshold
+        fewer = before['throughput_rps'] and (before['throughput_rps'] - row['throughput_rps']) / before['throughput_rps'] > threshold
+        if slower or fewer:
+            regressions.append(label)
+    if regressions:
+        print(f'\nregressed by more than {threshold:.0%}: {", ".join(regressions)}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--worker-class', default='gevent')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of unmeasured load first')
+    parser.add_argument('--concurrency', type=int, default=32, help='virtual users')
+    parser.add_argument('--users', type=int, default=8, help='accounts the virtual users share')
+    parser.add_argument('--latency', type=float, default=0.2, help='injected upstream latency (s)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='result file (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change counted as a regression')
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'benchmarks', 'stub_upstream.py'),
+        '--port', str(stub_port), '--latency', str(args.latency),
+    ], stdout=subprocess.DEVNULL)
+    env = dict(
+        os.environ,
+        DATABASE_PATH=os.path.join(tempfile.mkdtemp(), 'load_test.db'),
+        GUNICORN_WORKER_CLASS=args.worker_class,
+        OPENROUTER_API_KEY='stub',
+        OPENROUTER_API_URL=f'http://127.0.0.1:{stub_port}/api/v1/chat/completions',
+        WEB3FORMS_ACCESS_KEY='stub',
+        WEB3FORMS_URL=f'http://127.0.0.1:{stub_port}/submit',
+        # Every virtual user comes from 127.0.0.1, so per-IP limits would only measure the 429 path
+        LOGIN_IP_BURST='1000000',
+        CHAT_IP_BURST='1000000',
+        CHAT_SESSION_BURST='1000000',
+        CATALOG_WATCH_INTERVAL='0',
+        LOG_LEVEL='WARNING',
+    )
+    port = free_port()
+    server = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'app:app', '-w', str(args.workers),
+        '-b', f'127.0.0.1:{port}', '--timeout', '120', '--log-level', 'warning',
+    ], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(stub_port)
+        wait_for_port(port, timeout=60)
+        cookies = [log_in(port, index, 'load-test-password') for index in range(args.users)]
+        print(f'{args.workers} {args.worker_class} workers, {args.concurrency} virtual users over {args.users} accounts, '
+              f'upstream latency {args.latency}s, {args.warmup:g}s warm-up + {args.duration:g}s measured')
+
+        def run(seconds, results, seed):
+            stop_at = time.perf_counter() + seconds
+            users = [VirtualUser(port, cookies[index % len(cookies)], seed * 1000 + index, results)
+                     for index in range(args.concurrency)]
+            threads = [threading.Thread(target=user.run, args=(stop_at, TRAFFIC_MIX)) for user in users]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return time.perf_counter() - started
+
+        run(args.warmup, [], args.seed + 1)
+        client_cpu = time.process_time()
+        results = []
+        started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        elapsed = run(args.duration, results, args.seed)
+        client_cpu = time.process_time() - client_cpu
+
+        result = {
+            'started_at': started_at,
+            'git': git_revision(),
+            'python': platform.python_version(),
+            'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+            'traffic_mix': TRAFFIC_MIX,
+            'duration_seconds': round(elapsed, 2),
+            'client_cpu_seconds': round(client_cpu, 2),
+            'endpoints': summarize(results, elapsed),
+            'workers': sample_workers(server.pid),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+        stub.terminate()
+        stub.wait()
+
+    print_report(result)
+    print(f'\nload generator used {result["client_cpu_seconds"]:.1f} s CPU in {result["duration_seconds"]:.1f} s')
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f'{(result["git"]["commit"] or "unknown")[:12]}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'results written to {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark password hashing for the login path.
+
+Reports, for each hash method, the cost of one verification and the
+resulting logins/sec per core; then pushes concurrent logins through the
+PasswordHasher process pool to show throughput scaling with pool size, and
+compares POST /login latency for known and unknown emails (they should
+match, since unknown emails are checked against a dummy hash).
+
+Usage: python benchmarks/password_hashing.py [--methods pbkdf2:sha256:600000,scrypt:32768:8:1]
+                                             [--workers 1,2,4] [--logins 40]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('LOGIN_IP_BURST', '1000000')
+os.environ.setdefault('LOGIN_ACCOUNT_BURST', '1000000')
+
+from werkzeug.security import check_password_hash, generate_password_hash  # noqa: E402
+
+PASSWORD = 'correct horse battery staple'
+
+
+def time_verify(method, samples):
+    password_hash = generate_password_hash(PASSWORD, method)
+    started = time.perf_counter()
+    for _ in range(samples):
+        check_password_hash(password_hash, PASSWORD)
+    return (time.perf_counter() - started) / samples
+
+
+def pool_throughput(method, workers, logins):
+    from app import PasswordHasher
+    hasher = PasswordHasher(method, workers, max_pending=workers * 4)
+    password_hash = generate_password_hash(PASSWORD, method)
+    hasher.verify(password_hash, PASSWORD)  # start the pool outside the timing
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers * 2) as executor:
+        results = list(executor.map(lambda _: hasher.verify(password_hash, PASSWORD), range(logins)))
+    elapsed = time.perf_counter() - started
+    hasher.executor.shutdown()
+    assert all(results)
+    return logins / elapsed
+
+
+def login_latency(samples):
+    from app import app, password_hasher, storage
+    storage.create_user('bench@example.com', 'Bench', password_hasher.hash(PASSWORD), '')
+    password_hasher.get_dummy_hash()  # created lazily by the first unknown-email login
+    client = app.test_client()
+    timings = {'known email, wrong password': [], 'unknown email': []}
+    for index in range(samples):
+        for label, email in (('known email, wrong password', 'bench@example.com'),
+                             ('unknown email', f'nobody{index}@example.com')):
+            started = time.perf_counter()
+            response = client.post('/login', json={'email': email, 'password': 'wrong'})
+            timings[label].append(time.perf_counter() - started)
+            assert response.status_code == 401
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', default='pbkdf2:sha256:600000,pbkdf2:sha256:260000,scrypt:32768:8:1')
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--logins', type=int, default=40)
+    parser.add_argument('--samples', type=int, default=5)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    methods = args.methods.split(',')
+    print(f'{cores} CPU core(s)\n')
+
+    print('Hash cost (single thread)')
+    for method in methods:
+        seconds = time_verify(method, args.samples)
+        print(f'  {method:<24} {seconds * 1000:8.1f} ms/verify  {1 / seconds:8.1f} logins/s per core')
+
+    print(f'\nProcess pool throughput ({methods[0]}, {args.logins} concurrent logins)')
+    for workers in (int(value) for value in args.workers.split(',')):
+        rate = pool_throughput(methods[0], workers, args.logins)
+        print(f'  {workers} worker(s): {rate:8.1f} logins/s  ({rate / min(workers, cores):.1f} per busy core)')
+
+    print('\nPOST /login latency (configured PASSWORD_HASH_METHOD)')
+    for label, timings in login_latency(args.samples).items():
+        print(f'  {label:<28} mean {statistics.mean(timings) * 1000:7.1f} ms  '
+              f'stdev {statistics.pstdev(timings) * 1000:6.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
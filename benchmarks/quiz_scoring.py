@@ -0,0 +1,172 @@
+"""Benchmark the quiz scoring engine against the original branch-based scorer.
+
+Checks that both produce identical top-3 results on random answer sets, then
+reports per-request latency of POST /api/submit_quiz and batch throughput of
+POST /api/submit_quiz/batch and POST /api/recommendations/batch.
+
+Usage: python benchmarks/quiz_scoring.py [--samples 2000] [--batch 5000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import QUIZ_CAREERS, app, catalog, quiz_scorer  # noqa: E402
+
+QUESTION_OPTIONS = {
+    'q1': ['building_tech', 'analyzing_data', 'creating_visual', 'communicating'],
+    'q2': ['programming', 'data_analytics', 'creative_design', 'cybersecurity'],
+    'q3': ['remote', 'office', 'hybrid', 'freelance'],
+    'q4': ['mathematics', 'science_tech', 'arts_design', 'business'],
+    'q5': ['alone', 'team', 'both', 'lead'],
+    'q6': ['very', 'moderate', 'low', 'not'],
+    'q7': ['practical', 'theoretical', 'mixed', 'self'],
+    'q8': ['analytical', 'creative', 'systematic', 'collaborative'],
+    'q9': ['low', 'moderate', 'high', 'varies'],
+    'q10': ['very', 'high', 'yes', 'no'],
+}
+
+
+def legacy_top_careers(answers):
+    """The original if/elif scorer from submit_quiz(), kept as the reference"""
+    career_scores = dict.fromkeys(QUIZ_CAREERS, 0)
+
+    q1 = answers.get('q1', '')
+    if q1 == 'building_tech':
+        career_scores['Software Developer'] += 20
+        career_scores['AI/ML Engineer'] += 15
+        career_scores['Cloud Architect'] += 15
+    elif q1 == 'analyzing_data':
+        career_scores['Data Scientist'] += 20
+        career_scores['Business Analyst'] += 15
+        career_scores['Product Manager'] += 10
+    elif q1 == 'creating_visual':
+        career_scores['UX/UI Designer'] += 20
+        career_scores['Digital Marketing Specialist'] += 10
+    elif q1 == 'communicating':
+        career_scores['Digital Marketing Specialist'] += 20
+        career_scores['Content Writer'] += 15
+        career_scores['Product Manager'] += 10
+
+    q2 = answers.get('q2', '')
+    if q2 == 'programming':
+        for career in ['Software Developer', 'AI/ML Engineer', 'Cloud Architect']:
+            career_scores[career] += 15
+    elif q2 == 'data_analytics':
+        career_scores['Data Scientist'] += 15
+        career_scores['Business Analyst'] += 15
+    elif q2 == 'creative_design':
+        career_scores['UX/UI Designer'] += 15
+    elif q2 == 'cybersecurity':
+        career_scores['Cybersecurity Expert'] += 20
+
+    if answers.get('q3', '') == 'remote':
+        for career in career_scores:
+            career_scores[career] += 5
+
+    q4 = answers.get('q4', '')
+    if q4 == 'mathematics':
+        career_scores['Data Scientist'] += 10
+        career_scores['AI/ML Engineer'] += 10
+    elif q4 == 'science_tech':
+        career_scores['Software Developer'] += 10
+        career_scores['Cloud Architect'] += 10
+    elif q4 == 'arts_design':
+        career_scores['UX/UI Designer'] += 10
+    elif q4 == 'business':
+        career_scores['Business Analyst'] += 10
+        career_scores['Product Manager'] += 10
+
+    for key, value in answers.items():
+        if key.startswith('q') and key not in ['q1', 'q2', 'q3', 'q4']:
+            if value in ['yes', 'very', 'high']:
+                for career in career_scores:
+                    career_scores[career] += 2
+
+    max_score = max(career_scores.values())
+    match_percentages = {}
+    for career, score in career_scores.items():
+        if max_score > 0:
+            match_percentages[career] = min(int((score / (max_score + 20)) * 100), 100)
+        else:
+            match_percentages[career] = 50
+    return sorted(match_percentages.items(), key=lambda x: x[1], reverse=True)[:3]
+
+
+def random_answers(rng):
+    answers = {}
+    for question, options in QUESTION_OPTIONS.items():
+        # Leave some questions unanswered to cover the zero-score paths
+        if rng.random() < 0.9:
+            answers[question] = rng.choice(options)
+    return answers
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=2000, help='single requests to time')
+    parser.add_argument('--batch', type=int, default=5000, help='answer sets per batch call')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    answer_sets = [random_answers(rng) for _ in range(max(args.samples, args.batch))]
+    answer_sets += [{}, {'q3': 'office'}, {'q5': 'yes', 'quiz': 'high'}]
+
+    new_results = quiz_scorer.top_careers(answer_sets)
+    mismatches = sum(
+        legacy_top_careers(answers) != new
+        for answers, new in zip(answer_sets, new_results)
+    )
+    print(f'equivalence: {len(answer_sets) - mismatches}/{len(answer_sets)} answer sets identical')
+    if mismatches:
+        sys.exit(1)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_email'] = 'bench@example.com'
+
+    def timed(callable_):
+        start = time.perf_counter()
+        callable_()
+        return time.perf_counter() - start
+
+    legacy = [timed(lambda: legacy_top_careers(answers)) for answers in answer_sets[:args.samples]]
+    engine = [timed(lambda: quiz_scorer.top_careers([answers])) for answers in answer_sets[:args.samples]]
+    request = [
+        timed(lambda: client.post('/api/submit_quiz', json={'answers': answers}))
+        for answers in answer_sets[:args.samples]
+    ]
+    for name, samples in (('legacy scorer', legacy), ('matrix scorer', engine), ('POST /api/submit_quiz', request)):
+        print(f'{name:>24}: p50 {statistics.median(samples) * 1e6:8.1f} us  '
+              f'p99 {percentile(samples, 0.99) * 1e6:8.1f} us')
+
+    batch = answer_sets[:args.batch]
+    elapsed = timed(lambda: client.post('/api/submit_quiz/batch', json={'answer_sets': batch}))
+    print(f'{"POST /api/submit_quiz/batch":>24}: {len(batch)} answer sets in {elapsed * 1e3:.1f} ms '
+          f'({len(batch) / elapsed:,.0f} answer sets/s)')
+    elapsed = timed(lambda: quiz_scorer.top_careers(batch))
+    print(f'{"matrix scorer batch":>24}: {len(batch)} answer sets in {elapsed * 1e3:.1f} ms '
+          f'({len(batch) / elapsed:,.0f} answer sets/s)')
+    elapsed = timed(lambda: [legacy_top_careers(answers) for answers in batch])
+    print(f'{"legacy scorer loop":>24}: {len(batch)} answer sets in {elapsed * 1e3:.1f} ms '
+          f'({len(batch) / elapsed:,.0f} answer sets/s)')
+
+    skills = list(catalog.skills)
+    profiles = [{'answers': answers, 'skills': rng.sample(skills, rng.randint(0, 4))} for answers in batch]
+    elapsed = timed(lambda: client.post('/api/recommendations/batch', json={'profiles': profiles}))
+    print(f'{"POST /api/recommendations/batch":>24}: {len(batch)} profiles in {elapsed * 1e3:.1f} ms '
+          f'({len(batch) / elapsed:,.0f} profiles/s)')
+
+
+if __name__ == '__main__':
+    main()
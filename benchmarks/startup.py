@@ -0,0 +1,150 @@
+"""Measure cold-start cost: import time of app.py and per-worker memory under gunicorn.
+
+1. Imports app.py in fresh interpreters and reports the median import time
+   and the slowest top-level imports (from `python -X importtime`).
+2. Boots gunicorn with N workers with and without GUNICORN_PRELOAD and
+   reports the CPU each worker spent booting, then RSS, PSS (shared pages
+   split between the processes using them) and USS (pages private to one
+   process) per worker, right after boot and again after serving traffic.
+   USS is what each extra worker really costs; with preloading and
+   gc.freeze() it should stay close to flat after traffic.
+
+Linux only (reads /proc). Usage: python benchmarks/startup.py [--workers 4] [--requests 400]
+"""
+import argparse
+import http.client
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from upstream_concurrency import ROOT, free_port, wait_for_port
+
+PATHS = ['/', '/feedback', '/chatbot', '/college_finder', '/career_insights', '/scholarships',
+         '/api/skills', '/api/careers', '/api/colleges?limit=20', '/api/search?q=data+science']
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def import_times(runs):
+    code = 'import time; started = time.perf_counter(); import app; print(time.perf_counter() - started)'
+    env = dict(os.environ, STORAGE_BACKEND='memory')
+    samples = [
+        float(subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True,
+                             text=True, check=True).stdout.strip().splitlines()[-1])
+        for _ in range(runs)
+    ]
+    trace = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                           capture_output=True, text=True, check=True).stderr
+    top_level = []
+    for line in trace.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)', line)
+        if match and len(match.group(2)) <= 2:  # the app module and what it imports directly
+            top_level.append((int(match.group(1)) / 1e6, match.group(3)))
+    return statistics.median(samples), sorted(top_level, reverse=True)[:8]
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+            if int(fields[1]) == pid:
+                found.append(int(entry))
+    return found
+
+
+def cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def memory(pid):
+    """(rss, pss, uss) in MiB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return values['Rss'], values['Pss'], values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+
+
+def get(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('GET', path)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status
+
+
+def report(label, master, workers):
+    rows = [memory(pid) for pid in workers]
+    rss, pss, uss = (statistics.mean(column) for column in zip(*rows))
+    total = memory(master)[1] + sum(row[1] for row in rows)
+    print(f'    {label:<14} per worker RSS {rss:6.1f}  PSS {pss:6.1f}  USS {uss:6.1f} MiB   '
+          f'total PSS (master + workers) {total:6.1f} MiB')
+
+
+def measure(preload, workers, requests, worker_class):
+    env = dict(os.environ, GUNICORN_PRELOAD='true' if preload else 'false', GUNICORN_WORKER_CLASS=worker_class,
+               DATABASE_PATH=os.path.join(tempfile.mkdtemp(), 'startup.db'), CATALOG_WATCH_INTERVAL='0')
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'app:app', '-w', str(workers),
+        '-b', f'127.0.0.1:{port}', '--log-level', 'warning',
+    ], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port, timeout=60)
+        while len(children(server.pid)) < workers:
+            time.sleep(0.05)
+        get(port, '/api/skills')
+        first_response = time.perf_counter() - started
+        time.sleep(2)  # let every worker finish booting
+        pids = children(server.pid)
+        boot_cpu = statistics.mean(cpu_seconds(pid) for pid in pids)
+
+        print(f'  GUNICORN_PRELOAD={str(preload).lower()}: first response after {first_response:.2f}s, '
+              f'{boot_cpu * 1000:.0f} ms CPU per worker to boot, master {cpu_seconds(server.pid) * 1000:.0f} ms')
+        report('after boot', server.pid, pids)
+        with ThreadPoolExecutor(16) as pool:
+            statuses = list(pool.map(lambda index: get(port, PATHS[index % len(PATHS)]), range(requests)))
+        report(f'after {requests} req', server.pid, pids)
+        errors = sum(status != 200 for status in statuses)
+        if errors:
+            print(f'    {errors} requests failed')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--import-runs', type=int, default=5)
+    parser.add_argument('--worker-class', default='gevent')
+    args = parser.parse_args()
+
+    seconds, slowest = import_times(args.import_runs)
+    print(f'import app: median {seconds * 1000:.0f} ms over {args.import_runs} fresh interpreters; slowest imports:')
+    for cumulative, module in slowest:
+        print(f'  {cumulative * 1000:7.1f} ms  {module}')
+
+    print(f'\n{args.workers} {args.worker_class} workers')
+    for preload in (False, True):
+        measure(preload, args.workers, args.requests, args.worker_class)
+
+
+if __name__ == '__main__':
+    main()
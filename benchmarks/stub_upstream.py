@@ -0,0 +1,144 @@
+"""Local stand-in for the OpenRouter and Web3Forms APIs.
+
+Answers POST /api/v1/chat/completions like an OpenAI-compatible server,
+including `stream: true` responses sent as server-sent event chunks, and
+POST /submit like Web3Forms, with configurable latency so the app can be
+exercised without real API keys. GET /stats reports completion calls seen,
+the most that were in flight at once and /submit calls answered with
+success; POST /stats/reset clears them.
+
+Usage:
+    python benchmarks/stub_upstream.py --port 8765 --latency 0.5 --chunk-delay 0.05
+    OPENROUTER_API_KEY=stub OPENROUTER_API_URL=http://127.0.0.1:8765/api/v1/chat/completions \
+    WEB3FORMS_ACCESS_KEY=stub WEB3FORMS_URL=http://127.0.0.1:8765/submit python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = (
+    "**Becoming a Data Scientist** takes three steps:\n\n"
+    "1. Learn Python, SQL and statistics.\n"
+    "2. Build projects with real datasets and publish them.\n"
+    "3. Apply for internships and analyst roles to gain experience."
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    chunk_delay = 0.0
+    fail_rate = 0.0
+    stats_lock = threading.Lock()
+    stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0, 'submissions': 0}
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass  # clients dropping idle keep-alive connections
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != '/stats':
+            self.send_json(404, {'error': 'not found'})
+            return
+        with self.stats_lock:
+            self.send_json(200, dict(self.stats))
+
+    def do_POST(self):
+        if self.path == '/stats/reset':
+            self.read_json()
+            with self.stats_lock:
+                self.stats.update(requests=0, in_flight=0, max_in_flight=0, submissions=0)
+            self.send_json(200, {'success': True})
+            return
+        if self.path == '/submit':
+            self.read_json()
+            time.sleep(self.latency)
+            if random.random() < self.fail_rate:
+                self.send_json(503, {'success': False, 'message': 'Service unavailable'})
+                return
+            with self.stats_lock:
+                self.stats['submissions'] += 1
+            self.send_json(200, {'success': True, 'message': 'Email sent successfully!'})
+            return
+        if not self.path.endswith('/chat/completions'):
+            self.send_json(404, {'error': 'not found'})
+            return
+
+        payload = self.read_json()
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+        try:
+            self.complete(payload)
+        finally:
+            with self.stats_lock:
+                self.stats['in_flight'] -= 1
+
+    def complete(self, payload):
+        time.sleep(self.latency)
+        if not payload.get('stream'):
+            self.send_json(200, {
+                'id': 'stub',
+                'object': 'chat.completion',
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ANSWER}}],
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.write_chunk(b': OPENROUTER PROCESSING\n\n')
+        for word in ANSWER.split(' '):
+            chunk = {'choices': [{'index': 0, 'delta': {'content': word + ' '}}]}
+            self.write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode())
+            time.sleep(self.chunk_delay)
+        self.write_chunk(b'data: [DONE]\n\n')
+        self.write_chunk(b'')
+
+    def write_chunk(self, data):
+        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds before the first byte')
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help='seconds between streamed chunks')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of /submit calls answered with 503')
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.chunk_delay = args.chunk_delay
+    StubHandler.fail_rate = args.fail_rate
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f'Stub upstream listening on http://{args.host}:{args.port}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Load test for upstream-bound work under different gunicorn worker classes.
+
+Boots benchmarks/stub_upstream.py with injected latency and one gunicorn
+worker per worker class, then:
+
+- fires concurrent POST /api/chat requests and reports throughput and latency;
+- submits a batch of feedback and reports how fast the background outbox
+  delivers it to the stub's /submit (the request itself only writes the
+  outbox row, so its own latency says nothing about Web3Forms).
+
+Usage: python benchmarks/upstream_concurrency.py [--latency 0.5] [--requests 200] [--concurrency 100] [--deliveries 40]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    # cache off, as in chat_admission.py: every request must reach the upstream
+    'chat': ('/api/chat', {'message': 'How do I become a data scientist?', 'cache': False}),
+}
+
+FEEDBACK_BODY = {
+    'name': 'Load Test',
+    'email': 'load@example.com',
+    'feedback_type': 'general',
+    'subject': 'Benchmark',
+    'message': 'Synthetic feedback from the load test.',
+    'rating': 5,
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'port {port} did not open')
+
+
+def post(port, path, body):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    start = time.perf_counter()
+    conn.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status, time.perf_counter() - start
+
+
+def run_load(port, path, body, total, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: post(port, path, body), range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(status != 200 for status, _ in results)
+    return {
+        'throughput': total / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'errors': errors,
+    }
+
+
+def stub_stats(stub_port, reset=False):
+    conn = http.client.HTTPConnection('127.0.0.1', stub_port, timeout=10)
+    if reset:
+        conn.request('POST', '/stats/reset', '{}', {'Content-Type': 'application/json'})
+    else:
+        conn.request('GET', '/stats')
+    data = json.loads(conn.getresponse().read())
+    conn.close()
+    return data
+
+
+def run_deliveries(port, stub_port, total, timeout=300):
+    """Submit `total` feedback entries, then time the outbox until the stub has received them all"""
+    stub_stats(stub_port, reset=True)
+    start = time.perf_counter()
+    for _ in range(total):
+        status, _ = post(port, '/api/submit_feedback', FEEDBACK_BODY)
+        if status != 200:
+            raise RuntimeError(f'feedback submission failed with {status}')
+    submitted = time.perf_counter() - start
+    while stub_stats(stub_port)['submissions'] < total:
+        if time.perf_counter() - start > timeout:
+            raise RuntimeError(f'outbox delivered {stub_stats(stub_port)["submissions"]}/{total} in {timeout}s')
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    return {'throughput': total / elapsed, 'elapsed': elapsed, 'submitted': submitted}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.5, help='injected upstream latency (s)')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--deliveries', type=int, default=40, help='feedback entries delivered through the outbox')
+    parser.add_argument('--worker-classes', default='sync,gevent')
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'benchmarks', 'stub_upstream.py'),
+        '--port', str(stub_port), '--latency', str(args.latency),
+    ], stdout=subprocess.DEVNULL)
+    wait_for_port(stub_port)
+
+    env = dict(
+        os.environ,
+        OPENROUTER_API_KEY='stub',
+        OPENROUTER_API_URL=f'http://127.0.0.1:{stub_port}/api/v1/chat/completions',
+        WEB3FORMS_ACCESS_KEY='stub',
+        WEB3FORMS_URL=f'http://127.0.0.1:{stub_port}/submit',
+        DATABASE_PATH=os.path.join(tempfile.mkdtemp(), 'loadtest.db'),
+        # Measure raw throughput, not the per-client chat limits
+        CHAT_IP_BURST='1000000',
+        CHAT_SESSION_BURST='1000000',
+        CHAT_MAX_CONCURRENT='100000',
+        CHAT_MAX_WAITING='100000',
+    )
+    try:
+        print(f'upstream latency {args.latency}s, {args.requests} requests, concurrency {args.concurrency}, 1 worker')
+        for worker_class in args.worker_classes.split(','):
+            port = free_port()
+            server = subprocess.Popen([
+                sys.executable, '-m', 'gunicorn', 'app:app', '-k', worker_class, '-w', '1',
+                '-b', f'127.0.0.1:{port}', '--timeout', '300', '--log-level', 'warning',
+            ], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for_port(port)
+                for name, (path, body) in ENDPOINTS.items():
+                    result = run_load(port, path, body, args.requests, args.concurrency)
+                    print(f'{worker_class:>7} {name:>9}: {result["throughput"]:7.1f} req/s  '
+                          f'p50 {result["p50"] * 1e3:7.1f} ms  p95 {result["p95"] * 1e3:7.1f} ms  '
+                          f'errors {result["errors"]}')
+                if args.deliveries:
+                    result = run_deliveries(port, stub_port, args.deliveries)
+                    print(f'{worker_class:>7} {"outbox":>9}: {result["throughput"]:7.1f} deliveries/s  '
+                          f'({args.deliveries} queued in {result["submitted"]:.2f}s, '
+                          f'all sent after {result["elapsed"]:.2f}s)')
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == '__main__':
+    main()
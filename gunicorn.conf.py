@@ -0,0 +1,51 @@
+"""Gunicorn settings, picked up automatically by `gunicorn app:app`.
+
+gevent workers multiplex many requests per process, so slow OpenRouter and
+Web3Forms calls no longer pin a whole worker each. Set
+GUNICORN_WORKER_CLASS=sync (or pass `-k sync`) to fall back to one request
+per worker.
+
+With GUNICORN_PRELOAD (on by default) app.py is imported once in the master
+and the workers are forked from it, so adding a worker costs a fork rather
+than a fresh import, and the modules, catalog snapshot and compiled
+templates are shared copy-on-write. The master imports with the garbage
+collector off and freezes everything it built before forking, so the
+workers' collectors never write to (and thereby copy) those shared pages.
+
+The import happens in on_starting rather than through gunicorn's own
+preload_app, because only then is the effective worker class (including a
+`-k` on the command line) known: the master monkey-patches for gevent
+workers and leaves the standard library alone for every other class.
+"""
+import gc
+import os
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '500'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+preload = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+
+def on_starting(server):
+    if not preload:
+        return
+    if server.cfg.worker_class_str in ('gevent', 'gunicorn.workers.ggevent.GeventWorker'):
+        # Patch before the master imports the app, so the locks and sockets it
+        # creates are already cooperative in the forked workers
+        from gevent import monkey
+        monkey.patch_all()
+    gc.disable()
+    import app
+    app.prepare_for_fork()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload:
+        gc.enable()
+
+
+def worker_exit(server, worker):
+    # Write the activity events still buffered in this worker before it exits
+    import app
+    app.activity.flush()